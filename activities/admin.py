@@ -1,14 +1,35 @@
 from django.contrib import admin
 from .models.activity import Activity
 from .models.activity_type import ActivityType
+from .models.archive import ActivityRollup, ArchivedActivity
+from .models.change import ActivityChange
 
 @admin.register(ActivityType)
 class ActivityTypeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'points')
+    list_display = ('name', 'points', 'category')
+    list_editable = ('category',)
+    list_filter = ('category',)
     search_fields = ('name',)
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
-    list_display = ('activity_type', 'user', 'date', 'evidence')
+    list_display = ('activity_type', 'user', 'date', 'points', 'evidence')
     list_filter = ('activity_type', 'date')
-    search_fields = ('user__name', 'activity_type__name')
\ No newline at end of file
+    search_fields = ('user__name', 'activity_type__name')
+@admin.register(ArchivedActivity)
+class ArchivedActivityAdmin(admin.ModelAdmin):
+    list_display = ('activity_type', 'user', 'date', 'points', 'archived_at')
+    list_filter = ('activity_type', 'date')
+    search_fields = ('user__name', 'activity_type__name')
+
+@admin.register(ActivityRollup)
+class ActivityRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'points', 'activities')
+    list_filter = ('period',)
+    search_fields = ('user__name',)
+
+@admin.register(ActivityChange)
+class ActivityChangeAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'operation', 'activity_id', 'created_at')
+    list_filter = ('operation',)
+    search_fields = ('activity_id',)
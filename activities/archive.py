@@ -0,0 +1,123 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from core.versioning import bump_data_version
+from reports.models.period import Period
+from .models import Activity, ActivityRollup, ArchivedActivity
+
+HORIZON_KEY = 'activities:archive_horizon'
+ARCHIVED_FIELDS = (
+    'id', 'activity_type_id', 'user_id', 'date', 'points', 'evidence', 'evidence_fingerprint', 'note',
+    'created_at', 'updated_at',
+)
+
+
+def archivable_periods(retention_days=None):
+    """
+    Quincenas cerradas que terminaron antes de la ventana de retención.
+    Sólo se archivan periodos quincenales: no se solapan entre sí, así que los
+    rollups de distintos periodos nunca cuentan dos veces la misma actividad.
+    """
+    if retention_days is None:
+        retention_days = settings.ACTIVITY_ARCHIVE_RETENTION_DAYS
+    cutoff = timezone.localdate() - timedelta(days=retention_days)
+    return Period.objects.filter(type=Period.BIWEEKLY, is_closed=True, endDate__lt=cutoff).order_by('startDate')
+
+
+def compact_period(period):
+    """
+    (Re)calcula los rollups por usuario del periodo a partir de las actividades
+    vigentes y las ya archivadas, así el resultado es exacto aunque un archivado
+    anterior se haya interrumpido a mitad.
+    """
+    totals = {}
+    for model in (Activity, ArchivedActivity):
+        rows = (
+            model.objects.filter(date__range=(period.startDate, period.endDate))
+            .values_list('user_id')
+            .annotate(points=Sum('points'), activities=Count('id'))
+            .order_by()
+        )
+        for user_id, points, activities in rows:
+            current = totals.setdefault(user_id, [0, 0])
+            current[0] += points or 0
+            current[1] += activities
+
+    with transaction.atomic():
+        ActivityRollup.objects.filter(period=period).delete()
+        ActivityRollup.objects.bulk_create([
+            ActivityRollup(period=period, user_id=user_id, points=points, activities=activities)
+            for user_id, (points, activities) in totals.items()
+        ])
+    return len(totals)
+
+
+def archive_period(period, batch_size=1000):
+    """
+    Mueve las actividades del periodo a ArchivedActivity en lotes por id. Cada
+    lote es una transacción (copiar + borrar), por lo que se puede relanzar en
+    cualquier momento. Genera el número de actividades movidas tras cada lote.
+    """
+    live = Activity.objects.filter(date__range=(period.startDate, period.endDate)).order_by('id')
+    moved = 0
+    while True:
+        batch = list(live.values(*ARCHIVED_FIELDS)[:batch_size])
+        if not batch:
+            break
+        _release_archived_fingerprints(batch)
+        with transaction.atomic():
+            ArchivedActivity.objects.bulk_create([ArchivedActivity(**row) for row in batch], ignore_conflicts=True)
+            # Borrado directo, sin señales: los totales no cambian porque el periodo ya tiene rollups
+            Activity.objects.filter(id__in=[row['id'] for row in batch])._raw_delete(Activity.objects.db)
+            # Sin señales tampoco se renueva la versión: historial y exportes cacheados cubren este rango
+            bump_data_version()
+        moved += len(batch)
+        yield moved
+    cache.delete(HORIZON_KEY)
+
+
+def _release_archived_fingerprints(batch):
+    """
+    Una huella que ya está en el archivo con otro id (duplicado anterior a la
+    deduplicación entre tablas) haría que ignore_conflicts descartase la fila
+    y el borrado posterior la perdiera: se archiva sin huella, como hace la
+    migración 0010 con los duplicados previos.
+    """
+    fingerprints = {row['evidence_fingerprint'] for row in batch if row['evidence_fingerprint']}
+    if not fingerprints:
+        return
+    taken = {
+        (user_id, type_id, value): pk
+        for pk, user_id, type_id, value in ArchivedActivity.objects.filter(evidence_fingerprint__in=fingerprints)
+        .values_list('id', 'user_id', 'activity_type_id', 'evidence_fingerprint')
+    }
+    for row in batch:
+        pk = taken.get((row['user_id'], row['activity_type_id'], row['evidence_fingerprint']))
+        if pk is not None and pk != row['id']:
+            row['evidence_fingerprint'] = None
+
+
+def archive_horizon():
+    """
+    Última fecha con actividades archivadas, o None si el archivo está vacío.
+    archive_period sólo borra la entrada del caché de su propio proceso (con
+    LocMem, el comando archive_activities no alcanza a los workers web): por
+    eso caduca a los ACTIVITY_ARCHIVE_HORIZON_TTL segundos. El MAX(date) se
+    resuelve con el índice (date, user, points).
+    """
+    horizon = cache.get(HORIZON_KEY, 'missing')
+    if horizon == 'missing':
+        horizon = ArchivedActivity.objects.aggregate(horizon=Max('date'))['horizon']
+        cache.set(HORIZON_KEY, horizon, settings.ACTIVITY_ARCHIVE_HORIZON_TTL)
+    return horizon
+
+
+def sources_for_range(start_date=None):
+    """Modelos a consultar para un rango: el archivo sólo si el rango llega hasta él."""
+    horizon = archive_horizon()
+    if horizon is not None and (start_date is None or start_date <= horizon):
+        return [Activity, ArchivedActivity]
+    return [Activity]
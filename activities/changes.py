@@ -0,0 +1,25 @@
+from .models import ActivityChange
+
+MAX_BATCH = 1000
+
+
+def changes_since(since=0, limit=500):
+    """
+    Cambios con seq > since, en orden. Devuelve (cambios, hay_más).
+
+    Los escritores se serializan con ActivityChange.lock_sequence(), así que
+    un cambio confirmado más tarde siempre tiene un seq mayor que los ya
+    visibles: guardar el último seq leído basta para no perder ninguno. Los
+    seq pueden saltar números (transacciones revertidas).
+    """
+    limit = max(1, min(limit, MAX_BATCH))
+    rows = list(
+        ActivityChange.objects.filter(seq__gt=since)
+        .order_by('seq')
+        .values('seq', 'activity_id', 'operation', 'payload', 'created_at')[:limit + 1]
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def serialize(change):
+    return dict(change, created_at=change['created_at'].isoformat())
@@ -0,0 +1,36 @@
+"""
+Huella normalizada de la evidencia de una actividad.
+
+La misma evidencia puede llegar escrita de varias formas: el hash del commit
+solo, la URL del commit con o sin esquema, con barra final o en mayúsculas.
+Todas producen la misma huella, que junto con usuario y tipo de actividad es
+única en Activity. Un hash abreviado y el completo son huellas distintas.
+"""
+import hashlib
+import re
+
+_COMMIT_URL = re.compile(r'/commits?/([0-9a-f]{7,40})(?=[/?#.]|$)')
+_COMMIT_HASH = re.compile(r'[0-9a-f]{7,40}')
+_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://')
+
+
+def normalize(evidence):
+    """Forma canónica de la evidencia o '' si está vacía."""
+    value = (evidence or '').strip().lower()
+    if not value or _COMMIT_HASH.fullmatch(value):
+        return value
+    match = _COMMIT_URL.search(value)
+    if match:
+        return match.group(1)
+    value = _SCHEME.sub('', value)
+    if value.startswith('www.'):
+        value = value[4:]
+    return value.split('#', 1)[0].rstrip('/')
+
+
+def fingerprint(evidence):
+    """sha256 hexadecimal de la evidencia normalizada; None sin evidencia (sin restricción de unicidad)."""
+    value = normalize(evidence)
+    if not value:
+        return None
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
@@ -0,0 +1,87 @@
+"""
+Importación de commits desde `git log` como actividades "Commit válido".
+
+La salida de git se lee línea a línea (de un archivo o de un `git log` sobre
+un repositorio local) y se convierte en actividades con un generador, que
+activities.ingest inserta por lotes: la memoria no depende del número de
+commits, sólo del lote y del diccionario email -> usuario. La evidencia es el
+hash del commit, así que relanzar la importación no duplica puntos, tampoco
+después de archivar los periodos (ingest compara con ambas tablas).
+"""
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from django.utils import timezone
+from users.models.user import User
+from .models import Activity
+
+# hash, email del autor (respetando .mailmap) y fecha del autor en ISO 8601 estricto
+GIT_LOG_FORMAT = '%H%x09%aE%x09%aI'
+
+
+@dataclass
+class GitLogStats:
+    commits: int = 0
+    malformed: int = 0
+    unknown_authors: int = 0
+    out_of_range: int = 0
+
+
+def parse_lines(lines, stats):
+    """(hash, email, fecha local) por cada línea con el formato GIT_LOG_FORMAT."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        stats.commits += 1
+        parts = line.split('\t')
+        if len(parts) != 3:
+            stats.malformed += 1
+            continue
+        sha, email, authored = parts
+        try:
+            authored = datetime.fromisoformat(authored)
+        except ValueError:
+            stats.malformed += 1
+            continue
+        day = timezone.localdate(authored) if timezone.is_aware(authored) else authored.date()
+        yield sha.lower(), email.strip().lower(), day
+
+
+def repository_lines(path, since=None, rev='HEAD', merges=False):
+    """Líneas de `git log` sobre un repositorio local, leídas del pipe sin esperar a que termine."""
+    command = ['git', '-C', str(path), 'log', f'--format={GIT_LOG_FORMAT}', rev]
+    if not merges:
+        command.insert(4, '--no-merges')
+    if since:
+        # --since filtra por fecha del committer, nunca anterior a la del autor: no descarta commits del rango
+        command.insert(4, f'--since={since.isoformat()}')
+    # stderr a un archivo: un pipe lleno bloquearía a git mientras se lee stdout
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True, encoding='utf-8', errors='replace')
+        with process:
+            try:
+                yield from process.stdout
+            except GeneratorExit:
+                # El consumidor se detuvo antes de tiempo (p. ej. por un error al insertar)
+                process.kill()
+                raise
+        if process.returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode('utf-8', 'replace').strip()
+            raise RuntimeError(message or f'git log terminó con código {process.returncode}')
+
+def commit_activities(commits, activity_type, stats, start=None, end=None):
+    """Actividades sin guardar para los commits de usuarios conocidos dentro de [start, end]."""
+    users = {email.lower(): pk for pk, email in User.objects.filter(is_active=True).values_list('pk', 'email')}
+    end = min(end, timezone.localdate()) if end else timezone.localdate()
+    for sha, email, day in commits:
+        if (start and day < start) or day > end:
+            stats.out_of_range += 1
+            continue
+        user_id = users.get(email)
+        if user_id is None:
+            stats.unknown_authors += 1
+            continue
+        yield Activity(activity_type=activity_type, user_id=user_id, date=day, evidence=sha)
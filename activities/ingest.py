@@ -0,0 +1,115 @@
+"""
+Alta masiva e idempotente de actividades.
+
+Las actividades se insertan por lotes con bulk_create(ignore_conflicts=True)
+(INSERT IGNORE en MySQL, ON CONFLICT DO NOTHING en SQLite): si ya existe una
+con el mismo usuario, tipo y huella de evidencia, la nueva se descarta en la
+base de datos, así que relanzar una importación o reintentar un lote no
+duplica puntos. Antes de insertar se descartan las que ya existen, vigentes o
+archivadas (una consulta por tabla), para no mandar al INSERT lotes enteros de
+repetidas: la restricción sólo protege cada tabla por separado.
+
+bulk_create no pasa por Activity.save ni emite post_save: aquí se hace por
+lote lo mismo que harían save() y las señales (registro de cambios, índice de
+acumulados, totales de equipo, versión de datos y activities_ingested).
+"""
+from dataclasses import dataclass
+from django.db import transaction
+from core.deferred import defer_batch
+from core.versioning import bump_data_version
+from .evidence import fingerprint
+from .models import Activity, ActivityChange, ActivityType, ArchivedActivity, DailyPoints
+from .models.change import CHANGE_FIELDS
+from .signals import activities_ingested
+from .totals import recompute_team_points
+from users.models.user import User
+
+
+@dataclass
+class IngestResult:
+    created: int = 0
+    duplicates: int = 0
+
+
+def _key(activity):
+    return activity.user_id, activity.activity_type_id, activity.evidence_fingerprint
+
+
+def ingest_activities(activities, batch_size=1000):
+    """
+    Inserta las actividades (instancias sin guardar; points vacío toma el
+    valor actual del tipo) en lotes de batch_size. Acepta cualquier iterable,
+    así que un generador se consume sin cargarlo entero en memoria.
+
+    Cada lote se confirma en su propia transacción: no se debe llamar dentro
+    de un transaction.atomic() externo, que retendría hasta el final el
+    bloqueo del registro de cambios (ActivityChange.lock_sequence).
+    """
+    result = IngestResult()
+    batch = []
+    for activity in activities:
+        batch.append(activity)
+        if len(batch) >= batch_size:
+            _ingest_batch(batch, result)
+            batch = []
+    if batch:
+        _ingest_batch(batch, result)
+    return result
+
+
+def _ingest_batch(batch, result):
+    # Precios de la base de datos, no de cached(): se guardan en cada actividad
+    prices = dict(ActivityType.objects.values_list('pk', 'points'))
+    pending, keys = [], set()
+    for activity in batch:
+        if activity.points is None:
+            activity.points = prices[activity.activity_type_id]
+        activity.evidence_fingerprint = fingerprint(activity.evidence)
+        key = _key(activity)
+        if activity.evidence_fingerprint and key in keys:
+            continue
+        keys.add(key)
+        pending.append(activity)
+
+    fingerprints = {key[2] for key in keys if key[2]}
+    if fingerprints:
+        existing = set()
+        for model in (Activity, ArchivedActivity):
+            existing.update(
+                model.objects.filter(user_id__in={key[0] for key in keys}, evidence_fingerprint__in=fingerprints)
+                .values_list('user_id', 'activity_type_id', 'evidence_fingerprint')
+            )
+        pending = [activity for activity in pending if _key(activity) not in existing]
+    result.duplicates += len(batch) - len(pending)
+    if not pending:
+        return
+
+    with transaction.atomic():
+        ActivityChange.lock_sequence()
+        Activity.objects.bulk_create(pending, ignore_conflicts=True)
+        # Con ignore_conflicts no se devuelven claves: las filas insertadas se reconocen por
+        # su created_at (asignado en bulk_create), distinto del de una inserción concurrente
+        stamps = {(*_key(a), a.created_at) for a in pending}
+        inserted = [
+            row for row in
+            Activity.objects.filter(
+                user_id__in={a.user_id for a in pending},
+                created_at__range=(min(a.created_at for a in pending), max(a.created_at for a in pending)),
+            ).order_by('id').values(*CHANGE_FIELDS, 'evidence_fingerprint', 'created_at')
+            if (row['user_id'], row['activity_type_id'], row['evidence_fingerprint'], row['created_at']) in stamps
+        ]
+        if inserted:
+            deltas = {}
+            for row in inserted:
+                points, count = deltas.get((row['user_id'], row['date']), (0, 0))
+                deltas[(row['user_id'], row['date'])] = (points + row['points'], count + 1)
+            DailyPoints.apply_bulk(deltas)
+
+            user_ids = {row['user_id'] for row in inserted}
+            team_ids = User.objects.filter(pk__in=user_ids, team__isnull=False).values_list('team_id', flat=True)
+            defer_batch('activities:team_points', recompute_team_points, list(team_ids), background=True)
+            activities_ingested.send(sender=Activity, dates={row['date'] for row in inserted}, user_ids=user_ids)
+            bump_data_version()
+            ActivityChange.record_bulk(ActivityChange.CREATE, inserted)
+    result.created += len(inserted)
+    result.duplicates += len(pending) - len(inserted)
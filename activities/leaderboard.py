@@ -0,0 +1,288 @@
+"""
+Ranking en memoria por periodo con posición, top N y vecinos en O(log n).
+
+Cada proceso mantiene un treap de estadísticas de orden por periodo activo
+(clave: fecha de inicio), con las claves (-puntos, user_id): el mismo orden
+que el ranking SQL. Se construye desde la base de datos la primera vez que se
+pide (o si se desalojó) y después se pone al día leyendo el registro de
+cambios de actividades: sólo se vuelven a sumar los usuarios que aparecen en
+cambios nuevos, así que cada proceso ve las escrituras de los demás.
+
+Los escritores del registro se serializan (ActivityChange.lock_sequence), así
+que los seq se hacen visibles en orden y basta con recordar el último aplicado.
+"""
+import random
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from .models import Activity, ActivityChange
+
+
+class _Node:
+    __slots__ = ('key', 'priority', 'left', 'right', 'size')
+
+    def __init__(self, key, priority):
+        self.key = key
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.size = 1
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node, key):
+    """Divide en (claves < key, claves >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Une dos treaps donde todas las claves de left son menores que las de right."""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class OrderStatisticTreap:
+    """Conjunto ordenado de claves únicas con rank/select en O(log n) esperado."""
+
+    def __init__(self, keys=()):
+        self.root = self._build(sorted(keys))
+
+    @staticmethod
+    def _build(keys):
+        # Árbol cartesiano en O(n) sobre claves ya ordenadas con prioridades aleatorias
+        stack = []
+        for key in keys:
+            node = _Node(key, random.random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        root = stack[0] if stack else None
+        if root is not None:
+            OrderStatisticTreap._fix_sizes(root)
+        return root
+
+    @staticmethod
+    def _fix_sizes(root):
+        # Tamaños de abajo arriba sin recursión
+        order, pending = [], [root]
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            pending.extend(child for child in (node.left, node.right) if child)
+        for node in reversed(order):
+            _update(node)
+
+    def __len__(self):
+        return _size(self.root)
+
+    def insert(self, key):
+        left, right = _split(self.root, key)
+        self.root = _merge(_merge(left, _Node(key, random.random())), right)
+
+    def remove(self, key):
+        left, right = _split(self.root, key)
+        if right is not None:
+            # El mínimo de right es key si existe: se quita del camino más a la izquierda
+            right = self._remove_min(right) if self._min(right) == key else right
+        self.root = _merge(left, right)
+
+    @staticmethod
+    def _min(node):
+        while node.left:
+            node = node.left
+        return node.key
+
+    @staticmethod
+    def _remove_min(node):
+        if node.left is None:
+            return node.right
+        path = []
+        while node.left is not None:
+            path.append(node)
+            node = node.left
+        path[-1].left = node.right
+        for parent in reversed(path):
+            _update(parent)
+        return path[0]
+
+    def rank(self, key):
+        """Número de claves menores que key."""
+        node, rank = self.root, 0
+        while node:
+            if key <= node.key:
+                node = node.left
+            else:
+                rank += _size(node.left) + 1
+                node = node.right
+        return rank
+
+    def select(self, index):
+        """Clave en la posición index (desde 0)."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        node = self.root
+        while True:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.key
+            else:
+                index -= left + 1
+                node = node.right
+
+    def slice(self, start, stop):
+        """Claves en las posiciones [start, stop): O(log n + k)."""
+        start, stop = max(start, 0), min(stop, len(self))
+        result, stack, node = [], [], self.root
+        # Baja hasta la posición start guardando los ancestros pendientes del recorrido en orden
+        index = start
+        while node:
+            left = _size(node.left)
+            if index < left:
+                stack.append(node)
+                node = node.left
+            elif index == left:
+                stack.append(node)
+                break
+            else:
+                index -= left + 1
+                node = node.right
+        while stack and len(result) < stop - start:
+            node = stack.pop()
+            result.append(node.key)
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+        return result
+
+
+class Leaderboard:
+    """Ranking de un periodo: puntos y actividades por usuario sobre un OrderStatisticTreap."""
+
+    def __init__(self, totals):
+        # totals: {user_id: (puntos, actividades)}
+        self.scores = {user_id: score for user_id, score in totals.items() if score[1]}
+        self.total_points = sum(points for points, _ in self.scores.values())
+        self.tree = OrderStatisticTreap((-points, user_id) for user_id, (points, _) in self.scores.items())
+
+    def __len__(self):
+        return len(self.tree)
+
+    def set(self, user_id, points, activities):
+        """Fija el total del usuario; sin actividades sale del ranking."""
+        previous = self.scores.pop(user_id, None)
+        if previous is not None:
+            self.tree.remove((-previous[0], user_id))
+            self.total_points -= previous[0]
+        if activities:
+            self.scores[user_id] = (points, activities)
+            self.tree.insert((-points, user_id))
+            self.total_points += points
+
+    def position(self, user_id):
+        """Posición (desde 1) del usuario o None si no tiene actividades en el periodo."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.tree.rank((-score[0], user_id)) + 1
+
+    def _rows(self, start, stop):
+        return [
+            {'position': start + offset + 1, 'user_id': user_id, 'points': -neg_points, 'activities': self.scores[user_id][1]}
+            for offset, (neg_points, user_id) in enumerate(self.tree.slice(start, stop))
+        ]
+
+    def top(self, n):
+        return self._rows(0, n)
+
+    def around(self, user_id, k):
+        """El usuario y hasta k posiciones por encima y por debajo."""
+        position = self.position(user_id)
+        if position is None:
+            return []
+        return self._rows(position - 1 - k, position + k)
+
+
+class _Board:
+    def __init__(self, start_date):
+        self.start_date = start_date
+        self.lock = threading.Lock()
+        self.seq = ActivityChange.objects.aggregate(seq=Max('seq'))['seq'] or 0
+        self.leaderboard = Leaderboard(_totals(start_date))
+
+    def catch_up(self):
+        changes = list(ActivityChange.objects.filter(seq__gt=self.seq).values_list('seq', 'payload'))
+        if not changes:
+            return
+        user_ids = set()
+        for _, payload in changes:
+            user_ids.add(payload['user_id'])
+            if payload.get('previous_user_id'):
+                user_ids.add(payload['previous_user_id'])
+        self.seq = changes[-1][0]
+        totals = _totals(self.start_date, user_ids)
+        for user_id in user_ids:
+            self.leaderboard.set(user_id, *totals.get(user_id, (0, 0)))
+
+
+def _totals(start_date, user_ids=None):
+    qs = Activity.objects.filter(date__gte=start_date)
+    if user_ids is not None:
+        qs = qs.filter(user_id__in=user_ids)
+    rows = qs.values_list('user_id').annotate(points=Sum('points'), activities=Count('id')).order_by()
+    return {user_id: (points or 0, activities) for user_id, points, activities in rows}
+
+
+_boards = OrderedDict()
+_boards_lock = threading.Lock()
+
+
+def get_leaderboard(start_date):
+    """Ranking de las actividades con fecha >= start_date, al día con el registro de cambios."""
+    with _boards_lock:
+        board = _boards.get(start_date)
+        if board is None:
+            board = _boards[start_date] = _Board(start_date)
+            while len(_boards) > settings.LEADERBOARD_MAX_BOARDS:
+                _boards.popitem(last=False)
+        else:
+            _boards.move_to_end(start_date)
+    with board.lock:
+        board.catch_up()
+    return board.leaderboard
+
+
+def clear():
+    with _boards_lock:
+        _boards.clear()
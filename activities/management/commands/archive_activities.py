@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from activities.archive import archivable_periods, archive_period, compact_period
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacta en rollups y mueve al archivo las actividades de quincenas cerradas '
+        'anteriores a la ventana de retención. Se puede interrumpir y relanzar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='Por defecto ACTIVITY_ARCHIVE_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Sólo lista los periodos que se archivarían')
+
+    def handle(self, *args, **options):
+        periods = archivable_periods(options['retention_days'])
+        if not periods:
+            self.stdout.write('No hay periodos para archivar.')
+            return
+
+        for period in periods:
+            if options['dry_run']:
+                self.stdout.write(f'Se archivaría: {period}')
+                continue
+            users = compact_period(period)
+            moved = 0
+            for moved in archive_period(period, batch_size=options['batch_size']):
+                self.stdout.write(f'{period}: {moved} actividades movidas...')
+            self.stdout.write(self.style.SUCCESS(
+                f'{period}: {users} rollups de usuario, {moved} actividades archivadas'
+            ))
@@ -0,0 +1,68 @@
+import random
+import sqlite3
+import time
+from django.core.management.base import BaseCommand
+from activities.leaderboard import Leaderboard
+
+RANKING_SQL = (
+    'SELECT user_id, SUM(points) AS total, COUNT(*) FROM activity WHERE date >= ? '
+    'GROUP BY user_id ORDER BY total DESC, user_id'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la posición, el top 5 y los vecinos de un usuario calculados como hoy '
+        '(agregación SQL ordenada + recorrido en Python) con el ranking en memoria. '
+        'Usa una base SQLite en memoria con datos sintéticos, no la del proyecto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--activities', type=int, default=5, help='Actividades por usuario en el periodo')
+        parser.add_argument('--lookups', type=int, default=200, help='Consultas medidas por método')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        for count in options['users']:
+            db = self._database(rng, count, options['activities'])
+            users = [rng.randrange(1, count + 1) for _ in range(options['lookups'])]
+
+            sql_lookups = max(1, min(options['lookups'], 20))
+            started = time.perf_counter()
+            for user_id in users[:sql_lookups]:
+                rows = db.execute(RANKING_SQL, (0,)).fetchall()
+                position = next(i for i, row in enumerate(rows, start=1) if row[0] == user_id)
+                top, around = rows[:5], rows[max(position - 6, 0):position + 5]
+            sql_ms = (time.perf_counter() - started) / sql_lookups * 1000
+
+            started = time.perf_counter()
+            board = Leaderboard({user_id: (points, activities) for user_id, points, activities in db.execute(RANKING_SQL, (0,))})
+            build_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for user_id in users:
+                position, top, around = board.position(user_id), board.top(5), board.around(user_id, 5)
+            tree_us = (time.perf_counter() - started) / len(users) * 1e6
+
+            started = time.perf_counter()
+            for user_id in users:
+                points, activities = board.scores[user_id]
+                board.set(user_id, points + 4, activities + 1)
+            update_us = (time.perf_counter() - started) / len(users) * 1e6
+
+            self.stdout.write(
+                f'{count} usuarios: SQL+Python {sql_ms:.1f} ms/consulta | '
+                f'en memoria {tree_us:.1f} µs/consulta, {update_us:.1f} µs/actualización, '
+                f'construcción {build_ms:.0f} ms'
+            )
+
+    def _database(self, rng, users, per_user):
+        db = sqlite3.connect(':memory:')
+        db.execute('CREATE TABLE activity (id INTEGER PRIMARY KEY, user_id INTEGER, date INTEGER, points INTEGER)')
+        db.execute('CREATE INDEX activity_date_user_pts_idx ON activity (date, user_id, points)')
+        db.executemany(
+            'INSERT INTO activity (user_id, date, points) VALUES (?, ?, ?)',
+            ((user_id, rng.randrange(14), rng.choice((1, 4, 16))) for user_id in range(1, users + 1) for _ in range(per_user)),
+        )
+        return db
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from activities import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Vuelve a crear el índice de texto completo de evidencia y notas (y sus triggers en SQLite) '
+        'y lo llena desde las actividades vigentes y archivadas.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with connection.schema_editor() as schema_editor:
+            search.install(schema_editor)
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice de búsqueda ({connection.vendor}) reconstruido en {time.perf_counter() - started:.2f}s'
+        ))
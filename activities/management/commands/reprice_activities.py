@@ -0,0 +1,90 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.versioning import bump_data_version
+from activities.models import Activity, ActivityChange, ActivityType, DailyPoints
+from activities.models.change import CHANGE_FIELDS
+from activities.totals import recompute_team_points
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula retroactivamente los puntos guardados en las actividades de un tipo. '
+        'Por defecto usa el valor actual de ActivityType.points.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('activity_type', help='Id o nombre exacto del tipo de actividad')
+        parser.add_argument('--points', type=int, help='Nuevo valor; también se guarda en el tipo de actividad')
+        parser.add_argument('--since', help='Sólo actividades desde esta fecha (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Sólo actividades hasta esta fecha (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Sólo muestra cuántas actividades cambiarían')
+
+    def handle(self, *args, **options):
+        activity_type = self._get_activity_type(options['activity_type'])
+        points = activity_type.points if options['points'] is None else options['points']
+
+        qs = Activity.objects.filter(activity_type=activity_type).exclude(points=points)
+        if options['since']:
+            qs = qs.filter(date__gte=self._parse_date(options['since']))
+        if options['until']:
+            qs = qs.filter(date__lte=self._parse_date(options['until']))
+
+        if options['dry_run']:
+            self.stdout.write(f'{qs.count()} actividades de "{activity_type}" pasarían a {points} puntos')
+            return
+
+        if options['points'] is not None and activity_type.points != points:
+            activity_type.points = points
+            activity_type.save(update_fields=['points'])
+
+        # Lotes por id ascendente: cada lote es una transacción corta y el comando se puede relanzar
+        updated = 0
+        team_ids = set()
+        last_id = 0
+        while True:
+            batch = list(
+                qs.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'user__team_id', 'user_id', 'date', 'points')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            ids = [row[0] for row in batch]
+            deltas = {}
+            for _, _, user_id, date, old_points in batch:
+                deltas[(user_id, date)] = (deltas.get((user_id, date), (0, 0))[0] + points - old_points, 0)
+            with transaction.atomic():
+                ActivityChange.lock_sequence()
+                updated += Activity.objects.filter(id__in=ids).update(points=points)
+                DailyPoints.apply(deltas)
+                ActivityChange.record_bulk(
+                    ActivityChange.UPDATE, Activity.objects.filter(id__in=ids).order_by('id').values(*CHANGE_FIELDS)
+                )
+            team_ids.update(row[1] for row in batch if row[1])
+            last_id = ids[-1]
+            self.stdout.write(f'{updated} actividades actualizadas...')
+
+        # Un único recálculo por equipo afectado al final, no por actividad
+        recompute_team_points(team_ids)
+        bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} actividades de "{activity_type}" ahora valen {points} puntos; '
+            f'{len(team_ids)} equipos recalculados'
+        ))
+
+    def _get_activity_type(self, value):
+        lookup = {'id': value} if value.isdigit() else {'name': value}
+        try:
+            return ActivityType.objects.get(**lookup)
+        except ActivityType.DoesNotExist:
+            raise CommandError(f'No existe el tipo de actividad "{value}"')
+        except ActivityType.MultipleObjectsReturned:
+            raise CommandError(f'Hay varios tipos llamados "{value}"; usa su id')
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {value}')
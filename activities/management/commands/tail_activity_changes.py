@@ -0,0 +1,31 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from activities.changes import changes_since, serialize
+
+
+class Command(BaseCommand):
+    help = 'Imprime como NDJSON los cambios de actividades posteriores a --since; con --follow sigue esperando nuevos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Último seq ya procesado')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--follow', action='store_true')
+        parser.add_argument('--interval', type=float, default=2.0, help='Segundos entre consultas con --follow')
+
+    def handle(self, *args, **options):
+        since = options['since']
+        while True:
+            changes, has_more = changes_since(since, options['batch_size'])
+            for change in changes:
+                self.stdout.write(json.dumps(serialize(change), ensure_ascii=False))
+            if changes:
+                since = changes[-1]['seq']
+            if has_more:
+                continue
+            if not options['follow']:
+                break
+            self.stdout.flush()
+            time.sleep(options['interval'])
+        # El último seq por stderr, para retomar con --since sin mezclarlo con los datos
+        self.stderr.write(f'since={since}')
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:48
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def categoria_por_nombre(name):
+    # Misma heurística que usaba dashboard.views.normalize_type_key
+    n = (name or '').strip().lower()
+    if 'commit' in n:
+        return 'commit'
+    if 'sprint' in n or 'review' in n:
+        return 'sprint'
+    if 'tempran' in n or 'puntual' in n:
+        return 'early'
+    if 'completar' in n or 'sistema' in n:
+        return 'system'
+    return slugify(n)[:30] or 'otros'
+
+
+def asignar_categorias(apps, schema_editor):
+    ActivityType = apps.get_model('activities', 'ActivityType')
+    for activity_type in ActivityType.objects.all():
+        activity_type.category = categoria_por_nombre(activity_type.name)
+        activity_type.save(update_fields=['category'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0003_cargar_datos_iniciales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitytype',
+            name='category',
+            field=models.SlugField(default='otros', help_text='Agrupa los puntos en el dashboard (commit, sprint, early, system u otra nueva)', max_length=30),
+        ),
+        migrations.RunPython(asignar_categorias, migrations.RunPython.noop),
+    ]
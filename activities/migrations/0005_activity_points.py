@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def copiar_puntos_del_tipo(apps, schema_editor):
+    Activity = apps.get_model('activities', 'Activity')
+    ActivityType = apps.get_model('activities', 'ActivityType')
+    type_points = Subquery(ActivityType.objects.filter(pk=OuterRef('activity_type_id')).values('points')[:1])
+
+    # Por rangos de id para no bloquear toda la tabla en una sola sentencia
+    last_id = Activity.objects.aggregate(models.Max('id'))['id__max'] or 0
+    for start in range(0, last_id, BATCH_SIZE):
+        Activity.objects.filter(id__gt=start, id__lte=start + BATCH_SIZE).update(points=type_points)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_activitytype_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='points',
+            field=models.IntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_puntos_del_tipo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['date', 'user', 'points'], name='activity_date_user_pts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', 'date', 'points'], name='activity_user_date_pts_idx'),
+        ),
+    ]
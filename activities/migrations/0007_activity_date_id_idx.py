@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0006_activity_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['-date', '-id'], name='activity_date_id_idx'),
+        ),
+    ]
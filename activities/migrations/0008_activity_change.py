@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0007_activity_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('activity_id', models.BigIntegerField(db_index=True)),
+                ('operation', models.CharField(choices=[('create', 'Alta'), ('update', 'Modificación'), ('delete', 'Baja')], max_length=10)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['seq'],
+            },
+        ),
+    ]
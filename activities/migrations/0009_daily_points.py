@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 1000
+
+
+def construir_indice(apps, schema_editor):
+    DailyPoints = apps.get_model('activities', 'DailyPoints')
+    days = {}
+    for name in ('Activity', 'ArchivedActivity'):
+        model = apps.get_model('activities', name)
+        rows = model.objects.values_list('user_id', 'date').annotate(points=Sum('points'), activities=Count('id')).order_by()
+        for user_id, date, points, activities in rows:
+            current = days.setdefault((user_id, date), [0, 0])
+            current[0] += points or 0
+            current[1] += activities
+
+    entries = []
+    last_user, cumulative = None, (0, 0)
+    for (user_id, date), (points, activities) in sorted(days.items()):
+        if user_id != last_user:
+            last_user, cumulative = user_id, (0, 0)
+        cumulative = (cumulative[0] + points, cumulative[1] + activities)
+        entries.append(DailyPoints(
+            user_id=user_id, date=date, points=points, activities=activities,
+            cumulative_points=cumulative[0], cumulative_activities=cumulative[1],
+        ))
+    DailyPoints.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0008_activity_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPoints',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('points', models.IntegerField(default=0)),
+                ('activities', models.IntegerField(default=0)),
+                ('cumulative_points', models.IntegerField(default=0)),
+                ('cumulative_activities', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='daily_points_user_date_uniq')],
+            },
+        ),
+        migrations.RunPython(construir_indice, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:31
+
+import hashlib
+import re
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Copia de activities.evidence tal como estaba al crear la migración: la huella
+# calculada aquí no debe cambiar si el módulo evoluciona
+_COMMIT_URL = re.compile(r'/commits?/([0-9a-f]{7,40})(?=[/?#.]|$)')
+_COMMIT_HASH = re.compile(r'[0-9a-f]{7,40}')
+_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://')
+
+
+def normalize(evidence):
+    value = (evidence or '').strip().lower()
+    if not value or _COMMIT_HASH.fullmatch(value):
+        return value
+    match = _COMMIT_URL.search(value)
+    if match:
+        return match.group(1)
+    value = _SCHEME.sub('', value)
+    if value.startswith('www.'):
+        value = value[4:]
+    return value.split('#', 1)[0].rstrip('/')
+
+
+def fingerprint(evidence):
+    value = normalize(evidence)
+    if not value:
+        return None
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def calcular_huellas(apps, schema_editor):
+    # Duplicados previos: la huella queda sólo en la actividad más antigua, las demás se conservan sin huella
+    Activity = apps.get_model('activities', 'Activity')
+    seen = set()
+    last_id = 0
+    while True:
+        batch = list(
+            Activity.objects.filter(id__gt=last_id).exclude(evidence__isnull=True).exclude(evidence='')
+            .order_by('id').values_list('id', 'user_id', 'activity_type_id', 'evidence')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        updates = []
+        for pk, user_id, type_id, evidence in batch:
+            value = fingerprint(evidence)
+            if value and (user_id, type_id, value) not in seen:
+                seen.add((user_id, type_id, value))
+                updates.append(Activity(id=pk, evidence_fingerprint=value))
+        Activity.objects.bulk_update(updates, ['evidence_fingerprint'])
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0009_daily_points'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='evidence_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(calcular_huellas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(fields=('user', 'activity_type', 'evidence_fingerprint'), name='activity_evidence_uniq'),
+        ),
+    ]
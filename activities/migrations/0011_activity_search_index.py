@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Copia del SQL de activities.search tal como estaba al crear la migración
+TABLES = ('activities_activity', 'activities_archivedactivity')
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "evidence, note, content='{table}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='4')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF id, evidence, note ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS {fts}_ai',
+    'DROP TRIGGER IF EXISTS {fts}_ad',
+    'DROP TRIGGER IF EXISTS {fts}_au',
+    'DROP TABLE IF EXISTS {fts}',
+]
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'sqlite':
+            fts = f'{table}_fts'
+            for sql in SQLITE_INSTALL:
+                schema_editor.execute(sql.format(fts=fts, table=table))
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif vendor == 'mysql':
+            index = f'{table}_fulltext'
+            with schema_editor.connection.cursor() as cursor:
+                constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+            if index not in constraints:
+                schema_editor.execute(f'ALTER TABLE `{table}` ADD FULLTEXT INDEX `{index}` (`evidence`, `note`)')
+
+
+def borrar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'sqlite':
+            for sql in SQLITE_UNINSTALL:
+                schema_editor.execute(sql.format(fts=f'{table}_fts'))
+        elif vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE `{table}` DROP INDEX `{table}_fulltext`')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0010_activity_evidence_fingerprint'),
+    ]
+
+    # Índices de texto propios de cada motor (FTS5 con triggers en SQLite, FULLTEXT en MySQL)
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:10
+
+import hashlib
+import re
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+TABLE = 'activities_archivedactivity'
+
+# Copia de activities.evidence tal como estaba al crear la migración
+_COMMIT_URL = re.compile(r'/commits?/([0-9a-f]{7,40})(?=[/?#.]|$)')
+_COMMIT_HASH = re.compile(r'[0-9a-f]{7,40}')
+_SCHEME = re.compile(r'^[a-z][a-z0-9+.-]*://')
+
+# Copia de los triggers de 0011: en SQLite añadir la restricción rehace la tabla y los borra
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF id, evidence, note ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+]
+
+
+def normalize(evidence):
+    value = (evidence or '').strip().lower()
+    if not value or _COMMIT_HASH.fullmatch(value):
+        return value
+    match = _COMMIT_URL.search(value)
+    if match:
+        return match.group(1)
+    value = _SCHEME.sub('', value)
+    if value.startswith('www.'):
+        value = value[4:]
+    return value.split('#', 1)[0].rstrip('/')
+
+
+def fingerprint(evidence):
+    value = normalize(evidence)
+    if not value:
+        return None
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def calcular_huellas(apps, schema_editor):
+    # Como en 0010: ante duplicados previos la huella queda sólo en la actividad más antigua
+    ArchivedActivity = apps.get_model('activities', 'ArchivedActivity')
+    seen = set()
+    last_id = 0
+    while True:
+        batch = list(
+            ArchivedActivity.objects.filter(id__gt=last_id).exclude(evidence__isnull=True).exclude(evidence='')
+            .order_by('id').values_list('id', 'user_id', 'activity_type_id', 'evidence')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        updates = []
+        for pk, user_id, type_id, evidence in batch:
+            value = fingerprint(evidence)
+            if value and (user_id, type_id, value) not in seen:
+                seen.add((user_id, type_id, value))
+                updates.append(ArchivedActivity(id=pk, evidence_fingerprint=value))
+        ArchivedActivity.objects.bulk_update(updates, ['evidence_fingerprint'])
+        last_id = batch[-1][0]
+
+
+def restaurar_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql.format(fts=f'{TABLE}_fts', table=TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0011_activity_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Al revertir, RemoveConstraint y RemoveField también rehacen la tabla
+        migrations.RunPython(migrations.RunPython.noop, restaurar_triggers),
+        migrations.AddField(
+            model_name='archivedactivity',
+            name='evidence_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(calcular_huellas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='archivedactivity',
+            constraint=models.UniqueConstraint(fields=('user', 'activity_type', 'evidence_fingerprint'), name='archived_evidence_uniq'),
+        ),
+        migrations.RunPython(restaurar_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:05
+
+import time
+from django.db import migrations
+
+
+def crear_secuencia(apps, schema_editor):
+    # Con la fila ya creada, lock_sequence() siempre bloquea con un UPDATE
+    VersionStamp = apps.get_model('core', 'VersionStamp')
+    VersionStamp.objects.get_or_create(name='activities:changes', defaults={'value': time.time()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0012_archived_evidence_fingerprint'),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_secuencia, migrations.RunPython.noop),
+    ]
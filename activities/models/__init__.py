@@ -1,2 +1,5 @@
 from .activity_type import ActivityType
-from .activity import Activity
\ No newline at end of file
+from .activity import Activity
+from .archive import ArchivedActivity, ActivityRollup
+from .change import ActivityChange
+from .daily_points import DailyPoints
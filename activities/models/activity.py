@@ -1,15 +1,87 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
 from users.models.user import User
+from ..evidence import fingerprint
 from .activity_type import ActivityType
+from .archive import ArchivedActivity
+from .change import ActivityChange
+from .daily_points import DailyPoints
 
 class Activity(models.Model):
     activity_type = models.ForeignKey(ActivityType, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
+    # Puntos otorgados al registrar la actividad; cambiar ActivityType.points no reescribe el historial
+    points = models.IntegerField(blank=True)
     evidence = models.CharField(max_length=255, blank=True, null=True)
+    # Huella normalizada de evidence (activities.evidence): una misma evidencia no puntúa dos veces
+    evidence_fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
     note = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # NULL (sin evidencia) no choca: sólo se deduplican actividades con evidencia
+            models.UniqueConstraint(
+                fields=['user', 'activity_type', 'evidence_fingerprint'], name='activity_evidence_uniq',
+            ),
+        ]
+        indexes = [
+            # SUM(points) por rango de fechas y usuario sin leer la tabla (index-only)
+            models.Index(fields=['date', 'user', 'points'], name='activity_date_user_pts_idx'),
+            models.Index(fields=['user', 'date', 'points'], name='activity_user_date_pts_idx'),
+            # Feed de actividades: paginación por cursor sobre (-date, -id)
+            models.Index(fields=['-date', '-id'], name='activity_date_id_idx'),
+        ]
+
     def __str__(self):
-        return f'{self.activity_type.name} by {self.user.name}'
\ No newline at end of file
+        return f'{self.activity_type.name} by {self.user.name}'
+
+    def clean(self):
+        super().clean()
+        # evidence_fingerprint no es editable, así que validate_constraints no revisa activity_evidence_uniq
+        self.evidence_fingerprint = fingerprint(self.evidence)
+        if self.evidence_fingerprint and self.user_id and self.activity_type_id:
+            duplicates = Activity.objects.filter(
+                user_id=self.user_id, activity_type_id=self.activity_type_id,
+                evidence_fingerprint=self.evidence_fingerprint,
+            ).exclude(pk=self.pk)
+            if duplicates.exists() or self._archived_duplicate():
+                raise ValidationError({'evidence': 'Esta evidencia ya está registrada para este usuario y tipo de actividad'})
+
+    def _archived_duplicate(self):
+        # activity_evidence_uniq sólo cubre la tabla vigente; el archivo tiene su propia restricción
+        return bool(self.evidence_fingerprint) and ArchivedActivity.objects.filter(
+            user_id=self.user_id, activity_type_id=self.activity_type_id,
+            evidence_fingerprint=self.evidence_fingerprint,
+        ).exclude(pk=self.pk).exists()
+
+    def save(self, *args, **kwargs):
+        if self.points is None:
+            # De la base de datos, no de self.activity_type: puede venir de ActivityType.objects.cached()
+            # con un valor viejo y estos puntos quedan guardados para siempre
+            self.points = ActivityType.objects.filter(pk=self.activity_type_id).values_list('points', flat=True).get()
+        self.evidence_fingerprint = fingerprint(self.evidence)
+        if self._archived_duplicate():
+            raise IntegrityError('activity_evidence_uniq: la evidencia ya está en una actividad archivada')
+        # El registro de cambios y el índice de acumulados se confirman (o se revierten) junto con la actividad
+        with transaction.atomic():
+            ActivityChange.lock_sequence()
+            deltas = {}
+            previous_user_id = None
+            if self._state.adding:
+                operation = ActivityChange.CREATE
+            else:
+                operation = ActivityChange.UPDATE
+                previous = Activity.objects.filter(pk=self.pk).values_list('user_id', 'date', 'points').first()
+                if previous:
+                    deltas[previous[:2]] = (-previous[2], -1)
+                    if previous[0] != self.user_id:
+                        previous_user_id = previous[0]
+            super().save(*args, **kwargs)
+            ActivityChange.record(operation, self, previous_user_id=previous_user_id)
+            key = (self.user_id, self.date)
+            points, activities = deltas.get(key, (0, 0))
+            deltas[key] = (points + self.points, activities + 1)
+            DailyPoints.apply(deltas)
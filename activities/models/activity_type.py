@@ -1,8 +1,39 @@
 from django.db import models
+from core.refdata import ReferenceDataManager
 
 class ActivityType(models.Model):
+    # Categorías conocidas por el dashboard; desde el admin se pueden usar otras nuevas
+    COMMIT = 'commit'
+    SPRINT = 'sprint'
+    EARLY = 'early'
+    SYSTEM = 'system'
+    OTHER = 'otros'
+    CATEGORY_LABELS = {
+        COMMIT: 'Commit válido',
+        SPRINT: 'Sprint Review',
+        EARLY: 'Llegar temprano',
+        SYSTEM: 'Completar sistema',
+    }
+
     name = models.CharField(max_length=100)
     points = models.IntegerField()
+    category = models.SlugField(
+        max_length=30,
+        default=OTHER,
+        help_text='Agrupa los puntos en el dashboard (commit, sprint, early, system u otra nueva)',
+    )
+
+    objects = ReferenceDataManager(ordering=('id',))
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @classmethod
+    def category_label(cls, category):
+        return cls.CATEGORY_LABELS.get(category) or category.replace('-', ' ').capitalize()
+
+    @classmethod
+    def category_sort_key(cls, category):
+        """Primero las categorías conocidas en su orden habitual y después el resto alfabéticamente."""
+        known = list(cls.CATEGORY_LABELS)
+        return (known.index(category), '') if category in known else (len(known), category)
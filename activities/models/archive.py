@@ -0,0 +1,44 @@
+from django.db import models
+from users.models.user import User
+from .activity_type import ActivityType
+
+class ArchivedActivity(models.Model):
+    """Actividad de un periodo cerrado movida fuera de la tabla principal; conserva su id original."""
+    id = models.BigIntegerField(primary_key=True)
+    activity_type = models.ForeignKey(ActivityType, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    points = models.IntegerField()
+    evidence = models.CharField(max_length=255, blank=True, null=True)
+    # Se copia de Activity: una evidencia archivada tampoco puede volver a puntuar
+    evidence_fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
+    note = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'activity_type', 'evidence_fingerprint'], name='archived_evidence_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'user', 'points'], name='archived_date_user_pts_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.activity_type.name} by {self.user.name} (archivada)'
+
+class ActivityRollup(models.Model):
+    """Totales por usuario de un periodo archivado: mantienen exactos rankings y totales de equipo."""
+    period = models.ForeignKey('reports.Period', on_delete=models.PROTECT)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    points = models.IntegerField(default=0)
+    activities = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('period', 'user')
+
+    def __str__(self):
+        return f'{self.user.name} - {self.points} pts en {self.period}'
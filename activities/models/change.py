@@ -0,0 +1,78 @@
+from django.db import models
+from core.models import VersionStamp
+
+CHANGE_FIELDS = ('id', 'activity_type_id', 'user_id', 'date', 'points', 'evidence', 'note')
+# Fila de core.VersionStamp que serializa a quienes escriben en el registro
+SEQUENCE = 'activities:changes'
+
+
+class ActivityChange(models.Model):
+    """
+    Registro append-only (outbox) de altas, cambios y bajas de actividades. Se
+    escribe en la misma transacción que el cambio, así que un consumidor que
+    lee por seq nunca ve un cambio que luego se revirtió.
+
+    seq se asigna al insertar, pero toda transacción que escribe aquí toma
+    antes lock_sequence() y lo conserva hasta el commit: ninguna otra puede
+    insertar mientras tanto, así que los seq visibles siguen el orden de
+    confirmación y un seq menor nunca aparece después de uno mayor. Puede haber
+    huecos (los seq de transacciones revertidas no se reutilizan).
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OPERATIONS = [
+        (CREATE, 'Alta'),
+        (UPDATE, 'Modificación'),
+        (DELETE, 'Baja'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    # Sin FK: el registro sobrevive al borrado de la actividad
+    activity_id = models.BigIntegerField(db_index=True)
+    operation = models.CharField(max_length=10, choices=OPERATIONS)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+
+    def __str__(self):
+        return f'#{self.seq} {self.operation} actividad {self.activity_id}'
+
+    @classmethod
+    def snapshot(cls, values):
+        """Payload serializable a partir de una instancia o de un dict de values()."""
+        get = values.get if isinstance(values, dict) else lambda field: getattr(values, field)
+        payload = {field: get(field) for field in CHANGE_FIELDS}
+        payload['date'] = str(payload['date'])
+        return payload
+
+    @classmethod
+    def lock_sequence(cls):
+        """
+        Bloquea la fila de secuencia hasta el fin de la transacción. Se llama
+        antes de la primera escritura (actividades, acumulados o registro) para
+        que todos los escritores tomen los bloqueos en el mismo orden.
+        """
+        VersionStamp.bump(SEQUENCE)
+
+    @classmethod
+    def record(cls, operation, activity, previous_user_id=None):
+        """Dentro de una transacción que ya tomó lock_sequence()."""
+        payload = cls.snapshot(activity)
+        if previous_user_id is not None:
+            # La actividad cambió de usuario: los consumidores deben recalcular también al anterior
+            payload['previous_user_id'] = previous_user_id
+        return cls.objects.create(activity_id=activity.pk, operation=operation, payload=payload)
+
+    @classmethod
+    def record_bulk(cls, operation, rows):
+        """
+        Para actualizaciones masivas (update()) que no pasan por Activity.save:
+        rows son dicts de values(*CHANGE_FIELDS). Como record(), dentro de una
+        transacción que ya tomó lock_sequence().
+        """
+        cls.objects.bulk_create([
+            cls(activity_id=row['id'], operation=operation, payload=cls.snapshot(row)) for row in rows
+        ])
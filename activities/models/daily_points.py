@@ -0,0 +1,150 @@
+from django.db import connections, models, router, transaction
+from django.db.models import F, OuterRef, Subquery
+from users.models.user import User
+
+
+class DailyPoints(models.Model):
+    """
+    Índice de sumas acumuladas: una fila por usuario y día con actividad, con
+    los puntos de ese día y el acumulado hasta ese día incluido (actividades
+    vigentes y archivadas). El total de cualquier rango es la diferencia de dos
+    acumulados. Se mantiene en la misma transacción que cada escritura de
+    Activity; `rebuild_points_index` lo reconstruye desde cero.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    points = models.IntegerField(default=0)
+    activities = models.IntegerField(default=0)
+    cumulative_points = models.IntegerField(default=0)
+    cumulative_activities = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También es el índice de las búsquedas "último acumulado <= fecha" por usuario
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_points_user_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.date}: {self.cumulative_points} pts acumulados'
+
+    @staticmethod
+    def _lock_users(user_ids):
+        # Quien escribe el índice de un usuario bloquea antes su fila, siempre en orden de pk: dos
+        # transacciones que insertan el mismo (usuario, día) nuevo se esperan en vez de chocar en el
+        # INSERT (IntegrityError) o interbloquearse en los huecos del índice
+        list(User.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        Aplica {(user_id, fecha): (puntos, actividades)}: suma el delta al día y
+        a los acumulados de ese día en adelante. Un alta de hoy toca una fila;
+        una actividad retroactiva, además, los días posteriores del usuario.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1]}
+        if not deltas:
+            return
+        with transaction.atomic(savepoint=False):
+            cls._lock_users({user_id for user_id, _ in deltas})
+            for (user_id, date), (points, activities) in sorted(deltas.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+                cls._apply_day(user_id, date, points, activities)
+
+    @classmethod
+    def _apply_day(cls, user_id, date, points, activities):
+        rows = cls.objects.filter(user_id=user_id)
+        # El UPDATE por rango también bloquea el hueco (user, >= date) en InnoDB
+        rows.filter(date__gte=date).update(
+            cumulative_points=F('cumulative_points') + points,
+            cumulative_activities=F('cumulative_activities') + activities,
+        )
+        if rows.filter(date=date).update(points=F('points') + points, activities=F('activities') + activities):
+            if activities < 0:
+                rows.filter(date=date, activities__lte=0).delete()
+            return
+        if activities < 0:
+            # Nada que descontar: p. ej. el usuario se está borrando y su índice ya no existe
+            return
+        previous = rows.filter(date__lt=date).order_by('-date').values_list(
+            'cumulative_points', 'cumulative_activities'
+        ).first() or (0, 0)
+        cls.objects.create(
+            user_id=user_id, date=date, points=points, activities=activities,
+            cumulative_points=previous[0] + points, cumulative_activities=previous[1] + activities,
+        )
+
+    @classmethod
+    def apply_bulk(cls, deltas, batch_size=1000):
+        """
+        Como apply, para lotes grandes (altas masivas): en vez de dos o tres
+        UPDATE por (usuario, día), lee bloqueadas las filas de esos usuarios
+        desde el día más antiguo del lote, rehace los acumulados en memoria y
+        escribe las filas cambiadas con un UPDATE por clave en executemany, las
+        nuevas con bulk_create y borra las que se quedan sin actividades. Debe
+        llamarse en una transacción.
+        """
+        by_user = {}
+        for (user_id, date), (points, activities) in deltas.items():
+            if points or activities:
+                by_user.setdefault(user_id, {})[date] = (points, activities)
+        if not by_user:
+            return
+        # Todo por la conexión de escritura: las lecturas deben ver las filas que se bloquean y se reescriben
+        db = router.db_for_write(cls)
+        cls._lock_users(by_user)
+        start = min(date for days in by_user.values() for date in days)
+        existing, original = {}, {}
+        for row in cls.objects.using(db).select_for_update().filter(user_id__in=by_user, date__gte=start).order_by('user_id', 'date'):
+            existing.setdefault(row.user_id, []).append(row)
+            original[row.pk] = (row.points, row.activities, row.cumulative_points, row.cumulative_activities)
+        previous = User.objects.using(db).filter(pk__in=by_user).annotate(
+            cumulative_points=Subquery(
+                cls.objects.filter(user=OuterRef('pk'), date__lt=start).order_by('-date').values('cumulative_points')[:1]
+            ),
+            cumulative_activities=Subquery(
+                cls.objects.filter(user=OuterRef('pk'), date__lt=start).order_by('-date').values('cumulative_activities')[:1]
+            ),
+        ).values_list('pk', 'cumulative_points', 'cumulative_activities')
+        base = {pk: (points or 0, activities or 0) for pk, points, activities in previous}
+
+        changed, created, deleted = [], [], []
+        for user_id, days in by_user.items():
+            rows = {row.date: row for row in existing.get(user_id, [])}
+            for date, (points, activities) in days.items():
+                row = rows.get(date)
+                if row is None:
+                    if activities < 0:
+                        continue
+                    row = rows[date] = cls(user_id=user_id, date=date)
+                    created.append(row)
+                row.points += points
+                row.activities += activities
+            cumulative_points, cumulative_activities = base.get(user_id, (0, 0))
+            for date in sorted(rows):
+                row = rows[date]
+                if row.activities <= 0:
+                    if row.pk:
+                        deleted.append(row.pk)
+                    continue
+                cumulative_points += row.points
+                cumulative_activities += row.activities
+                row.cumulative_points, row.cumulative_activities = cumulative_points, cumulative_activities
+                if row.pk and original[row.pk] != (row.points, row.activities, cumulative_points, cumulative_activities):
+                    changed.append(row)
+
+        if changed:
+            # executemany de un UPDATE por clave: bulk_update arma un CASE por fila y campo, mucho más lento.
+            connection = connections[db]
+            quote = connection.ops.quote_name
+            fields = ('points', 'activities', 'cumulative_points', 'cumulative_activities')
+            sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+                quote(cls._meta.db_table), ', '.join(f'{quote(cls._meta.get_field(field).column)} = %s' for field in fields),
+                quote(cls._meta.pk.column),
+            )
+            with connection.cursor() as cursor:
+                for i in range(0, len(changed), batch_size):
+                    cursor.executemany(sql, [
+                        [getattr(row, field) for field in fields] + [row.pk] for row in changed[i:i + batch_size]
+                    ])
+        cls.objects.using(db).bulk_create([row for row in created if row.activities > 0], batch_size=batch_size)
+        if deleted:
+            cls.objects.using(db).filter(pk__in=deleted).delete()
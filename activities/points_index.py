@@ -0,0 +1,90 @@
+"""
+Consultas de puntos por rango sobre el índice de acumulados (DailyPoints).
+
+El total de un usuario entre start y end es acumulado(<= end) - acumulado(< start):
+dos búsquedas por (user, date) en vez de sumar sus actividades. El ranking de
+cualquier rango es una consulta sobre usuarios con esas dos búsquedas como
+subconsultas correlacionadas sobre el mismo índice.
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from users.models.user import User
+from .models import Activity, ArchivedActivity, DailyPoints
+
+
+def _cumulative(user_ref, before=None, until=None, field='cumulative_points'):
+    rows = DailyPoints.objects.filter(user=user_ref)
+    if before is not None:
+        rows = rows.filter(date__lt=before)
+    if until is not None:
+        rows = rows.filter(date__lte=until)
+    return Coalesce(Subquery(rows.order_by('-date').values(field)[:1]), Value(0), output_field=IntegerField())
+
+
+def user_total(user_id, start=None, end=None):
+    """Puntos del usuario entre start y end (ambos incluidos; None = sin límite)."""
+    rows = DailyPoints.objects.filter(user_id=user_id).order_by('-date').values_list('cumulative_points', flat=True)
+    until = (rows.filter(date__lte=end) if end is not None else rows).first() or 0
+    if start is None:
+        return until
+    return until - (rows.filter(date__lt=start).first() or 0)
+
+
+def leaderboard(start=None, end=None, limit=None):
+    """
+    Ranking del rango: dicts con user_id, name, team, points y activities,
+    ordenados por puntos. Con start=None es el ranking "a fecha de" end.
+    """
+    users = User.objects.annotate(
+        points=_cumulative(OuterRef('pk'), until=end) - (
+            _cumulative(OuterRef('pk'), before=start) if start is not None else Value(0)
+        ),
+        activities=_cumulative(OuterRef('pk'), until=end, field='cumulative_activities') - (
+            _cumulative(OuterRef('pk'), before=start, field='cumulative_activities') if start is not None else Value(0)
+        ),
+    ).filter(activities__gt=0).order_by('-points', 'pk')
+    rows = users.values('pk', 'name', 'team__name', 'points', 'activities')
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        {
+            'user_id': row['pk'],
+            'name': row['name'],
+            'team': row['team__name'] or 'Sin equipo',
+            'points': row['points'],
+            'activities': row['activities'],
+        }
+        for row in rows
+    ]
+
+
+def rebuild(batch_size=1000):
+    """Reconstruye el índice completo desde las actividades vigentes y archivadas. Devuelve las filas creadas."""
+    with transaction.atomic():
+        entries = _build_entries()
+        DailyPoints.objects.all().delete()
+        DailyPoints.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries)
+
+
+def _build_entries():
+    days = {}
+    for model in (Activity, ArchivedActivity):
+        rows = model.objects.values_list('user_id', 'date').annotate(points=Sum('points'), activities=Count('id')).order_by()
+        for user_id, date, points, activities in rows:
+            current = days.setdefault((user_id, date), [0, 0])
+            current[0] += points or 0
+            current[1] += activities
+
+    entries = []
+    last_user, cumulative = None, [0, 0]
+    for (user_id, date), (points, activities) in sorted(days.items()):
+        if user_id != last_user:
+            last_user, cumulative = user_id, [0, 0]
+        cumulative = [cumulative[0] + points, cumulative[1] + activities]
+        entries.append(DailyPoints(
+            user_id=user_id, date=date, points=points, activities=activities,
+            cumulative_points=cumulative[0], cumulative_activities=cumulative[1],
+        ))
+    return entries
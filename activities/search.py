@@ -0,0 +1,110 @@
+"""
+Búsqueda de texto completo sobre evidence y note de las actividades.
+
+Cada tabla de actividades (vigentes y archivo) tiene un índice de texto del
+motor de base de datos, mantenido por el propio motor en cada escritura:
+
+- SQLite (desarrollo y CI): una tabla virtual FTS5 de contenido externo por
+  tabla, sincronizada con triggers de INSERT, UPDATE y DELETE.
+- MySQL (producción): un índice FULLTEXT (evidence, note) consultado en modo
+  booleano.
+
+La consulta del usuario se parte en palabras y cada una se busca como
+prefijo (un hash abreviado encuentra el completo); todas deben aparecer.
+Nunca se pasa la sintaxis del usuario al motor. En otros motores se recurre
+a icontains.
+
+Las migraciones que rehacen la tabla en SQLite (p. ej. cambiar una columna)
+borran sus triggers: `rebuild_search_index` los vuelve a crear y reindexa.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+MAX_TERMS = 8
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+FTS_TABLE = '{table}_fts'
+FULLTEXT_INDEX = '{table}_fulltext'
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+    "evidence, note, content='{table}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='4')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF id, evidence, note ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, evidence, note) VALUES ('delete', old.id, old.evidence, old.note); "
+    "INSERT INTO {fts}(rowid, evidence, note) VALUES (new.id, new.evidence, new.note); END",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS {fts}_ai',
+    'DROP TRIGGER IF EXISTS {fts}_ad',
+    'DROP TRIGGER IF EXISTS {fts}_au',
+    'DROP TABLE IF EXISTS {fts}',
+]
+
+
+def _models():
+    from .models import Activity, ArchivedActivity
+    return Activity, ArchivedActivity
+
+
+def install(schema_editor, rebuild=True):
+    """Crea índices (y triggers en SQLite) para las tablas de actividades y, si se pide, los llena."""
+    vendor = schema_editor.connection.vendor
+    for table in _tables():
+        if vendor == 'sqlite':
+            fts = FTS_TABLE.format(table=table)
+            for sql in SQLITE_INSTALL:
+                schema_editor.execute(sql.format(fts=fts, table=table))
+            if rebuild:
+                schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif vendor == 'mysql':
+            index = FULLTEXT_INDEX.format(table=table)
+            with schema_editor.connection.cursor() as cursor:
+                constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+            if index not in constraints:
+                schema_editor.execute(f'ALTER TABLE `{table}` ADD FULLTEXT INDEX `{index}` (`evidence`, `note`)')
+
+
+def uninstall(schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in _tables():
+        if vendor == 'sqlite':
+            for sql in SQLITE_UNINSTALL:
+                schema_editor.execute(sql.format(fts=FTS_TABLE.format(table=table)))
+        elif vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE `{table}` DROP INDEX `{FULLTEXT_INDEX.format(table=table)}`')
+
+
+def _tables():
+    return [model._meta.db_table for model in _models()]
+
+
+def terms(query):
+    return _WORD.findall(query or '')[:MAX_TERMS]
+
+
+def filter_queryset(qs, query):
+    """Restringe qs (de Activity o ArchivedActivity) a las filas cuyo evidence o note contienen todas las palabras."""
+    words = terms(query)
+    if not words:
+        return qs
+    table = qs.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        fts = FTS_TABLE.format(table=table)
+        # Cada palabra entre comillas (sin operadores FTS5) y como prefijo
+        match = ' '.join('"{}"*'.format(word.replace('"', '')) for word in words)
+        return qs.filter(pk__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match]))
+    if connection.vendor == 'mysql':
+        match = ' '.join(f'+{word}*' for word in words)
+        return qs.filter(pk__in=RawSQL(
+            f'SELECT `id` FROM `{table}` WHERE MATCH (`evidence`, `note`) AGAINST (%s IN BOOLEAN MODE)', [match],
+        ))
+    for word in words:
+        qs = qs.filter(Q(evidence__icontains=word) | Q(note__icontains=word))
+    return qs
@@ -1,22 +1,45 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import Signal, receiver
+from core import metrics
+from core.deferred import defer_batch
+from core.versioning import bump_data_version
 from .models.activity import Activity
-from teams.models import Team
-from django.db.models import Sum
+from .models.activity_type import ActivityType
+from .models.change import ActivityChange
+from .models.daily_points import DailyPoints
+from .totals import recompute_team_points
+
+# Alta masiva (activities.ingest) sin post_save por actividad: argumentos dates y user_ids
+activities_ingested = Signal()
 
 def update_team_points(team):
+    """Recalcula el total del equipo tras el commit; varios guardados en una transacción se agrupan."""
     if not team:
         return
-    total = Activity.objects.filter(user__team=team).aggregate(
-        total=Sum('activity_type__points')
-    )['total'] or 0
-    team.total_points = total
-    team.save(update_fields=['total_points'])
+    defer_batch('activities:team_points', recompute_team_points, [team.pk], background=True)
 
 @receiver(post_save, sender=Activity)
+@metrics.timed('signal_handler_duration_seconds', {'handler': 'activities.activity_saved'})
 def activity_saved(sender, instance, **kwargs):
     update_team_points(instance.user.team)
+    bump_data_version()
+
+@receiver(pre_delete, sender=Activity)
+def activity_deleting(sender, instance, **kwargs):
+    # Antes de borrar filas: el orden de bloqueos es el mismo que en Activity.save
+    ActivityChange.lock_sequence()
 
 @receiver(post_delete, sender=Activity)
+@metrics.timed('signal_handler_duration_seconds', {'handler': 'activities.activity_deleted'})
 def activity_deleted(sender, instance, **kwargs):
-    update_team_points(instance.user.team)
\ No newline at end of file
+    # post_delete corre dentro de la transacción del borrado, también en borrados en cascada
+    ActivityChange.record(ActivityChange.DELETE, instance)
+    DailyPoints.apply({(instance.user_id, instance.date): (-instance.points, -1)})
+    update_team_points(instance.user.team)
+    bump_data_version()
+
+@receiver(post_save, sender=ActivityType)
+@receiver(post_delete, sender=ActivityType)
+def activity_type_changed(sender, instance, **kwargs):
+    # Nombre, categoría o puntos aparecen en páginas y exportes cacheados por versión de datos
+    bump_data_version()
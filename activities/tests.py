@@ -1,3 +1,591 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db.models import Sum
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from users.models.user import User
+from teams.models import Team
+from activities.models.activity_type import ActivityType
+from activities.models.activity import Activity
+from activities.models.archive import ActivityRollup, ArchivedActivity
+from activities.models.change import ActivityChange
+from activities.models.daily_points import DailyPoints
+from activities.archive import HORIZON_KEY, archive_horizon, archive_period, compact_period, sources_for_range
+from activities.totals import team_points
+from activities.points_index import leaderboard, rebuild, user_total
+from activities import leaderboard as memory_leaderboard
+from activities.leaderboard import Leaderboard, OrderStatisticTreap
+from reports.models.period import Period
+from activities import views as activity_views
+from activities.evidence import fingerprint
+from activities.ingest import ingest_activities
 
-# Create your tests here.
+
+class ActivityPointsSnapshotTests(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create(name='Team A')
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One', team=self.team)
+        self.commit = ActivityType.objects.create(name='Commit válido', points=4)
+        self.today = timezone.now().date()
+
+    def test_points_are_recorded_at_creation(self):
+        activity = Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        self.assertEqual(activity.points, 4)
+
+        self.commit.points = 10
+        self.commit.save()
+        activity.refresh_from_db()
+        self.assertEqual(activity.points, 4)
+        self.assertEqual(Activity.objects.aggregate(total=Sum('points'))['total'], 4)
+
+    def test_points_come_from_the_database_not_a_stale_type(self):
+        stale = ActivityType.objects.get(pk=self.commit.pk)
+        # Otro proceso cambia el valor: este conserva la instancia vieja (p. ej. la de cached())
+        ActivityType.objects.filter(pk=self.commit.pk).update(points=10)
+        activity = Activity.objects.create(activity_type=stale, user=self.user, date=self.today)
+        self.assertEqual(activity.points, 10)
+        ingest_activities([Activity(activity_type=stale, user=self.user, date=self.today, evidence='abc')])
+        self.assertEqual(Activity.objects.get(evidence='abc').points, 10)
+
+    def test_reprice_command_updates_history_and_team_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_points, 20)
+
+        out = StringIO()
+        call_command('reprice_activities', str(self.commit.id), '--points', '2', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(set(Activity.objects.values_list('points', flat=True)), {2})
+        self.commit.refresh_from_db()
+        self.assertEqual(self.commit.points, 2)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_points, 10)
+
+    def test_reprice_dry_run_changes_nothing(self):
+        Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        out = StringIO()
+        call_command('reprice_activities', str(self.commit.id), '--points', '1', '--dry-run', stdout=out)
+        self.assertIn('1 actividades', out.getvalue())
+        self.assertEqual(Activity.objects.get().points, 4)
+
+
+class ActivityArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One', team=self.team)
+        self.commit = ActivityType.objects.create(name='Commit válido', points=4)
+        self.old_period = Period.objects.create(
+            type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15), is_closed=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (2, 3, 10):
+                Activity.objects.create(activity_type=self.commit, user=self.user, date=date(2024, 1, day))
+            self.recent = Activity.objects.create(activity_type=self.commit, user=self.user, date=timezone.now().date())
+
+    def test_archive_moves_closed_periods_and_keeps_totals(self):
+        out = StringIO()
+        call_command('archive_activities', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(list(Activity.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertEqual(ArchivedActivity.objects.count(), 3)
+        rollup = ActivityRollup.objects.get(period=self.old_period, user=self.user)
+        self.assertEqual((rollup.points, rollup.activities), (12, 3))
+        self.assertEqual(team_points([self.team.id]), {self.team.id: 16})
+
+        # Un nuevo registro recalcula el total del equipo contando el archivo
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.commit, user=self.user, date=timezone.now().date())
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_points, 20)
+
+    def test_archive_renews_data_version(self):
+        compact_period(self.old_period)
+        with mock.patch('activities.archive.bump_data_version') as bump:
+            list(archive_period(self.old_period, batch_size=2))
+        self.assertEqual(bump.call_count, 2)
+
+    def test_archive_is_resumable(self):
+        compact_period(self.old_period)
+        next(archive_period(self.old_period, batch_size=1))
+        call_command('archive_activities', stdout=StringIO())
+        self.assertEqual(ArchivedActivity.objects.count(), 3)
+        self.assertEqual(ActivityRollup.objects.get(user=self.user).points, 12)
+
+    def test_open_or_recent_periods_are_not_archived(self):
+        self.old_period.is_closed = False
+        self.old_period.save()
+        call_command('archive_activities', stdout=StringIO())
+        self.assertEqual(Activity.objects.count(), 4)
+
+    def test_history_unions_archive_only_when_range_reaches_it(self):
+        call_command('archive_activities', stdout=StringIO())
+        self.client.force_login(self.admin)
+        url = reverse('reports:reports_history')
+
+        response = self.client.get(url, {'start': '2024-01-01', 'end': '2030-01-01'})
+        self.assertEqual(response.context['stats']['total_activities'], 4)
+        self.assertEqual(response.context['stats']['total_points'], 16)
+        self.assertEqual([a['date'] for a in response.context['activities']][-1], date(2024, 1, 2))
+
+        self.assertEqual(sources_for_range(date(2024, 2, 1)), [Activity])
+
+        # Caduca: un archivado hecho desde otro proceso no queda invisible para siempre
+        cache.delete(HORIZON_KEY)
+        with mock.patch('activities.archive.cache.set') as cache_set:
+            archive_horizon()
+        cache_set.assert_called_once_with(HORIZON_KEY, mock.ANY, 30)
+
+        response = self.client.get(reverse('reports:export_history_excel'), {'start': '2024-01-01', 'end': '2024-01-31'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ActivityListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One', team=self.team)
+        self.loner = User.objects.create_user(email='loner@example.com', password='pass', name='Loner')
+        self.commit = ActivityType.objects.create(name='Demo commit', points=4)
+        self.today = timezone.now().date()
+        # Varias actividades por día para probar el desempate por id
+        Activity.objects.bulk_create([
+            Activity(activity_type=self.commit, user=self.user if i % 3 else self.loner,
+                     date=self.today - timedelta(days=i // 4), points=4)
+            for i in range(120)
+        ])
+        self.client.force_login(self.admin)
+
+    def _walk(self, url_name, **params):
+        seen, after, pages = [], None, 0
+        while True:
+            query = dict(params, **({'after': after} if after else {}))
+            resp = self.client.get(reverse(url_name), query)
+            if url_name == 'activities:activity_feed':
+                data = resp.json()
+                seen += [(row['date'], row['id']) for row in data['results']]
+                after = data['next']
+            else:
+                seen += [(a.date.isoformat(), a.id) for a in resp.context['activities']]
+                after = resp.context['next_cursor']
+            pages += 1
+            if not after:
+                return seen, pages
+
+    def test_cursor_pagination_visits_every_activity_once_in_order(self):
+        seen, pages = self._walk('activities:activity_list')
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(set(seen)), 120)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_page_cost_does_not_grow_with_depth(self):
+        # Sesión + actividades + tipos y equipos (el caché de referencia se omite dentro de la transacción del test)
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('activities:activity_list'), {'after': f'{self.today - timedelta(days=5)}_1'})
+        self.assertEqual(len(resp.context['activities']), activity_views.ACTIVITIES_PER_PAGE)
+
+    def test_filters_and_json_feed(self):
+        seen, _ = self._walk('activities:activity_feed', team=self.team.id, start=str(self.today - timedelta(days=9)))
+        expected = Activity.objects.filter(user__team=self.team, date__gte=self.today - timedelta(days=9))
+        self.assertEqual(sorted(pk for _, pk in seen), sorted(expected.values_list('id', flat=True)))
+
+        resp = self.client.get(reverse('activities:activity_feed'), {'team': 'none', 'type': self.commit.id})
+        self.assertTrue(all(row['team'] is None for row in resp.json()['results']))
+
+    def test_invalid_cursor_and_filters_are_ignored(self):
+        resp = self.client.get(reverse('activities:activity_list'), {'after': "x'; DROP TABLE", 'type': '1 OR 1=1'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['activities']), activity_views.ACTIVITIES_PER_PAGE)
+
+    def test_only_admins(self):
+        self.client.force_login(self.user)
+        self.assertRedirects(self.client.get(reverse('activities:activity_list')), reverse('dashboard:dashboard'))
+        self.assertEqual(self.client.get(reverse('activities:activity_feed')).status_code, 403)
+
+
+class ActivityChangeFeedTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One')
+        self.commit = ActivityType.objects.create(name='Demo commit', points=4)
+        self.today = timezone.now().date()
+        self.client.force_login(self.admin)
+
+    def test_saves_and_deletes_are_logged_in_order(self):
+        activity = Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        activity.points = 7
+        activity.save()
+        activity_id = activity.id
+        activity.delete()
+
+        changes = list(ActivityChange.objects.values_list('activity_id', 'operation', 'payload__points'))
+        self.assertEqual(changes, [(activity_id, 'create', 4), (activity_id, 'update', 7), (activity_id, 'delete', 7)])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+            raise RuntimeError
+        self.assertFalse(ActivityChange.objects.exists())
+
+    def test_endpoint_pages_by_sequence(self):
+        for _ in range(5):
+            Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        url = reverse('activities:activity_changes')
+
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual(len(first['changes']), 3)
+        self.assertTrue(first['has_more'])
+        second = self.client.get(url, {'since': first['next_since'], 'limit': 3}).json()
+        self.assertEqual(len(second['changes']), 2)
+        self.assertFalse(second['has_more'])
+        seqs = [c['seq'] for c in first['changes'] + second['changes']]
+        self.assertEqual(seqs, sorted(set(seqs)))
+
+        empty = self.client.get(url, {'since': second['next_since']}).json()
+        self.assertEqual((empty['changes'], empty['next_since']), ([], second['next_since']))
+
+    def test_writers_lock_the_sequence_before_writing(self):
+        # Con la fila de secuencia bloqueada hasta el commit, los seq se confirman en orden
+        activity = Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        for write in (activity.save, activity.delete):
+            with CaptureQueriesContext(connection) as ctx:
+                write()
+            writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+            self.assertTrue(writes[0].startswith('UPDATE "core_versionstamp"'), writes[0])
+
+    def test_bulk_reprice_and_tail_command(self):
+        Activity.objects.create(activity_type=self.commit, user=self.user, date=self.today)
+        call_command('reprice_activities', str(self.commit.id), points=9, stdout=StringIO())
+        self.assertEqual(ActivityChange.objects.last().payload['points'], 9)
+
+        out, err = StringIO(), StringIO()
+        call_command('tail_activity_changes', since=0, batch_size=1, stdout=out, stderr=err)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['operation'] for line in lines], ['create', 'update'])
+        self.assertIn(f"since={lines[-1]['seq']}", err.getvalue())
+
+    def test_only_admins(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('activities:activity_changes')).status_code, 403)
+
+
+class PointsIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.ana = User.objects.create_user(email='ana@example.com', password='pass', name='Ana', team=self.team)
+        self.luis = User.objects.create_user(email='luis@example.com', password='pass', name='Luis')
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.early = ActivityType.objects.get(name='Llegar temprano')
+        for day in (1, 3, 3, 10):
+            Activity.objects.create(activity_type=self.commit, user=self.ana, date=date(2024, 1, day))
+        for day in (2, 5):
+            Activity.objects.create(activity_type=self.early, user=self.luis, date=date(2024, 1, day))
+
+    def assertIndexMatchesActivities(self):
+        for user in (self.ana, self.luis):
+            for start, end in [(None, None), (date(2024, 1, 2), date(2024, 1, 3)), (date(2024, 1, 4), None), (None, date(2024, 1, 1))]:
+                qs = Activity.objects.filter(user=user)
+                if start:
+                    qs = qs.filter(date__gte=start)
+                if end:
+                    qs = qs.filter(date__lte=end)
+                self.assertEqual(user_total(user.pk, start, end), qs.aggregate(t=Sum('points'))['t'] or 0, (user, start, end))
+
+    def test_range_totals_are_two_lookups(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(user_total(self.ana.pk, date(2024, 1, 2), date(2024, 1, 9)), 8)
+        self.assertIndexMatchesActivities()
+
+    def test_index_follows_backdated_updates_and_deletes(self):
+        Activity.objects.create(activity_type=self.commit, user=self.ana, date=date(2023, 12, 31))
+        moved = Activity.objects.filter(user=self.ana, date=date(2024, 1, 3)).first()
+        moved.user = self.luis
+        moved.date = date(2024, 1, 4)
+        moved.points = 7
+        moved.save()
+        Activity.objects.filter(user=self.ana, date=date(2024, 1, 1)).get().delete()
+        self.assertIndexMatchesActivities()
+        self.assertFalse(DailyPoints.objects.filter(user=self.ana, date=date(2024, 1, 1)).exists())
+
+        call_command('reprice_activities', str(self.commit.id), '--points', '2', stdout=StringIO())
+        self.assertIndexMatchesActivities()
+
+        before = list(DailyPoints.objects.order_by('user', 'date').values_list(
+            'user_id', 'date', 'points', 'activities', 'cumulative_points', 'cumulative_activities'
+        ))
+        rebuild()
+        after = list(DailyPoints.objects.order_by('user', 'date').values_list(
+            'user_id', 'date', 'points', 'activities', 'cumulative_points', 'cumulative_activities'
+        ))
+        self.assertEqual(before, after)
+
+    def test_apply_locks_users_before_writing_the_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            DailyPoints.apply({(self.luis.pk, date(2024, 2, 1)): (3, 1), (self.ana.pk, date(2024, 2, 1)): (2, 1)})
+        # Primero las filas de usuario (en orden de pk), después cualquier escritura del índice
+        self.assertIn('"users_user"', queries.captured_queries[0]['sql'])
+        self.assertNotIn('daily', queries.captured_queries[0]['sql'].lower())
+        self.assertEqual(user_total(self.luis.pk, date(2024, 2, 1)), 3)
+
+    def test_bulk_apply_matches_rebuild(self):
+        snapshot = lambda: list(DailyPoints.objects.order_by('user', 'date').values_list(
+            'user_id', 'date', 'points', 'activities', 'cumulative_points', 'cumulative_activities'
+        ))
+        with transaction.atomic():
+            DailyPoints.apply_bulk({
+                (self.ana.pk, date(2023, 12, 31)): (4, 1), (self.ana.pk, date(2024, 1, 3)): (-4, -1),
+                (self.ana.pk, date(2024, 1, 10)): (-4, -1), (self.luis.pk, date(2024, 1, 4)): (7, 1),
+            })
+        Activity.objects.filter(user=self.ana, date=date(2024, 1, 10)).update(date=date(2023, 12, 31))
+        Activity.objects.filter(pk=Activity.objects.filter(user=self.ana, date=date(2024, 1, 3)).first().pk).update(
+            user=self.luis, date=date(2024, 1, 4), points=7,
+        )
+        bulk = snapshot()
+        rebuild()
+        self.assertEqual(bulk, snapshot())
+
+    def test_leaderboard_for_custom_range_is_one_query(self):
+        with self.assertNumQueries(1):
+            rows = leaderboard(date(2024, 1, 2), date(2024, 1, 5))
+        self.assertEqual(
+            [(r['name'], r['team'], r['points'], r['activities']) for r in rows],
+            [('Ana', 'Team A', 8, 2), ('Luis', 'Sin equipo', 2, 2)],
+        )
+        # "a fecha de": todo lo acumulado hasta end
+        self.assertEqual([(r['name'], r['points']) for r in leaderboard(end=date(2024, 1, 2))], [('Ana', 4), ('Luis', 1)])
+
+    def test_ranking_api(self):
+        self.client.force_login(self.luis)
+        url = reverse('dashboard:ranking_api')
+        data = self.client.get(url, {'start': '2024-01-04', 'end': '2024-01-31'}).json()
+        self.assertEqual([(r['position'], r['name'], r['points']) for r in data['results']], [(1, 'Ana', 4), (2, 'Luis', 1)])
+        self.assertEqual(self.client.get(url, {'start': 'ayer'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2024-02-01', 'end': '2024-01-01'}).status_code, 400)
+
+
+class OrderStatisticTreapTests(TestCase):
+    def test_matches_sorted_list(self):
+        import random
+        rng = random.Random(7)
+        keys = set(rng.sample(range(10000), 500))
+        tree = OrderStatisticTreap(keys)
+        for _ in range(300):
+            key = rng.randrange(10000)
+            if key in keys:
+                keys.discard(key)
+                tree.remove(key)
+            else:
+                keys.add(key)
+                tree.insert(key)
+        ordered = sorted(keys)
+        self.assertEqual(len(tree), len(ordered))
+        self.assertEqual(tree.slice(0, len(ordered)), ordered)
+        for index in (0, 1, 57, len(ordered) - 1):
+            self.assertEqual(tree.select(index), ordered[index])
+            self.assertEqual(tree.rank(ordered[index]), index)
+        self.assertEqual(tree.slice(40, 45), ordered[40:45])
+        self.assertEqual(tree.slice(-3, 2), ordered[:2])
+
+    def test_leaderboard_ties_follow_user_id(self):
+        board = Leaderboard({3: (10, 2), 1: (10, 1), 2: (20, 1), 4: (0, 0)})
+        self.assertEqual([row['user_id'] for row in board.top(10)], [2, 1, 3])
+        self.assertIsNone(board.position(4))
+        board.set(3, 25, 3)
+        self.assertEqual(board.position(3), 1)
+        self.assertEqual([row['user_id'] for row in board.around(1, 1)], [2, 1])
+        self.assertEqual(board.total_points, 55)
+
+
+class MemoryLeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        memory_leaderboard.clear()
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.today = timezone.now().date()
+        self.users = [
+            User.objects.create_user(email=f'u{i}@example.com', password='pass', name=f'U {i}') for i in range(8)
+        ]
+        for i, user in enumerate(self.users):
+            for _ in range(i):
+                Activity.objects.create(activity_type=self.commit, user=user, date=self.today)
+
+    def sql_order(self):
+        rows = (
+            Activity.objects.filter(date__gte=self.today).values('user_id')
+            .annotate(total=Sum('points')).order_by('-total', 'user_id')
+        )
+        return [(row['user_id'], row['total']) for row in rows]
+
+    def test_follows_changes_from_the_log(self):
+        board = memory_leaderboard.get_leaderboard(self.today)
+        self.assertEqual([(r['user_id'], r['points']) for r in board.top(10)], self.sql_order())
+        self.assertEqual(board.position(self.users[7].pk), 1)
+
+        # Un alta, un cambio de usuario y un borrado, como los haría otro proceso
+        for _ in range(3):
+            Activity.objects.create(activity_type=self.commit, user=self.users[1], date=self.today)
+        moved = Activity.objects.filter(user=self.users[7]).first()
+        moved.user = self.users[2]
+        moved.save()
+        Activity.objects.filter(user=self.users[6]).first().delete()
+
+        board = memory_leaderboard.get_leaderboard(self.today)
+        self.assertEqual([(r['user_id'], r['points']) for r in board.top(10)], self.sql_order())
+        self.assertEqual(board.total_points, sum(points for _, points in self.sql_order()))
+
+    def test_dashboard_and_api_report_positions_beyond_top_five(self):
+        self.client.force_login(self.users[1])
+        response = self.client.get(reverse('dashboard:dashboard'))
+        self.assertEqual(response.context['user_position'], 7)
+        self.assertEqual(len(response.context['ranking']), 5)
+
+        data = self.client.get(reverse('dashboard:ranking_api'), {'period': 'diario', 'limit': 3, 'around': 1}).json()
+        self.assertEqual([r['name'] for r in data['results']], ['U 7', 'U 6', 'U 5'])
+        self.assertEqual(data['me'], {'position': 7, 'points': 4, 'participants': 7})
+        self.assertEqual([r['position'] for r in data['around']], [6, 7])
+
+
+class EvidenceDedupeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One', team=self.team)
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.today = timezone.localdate()
+        self.sha = '3f2a9c1e' * 5
+
+    def test_fingerprint_normalizes_commit_urls_and_hashes(self):
+        self.assertEqual(fingerprint(self.sha), fingerprint(f'  https://github.com/acme/app/commit/{self.sha.upper()}/ '))
+        self.assertEqual(fingerprint('http://www.example.com/ticket/42/'), fingerprint('example.com/ticket/42'))
+        self.assertNotEqual(fingerprint(self.sha), fingerprint(self.sha[:7]))
+        self.assertIsNone(fingerprint('   '))
+
+    def test_ingest_is_idempotent_and_updates_derived_data(self):
+        def rows():
+            for i in range(5):
+                yield Activity(activity_type=self.commit, user=self.user, date=self.today, evidence=f'{i:040x}')
+            yield Activity(activity_type=self.commit, user=self.user, date=self.today, evidence=f'https://git/x/commit/{0:040x}')
+            yield Activity(activity_type=self.commit, user=self.user, date=self.today)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ingest_activities(rows(), batch_size=3)
+        self.assertEqual((result.created, result.duplicates), (6, 1))
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_points, 24)
+        self.assertEqual(user_total(self.user.pk, self.today, self.today), 24)
+        self.assertEqual(ActivityChange.objects.filter(operation=ActivityChange.CREATE).count(), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ingest_activities(rows(), batch_size=3)
+        # Sin evidencia no hay huella: esa actividad sí se vuelve a crear
+        self.assertEqual((result.created, result.duplicates), (1, 6))
+        self.assertEqual(Activity.objects.count(), 7)
+
+    def test_archived_evidence_is_not_ingested_again(self):
+        day = date(2024, 1, 5)
+        period = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15), is_closed=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_activities([Activity(activity_type=self.commit, user=self.user, date=day, evidence=self.sha)])
+        compact_period(period)
+        list(archive_period(period))
+        self.assertEqual(ArchivedActivity.objects.get().evidence_fingerprint, fingerprint(self.sha))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ingest_activities([Activity(activity_type=self.commit, user=self.user, date=day, evidence=self.sha.upper())])
+        self.assertEqual((result.created, result.duplicates), (0, 1))
+        self.assertEqual(user_total(self.user.pk), 4)
+        self.assertEqual(team_points([self.team.pk]), {self.team.pk: 4})
+
+        duplicate = Activity(activity_type=self.commit, user=self.user, date=day, evidence=self.sha)
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+        with self.assertRaises(IntegrityError):
+            duplicate.save()
+
+    def test_add_activity_rejects_resubmitted_evidence(self):
+        self.client.force_login(self.admin)
+        data = {'activity_type': self.commit.pk, 'user': self.user.pk, 'date': self.today.isoformat(), 'time': '10:00', 'evidence': self.sha}
+        self.client.post(reverse('activities:add_activity'), data)
+        response = self.client.post(reverse('activities:add_activity'), dict(data, evidence=self.sha.upper()), follow=True)
+        self.assertEqual(Activity.objects.count(), 1)
+        self.assertIn('ya está registrada', ' '.join(str(m) for m in response.context['messages']))
+
+        duplicate = Activity(activity_type=self.commit, user=self.user, date=self.today, evidence=f'https://host/commit/{self.sha}')
+        with self.assertRaises(ValidationError):
+            duplicate.full_clean()
+
+
+class GitLogImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user(email='Ana@Example.com', password='pass', name='Ana')
+        self.luis = User.objects.create_user(email='luis@example.com', password='pass', name='Luis')
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_log_file_import_is_filtered_and_idempotent(self):
+        path = os.path.join(self.tmp, 'log.txt')
+        with open(path, 'w') as f:
+            f.write(
+                f'{1:040x}\tana@example.com\t2024-01-05T10:00:00+00:00\n'
+                f'{2:040x}\tluis@example.com\t2024-01-06T10:00:00+00:00\n'
+                f'{3:040x}\tluis@example.com\t2023-12-01T10:00:00+00:00\n'
+                f'{4:040x}\tnadie@example.com\t2024-01-05T10:00:00+00:00\n'
+                'línea rota\n'
+            )
+        out = StringIO()
+        call_command('import_git_log', path, '--since', '2024-01-01', '--batch-size', '1', stdout=out)
+        self.assertIn('2 actividades nuevas', out.getvalue())
+        self.assertIn('1 de autores sin usuario, 1 fuera de rango, 1 líneas inválidas', out.getvalue())
+        self.assertEqual(
+            set(Activity.objects.values_list('user_id', 'date', 'evidence', 'points')),
+            {(self.ana.pk, date(2024, 1, 5), f'{1:040x}', 4), (self.luis.pk, date(2024, 1, 6), f'{2:040x}', 4)},
+        )
+
+        out = StringIO()
+        call_command('import_git_log', path, stdout=out)
+        self.assertIn('1 actividades nuevas, 2 ya registradas', out.getvalue())
+
+        # Tras archivar la quincena los commits siguen contando como ya registrados
+        period = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15), is_closed=True)
+        compact_period(period)
+        list(archive_period(period))
+        out = StringIO()
+        call_command('import_git_log', path, stdout=out)
+        self.assertIn('0 actividades nuevas, 3 ya registradas', out.getvalue())
+        self.assertEqual(user_total(self.ana.pk), 4)
+
+    @unittest.skipUnless(shutil.which('git'), 'git no está instalado')
+    def test_repository_import(self):
+        env = dict(os.environ, GIT_AUTHOR_NAME='Ana', GIT_AUTHOR_EMAIL='ana@example.com',
+                   GIT_COMMITTER_NAME='Ana', GIT_COMMITTER_EMAIL='ana@example.com')
+        subprocess.run(['git', 'init', '-q', self.tmp], check=True, env=env)
+        for day in (1, 2):
+            env['GIT_AUTHOR_DATE'] = env['GIT_COMMITTER_DATE'] = f'2024-01-0{day}T12:00:00+00:00'
+            subprocess.run(['git', '-C', self.tmp, 'commit', '-q', '--allow-empty', '-m', str(day)], check=True, env=env)
+
+        call_command('import_git_log', self.tmp, stdout=StringIO())
+        self.assertEqual(
+            sorted(Activity.objects.filter(user=self.ana).values_list('date', flat=True)),
+            [date(2024, 1, 1), date(2024, 1, 2)],
+        )
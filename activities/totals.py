@@ -0,0 +1,32 @@
+from django.db.models import Sum
+from teams.models import Team
+from .models import Activity, ActivityRollup
+
+
+def team_points(team_ids=None):
+    """
+    Puntos acumulados por equipo: actividades vigentes más los rollups de los
+    periodos archivados. Devuelve {team_id: puntos}; team_ids=None calcula todos.
+    """
+    live = Activity.objects.filter(user__team__isnull=False)
+    archived = ActivityRollup.objects.filter(user__team__isnull=False)
+    if team_ids is not None:
+        live = live.filter(user__team_id__in=team_ids)
+        archived = archived.filter(user__team_id__in=team_ids)
+
+    totals = {}
+    for qs in (live, archived):
+        for team_id, points in qs.values_list('user__team_id').annotate(points=Sum('points')).order_by():
+            totals[team_id] = totals.get(team_id, 0) + (points or 0)
+    return totals
+
+
+def recompute_team_points(team_ids):
+    """Guarda Team.total_points de los equipos indicados con una sola agregación."""
+    team_ids = [team_id for team_id in set(team_ids) if team_id]
+    if not team_ids:
+        return
+    totals = team_points(team_ids)
+    # update() no dispara post_save: total_points no se sirve desde Team.objects.cached()
+    for team_id in team_ids:
+        Team.objects.filter(pk=team_id).update(total_points=totals.get(team_id, 0))
@@ -6,4 +6,6 @@ app_name = 'activities'
 urlpatterns = [
     path('add/', views.add_activity, name='add_activity'),
     path('list/', views.activity_list, name='activity_list'),
+    path('list/feed/', views.activity_feed, name='activity_feed'),
+    path('changes/', views.activity_changes, name='activity_changes'),
 ]
\ No newline at end of file
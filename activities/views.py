@@ -1,8 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import IntegrityError
+from django.db.models import Q
+from django.http import JsonResponse
 from django.utils import timezone
+from datetime import datetime
+from .changes import changes_since, serialize
 from .models import Activity, ActivityType
+from teams.models import Team
 from users.models import User
 
 @login_required
@@ -11,8 +17,7 @@ def add_activity(request):
         messages.error(request, 'No tienes permisos para realizar esta acción')
         return redirect('dashboard:dashboard')
     
-    activity_types = ActivityType.objects.all()
-    users = User.objects.filter(rol=User.USER)
+    activity_types = ActivityType.objects.cached()
     
     if request.method == 'POST':
         activity_type_id = request.POST.get('activity_type')
@@ -23,7 +28,7 @@ def add_activity(request):
         notes = request.POST.get('notes')
         
         try:
-            activity_type = ActivityType.objects.get(id=activity_type_id)
+            activity_type = ActivityType.objects.get_cached(activity_type_id)
             user = User.objects.get(id=user_id)
             
             # Combinar fecha y hora
@@ -41,19 +46,133 @@ def add_activity(request):
             messages.success(request, 'Actividad registrada correctamente')
             return redirect('activities:add_activity')
             
+        except IntegrityError:
+            # Reenvío del formulario o evidencia ya puntuada: la restricción activity_evidence_uniq la rechaza
+            messages.warning(request, 'Esta evidencia ya está registrada para ese usuario y tipo de actividad')
+            return redirect('activities:add_activity')
         except Exception as e:
             messages.error(request, f'Error al registrar la actividad: {str(e)}')
     
     context = {
         'activity_types': activity_types,
-        'users': users,
     }
     return render(request, 'activities/add_activity.html', context)
 
+ACTIVITIES_PER_PAGE = 50
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def _parse_cursor(value):
+    """Cursor 'YYYY-MM-DD_id' de la última fila vista; None si falta o es inválido."""
+    date_str, _, pk = (value or '').partition('_')
+    date = _parse_date(date_str)
+    if date is None or not pk.isdigit():
+        return None
+    return date, int(pk)
+
+def _activity_feed(request):
+    """
+    Una página del feed ordenado por (-date, -id) con paginación por cursor:
+    cada página es un rango del índice (date, id), así que cuesta lo mismo la
+    primera que la milésima, sin OFFSET ni COUNT(*).
+    """
+    filters = {
+        'start': _parse_date(request.GET.get('start')),
+        'end': _parse_date(request.GET.get('end')),
+        'type': request.GET.get('type', ''),
+        'team': request.GET.get('team', ''),
+    }
+    qs = Activity.objects.select_related('activity_type', 'user', 'user__team').order_by('-date', '-id')
+    if filters['start']:
+        qs = qs.filter(date__gte=filters['start'])
+    if filters['end']:
+        qs = qs.filter(date__lte=filters['end'])
+    if filters['type'].isdigit():
+        qs = qs.filter(activity_type_id=filters['type'])
+    if filters['team'] == 'none':
+        qs = qs.filter(user__team__isnull=True)
+    elif filters['team'].isdigit():
+        qs = qs.filter(user__team_id=filters['team'])
+
+    cursor = _parse_cursor(request.GET.get('after'))
+    if cursor:
+        date, pk = cursor
+        qs = qs.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+
+    # Una fila extra indica si hay página siguiente
+    activities = list(qs[:ACTIVITIES_PER_PAGE + 1])
+    next_cursor = None
+    if len(activities) > ACTIVITIES_PER_PAGE:
+        activities = activities[:ACTIVITIES_PER_PAGE]
+        last = activities[-1]
+        next_cursor = f'{last.date.isoformat()}_{last.id}'
+    return activities, next_cursor, filters
+
+def _filters_query(request):
+    query = request.GET.copy()
+    query.pop('after', None)
+    return query.urlencode()
+
 @login_required
 def activity_list(request):
-    activities = Activity.objects.all().order_by('-date', '-created_at')
+    if not request.user.is_admin:
+        messages.error(request, 'No tienes permisos para realizar esta acción')
+        return redirect('dashboard:dashboard')
+
+    activities, next_cursor, filters = _activity_feed(request)
     context = {
-        'activities': activities
+        'activities': activities,
+        'next_cursor': next_cursor,
+        'is_first_page': 'after' not in request.GET,
+        'filters': filters,
+        'filters_query': _filters_query(request),
+        'activity_types': ActivityType.objects.cached(),
+        'teams': Team.objects.cached(),
     }
-    return render(request, 'activities/activity_list.html', context)
\ No newline at end of file
+    return render(request, 'activities/activity_list.html', context)
+
+@login_required
+def activity_feed(request):
+    """Misma página que activity_list en JSON, para el scroll infinito."""
+    if not request.user.is_admin:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    activities, next_cursor, _ = _activity_feed(request)
+    return JsonResponse({
+        'results': [
+            {
+                'id': a.id,
+                'date': a.date.isoformat(),
+                'user': a.user.name,
+                'team': a.user.team.name if a.user.team else None,
+                'activity_type': a.activity_type.name,
+                'points': a.points,
+                'evidence': a.evidence or '',
+                'note': a.note or '',
+            }
+            for a in activities
+        ],
+        'next': next_cursor,
+    })
+
+@login_required
+def activity_changes(request):
+    """Cambios de actividades posteriores a ?since=<seq>, para consumidores incrementales."""
+    if not request.user.is_admin:
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+
+    since = request.GET.get('since', '0')
+    limit = request.GET.get('limit', '500')
+    since = int(since) if since.isdigit() else 0
+    limit = int(limit) if limit.isdigit() else 500
+
+    changes, has_more = changes_since(since, limit)
+    return JsonResponse({
+        'changes': [serialize(change) for change in changes],
+        'next_since': changes[-1]['seq'] if changes else since,
+        'has_more': has_more,
+    })
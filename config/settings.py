@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'core',
     'teams',
     'users',
     'activities',
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -99,6 +101,27 @@ if os.environ.get('CI') == 'true' or 'test' in sys.argv:
         }
     }
 
+if 'test' in sys.argv:
+    # PBKDF2 hace muy lentos los tests que crean muchos usuarios
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# En producción con varios workers conviene un backend compartido (Redis/Memcached)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'sistema-puntuacion'),
+    }
+}
+
+# Sessions
+# 'cached_db' evita leer django_session en cada petición; 'signed_cookies' no usa la base de datos
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'cached_db')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -150,6 +173,54 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+AUTHENTICATION_BACKENDS = [
+    'users.backends.PrefetchingModelBackend',
+]
+
+# Segundos que el usuario de la sesión (con team y userprofile) permanece en caché; 0 lo desactiva
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 0))
+
+# Caché de páginas completas (dashboard, historial) por versión de datos
+PAGE_CACHE_TIMEOUT = 600
+PAGE_CACHE_STALE_SECONDS = 30
+
+# Exportes (PDF/XLSX) guardados en MEDIA_ROOT/export_cache; se desalojan por LRU al superar este tamaño
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Reportes PDF grandes: las páginas se dibujan en un pool de procesos a partir de este número de filas
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_ROWS = 20000
+
+# Importación masiva de usuarios: procesos para el hash de contraseñas y mínimo de contraseñas para usarlos
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_PARALLEL_MIN = 50
+
+# Días que las actividades de quincenas cerradas permanecen en la tabla principal antes de archivarse
+ACTIVITY_ARCHIVE_RETENTION_DAYS = 180
+# Segundos que cada proceso reutiliza la última fecha archivada; tras archivar, los demás workers tardan como mucho esto en verla
+ACTIVITY_ARCHIVE_HORIZON_TTL = 30
+
+# Rankings en memoria por periodo (activities.leaderboard) que conserva cada proceso
+LEADERBOARD_MAX_BOARDS = 8
+
+# Hilos para el trabajo diferido marcado como background (core.deferred); 0 lo ejecuta al confirmar, en línea
+DEFERRED_WORK_THREADS = int(os.environ.get('DEFERRED_WORK_THREADS', 0))
+
+# /metrics (formato Prometheus). Con varios workers, METRICS_DIR debe ser un directorio compartido por todos
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = 5
+# Token del recolector (Authorization: Bearer ...); la IP no sirve detrás de un proxy local, todas son 127.0.0.1
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Límite de intentos fallidos de login (ventana deslizante en segundos)
+LOGIN_THROTTLE = {
+    'WINDOW': 300,
+    'MAX_FAILURES_PER_IP': 20,
+    'MAX_FAILURES_PER_EMAIL': 5,
+    # Detrás del balanceador: sus IPs/redes, separadas por comas (p. ej. "10.0.0.0/8")
+    'TRUSTED_PROXIES': [proxy for proxy in os.environ.get('TRUSTED_PROXIES', '').split(',') if proxy],
+}
+
 LOGIN_REDIRECT_URL = 'dashboard:dashboard'
 LOGIN_URL = 'users:login'
 LOGOUT_REDIRECT_URL = 'users:login'
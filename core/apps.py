@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from . import metrics, pagecache, refdata
+
+        def cache_stats():
+            for key, value in refdata.stats().items():
+                model, result = key.rsplit(':', 1)
+                yield 'cache_requests_total', {'cache': f'refdata.{model}', 'result': result}, value
+            for result, value in pagecache.stats().items():
+                yield 'cache_requests_total', {'cache': 'page', 'result': result}, value
+
+        metrics.register_collector(cache_stats)
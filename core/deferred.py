@@ -0,0 +1,84 @@
+"""
+Trabajo diferido hasta el commit y agrupado por clave.
+
+Los receptores de señales llaman a defer()/defer_batch() en vez de hacer el
+trabajo en línea: dentro de una transacción, cada clave se ejecuta una sola vez
+al confirmar (p. ej. un recálculo por equipo aunque se guarden 500
+actividades), y si la transacción se revierte no se ejecuta nada. Fuera de una
+transacción el trabajo corre en el momento, igual que transaction.on_commit.
+
+Con DEFERRED_WORK_THREADS > 0 el trabajo marcado background=True se entrega a
+un pool de hilos para no alargar la respuesta.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.DEFERRED_WORK_THREADS, thread_name_prefix='deferred')
+    return _executor
+
+
+def _run_in_thread(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Error en trabajo diferido %s', getattr(func, '__qualname__', func))
+    finally:
+        # Los hilos del pool abren sus propias conexiones; se cierran al terminar cada tarea
+        close_old_connections()
+
+
+def _run(func, args, background):
+    if background and settings.DEFERRED_WORK_THREADS:
+        _get_executor().submit(_run_in_thread, func, args)
+    else:
+        func(*args)
+
+
+def _is_pending(connection, entry):
+    # Si la transacción (o el savepoint) se revirtió, Django ya descartó el callback
+    return any(callback is entry['callback'] for _, callback, _ in connection.run_on_commit)
+
+
+def _enqueue(key, func, items, using, background):
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        _run(func, (items,) if items is not None else (), background)
+        return
+
+    pending = connection.__dict__.setdefault('deferred_work', {})
+    entry = pending.get(key)
+    if entry is not None and _is_pending(connection, entry):
+        if items is not None:
+            entry['items'].update(dict.fromkeys(items))
+        return
+
+    entry = {'items': dict.fromkeys(items or ())}
+
+    def callback():
+        if pending.get(key) is entry:
+            del pending[key]
+        _run(func, (list(entry['items']),) if items is not None else (), background)
+
+    entry['callback'] = callback
+    pending[key] = entry
+    transaction.on_commit(callback, using=using, robust=True)
+
+
+def defer(key, func, using=None, background=False):
+    """Ejecuta func() tras el commit, una vez por clave y transacción."""
+    _enqueue(key, func, None, using, background)
+
+
+def defer_batch(key, func, items, using=None, background=False):
+    """Acumula items bajo la clave y llama func(items) una sola vez tras el commit (sin repetidos, en orden)."""
+    _enqueue(key, func, list(items), using, background)
@@ -0,0 +1,297 @@
+"""
+Métricas en memoria del proceso, expuestas en el formato de texto de Prometheus.
+
+Cada proceso acumula contadores e histogramas sin tocar la base de datos ni el
+caché. Con varios workers (gunicorn, uwsgi) se define METRICS_DIR: cada proceso
+vuelca su estado a METRICS_DIR/<pid>-<token>.json como mucho una vez cada
+METRICS_FLUSH_INTERVAL segundos y /metrics suma los archivos de todos. El
+token evita que un proceso nuevo que reutiliza el pid de otro sobrescriba sus
+contadores. Los archivos de procesos terminados se suman a
+METRICS_DIR/dead.json y se borran, así los contadores no retroceden y el
+directorio no crece. Todos los workers deben estar en la misma máquina.
+"""
+import json
+import os
+import uuid
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_collectors = []
+_last_flush = 0.0
+_file_name = None  # (pid, nombre) del archivo de este proceso
+
+DEAD_FILE = 'dead.json'
+LOCK_FILE = '.merge.lock'
+
+try:
+    import fcntl
+except ImportError:  # Windows: los archivos de procesos terminados se conservan sin fusionar
+    fcntl = None
+
+# nombre -> (tipo, ayuda, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Peticiones atendidas por vista, método y estado.', None),
+    'http_request_duration_seconds': ('histogram', 'Latencia de las peticiones por vista.', DURATION_BUCKETS),
+    'db_queries_per_request': ('histogram', 'Consultas SQL por petición.', COUNT_BUCKETS),
+    'db_query_duration_seconds_total': ('counter', 'Tiempo total en consultas SQL por vista.', None),
+    'cache_requests_total': ('counter', 'Consultas a cachés de la aplicación por resultado.', None),
+    'export_duration_seconds': ('histogram', 'Tiempo de generación de exportes (sólo fallos de caché).', DURATION_BUCKETS),
+    'export_size_bytes': ('histogram', 'Tamaño de los exportes generados.', SIZE_BUCKETS),
+    'signal_handler_duration_seconds': ('histogram', 'Tiempo dentro de los receptores de señales.', DURATION_BUCKETS),
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name, labels=None, value=1):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, labels=None):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            # Conteo por bucket (no acumulado), +Inf al final, luego suma
+            entry = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        entry[bisect_left(buckets, value)] += 1
+        entry[-1] += value
+
+
+@contextmanager
+def timer(name, labels=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, labels)
+
+
+def timed(name, labels=None):
+    """Decorador: observa la duración de cada llamada en el histograma name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            with timer(name, labels):
+                return func(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def register_collector(collector):
+    """collector() devuelve (nombre, labels, valor) de contadores que se leen al exportar."""
+    _collectors.append(collector)
+
+
+def snapshot():
+    """Estado de este proceso como dict serializable a JSON."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(entry) for key, entry in _histograms.items()}
+    for collector in _collectors:
+        for name, labels, value in collector():
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), entry] for (name, labels), entry in histograms.items()],
+    }
+
+
+def flush(force=False):
+    """Vuelca el estado del proceso a METRICS_DIR (si está definido), limitado a uno por intervalo."""
+    global _last_flush
+    directory = settings.METRICS_DIR
+    now = time.monotonic()
+    if not directory or (not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL):
+        return
+    _last_flush = now
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(snapshot(), tmp)
+    os.replace(tmp_path, os.path.join(directory, _own_file_name()))
+
+
+def _own_file_name():
+    global _file_name
+    pid = os.getpid()
+    # Se recalcula tras un fork: el hijo no debe heredar el archivo del padre
+    if _file_name is None or _file_name[0] != pid:
+        _file_name = (pid, f'{pid}-{uuid.uuid4().hex[:8]}.json')
+    return _file_name[1]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, aunque sea de otro usuario
+    return True
+
+
+def _file_pid(name):
+    head = name[:-len('.json')].split('-', 1)[0]
+    return int(head) if head.isdigit() else None
+
+
+def _merge(total, data):
+    counters = {(name, tuple(map(tuple, labels))): value for name, labels, value in total['counters']}
+    histograms = {(name, tuple(map(tuple, labels))): entry for name, labels, entry in total['histograms']}
+    for name, labels, value in data['counters']:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, entry in data['histograms']:
+        key = (name, tuple(map(tuple, labels)))
+        current = histograms.get(key)
+        histograms[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+    return {
+        'counters': [[name, [list(pair) for pair in labels], value] for (name, labels), value in counters.items()],
+        'histograms': [[name, [list(pair) for pair in labels], entry] for (name, labels), entry in histograms.items()],
+    }
+
+
+def _read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+@contextmanager
+def _directory_lock(directory, exclusive):
+    """flock sobre METRICS_DIR: exclusivo para fusionar, compartido para leer. None si no se obtuvo."""
+    if fcntl is None:
+        yield None
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH)
+        except OSError:
+            yield None
+            return
+        try:
+            yield lock
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect_dead(directory):
+    """Suma a dead.json los archivos de procesos que ya no existen y los borra; un proceso a la vez."""
+    dead = [
+        entry.path for entry in os.scandir(directory)
+        if entry.name.endswith('.json') and entry.name != DEAD_FILE and not entry.name.startswith('.')
+        and _file_pid(entry.name) is not None and not _pid_alive(_file_pid(entry.name))
+    ]
+    if not dead or fcntl is None:
+        return
+    with _directory_lock(directory, exclusive=True) as lock:
+        if lock is None:
+            return  # otra petición está fusionando o leyendo: se reintenta en la próxima
+        dead_path = os.path.join(directory, DEAD_FILE)
+        try:
+            total = _read(dead_path)
+        except FileNotFoundError:
+            total = {'counters': [], 'histograms': []}
+        merged = []
+        for path in dead:
+            try:
+                total = _merge(total, _read(path))
+            except (OSError, ValueError):
+                continue
+            merged.append(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(total, tmp)
+        os.replace(tmp_path, dead_path)
+        for path in merged:
+            os.unlink(path)
+
+
+def _snapshots():
+    directory = settings.METRICS_DIR
+    if not directory:
+        yield snapshot()
+        return
+    flush(force=True)
+    collect_dead(directory)
+    # Lectura con el candado compartido: nunca a mitad de una fusión (contaría dos veces a los procesos muertos)
+    with _directory_lock(directory, exclusive=False):
+        snapshots = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.json') and not entry.name.startswith('.'):
+                try:
+                    snapshots.append(_read(entry.path))
+                except (OSError, ValueError):
+                    continue  # archivo de un proceso que se está reescribiendo
+    yield from snapshots
+
+
+def collect():
+    """Suma las métricas de todos los procesos: ({clave: valor}, {clave: histograma})."""
+    counters, histograms = {}, {}
+    for data in _snapshots():
+        for name, labels, value in data['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, entry in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            current = histograms.get(key)
+            histograms[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        source = counters if kind == 'counter' else histograms
+        series = sorted((key, value) for key, value in source.items() if key[0] == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (_, labels), value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(float(bound))
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(value[-1]))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,35 @@
+import time
+from django.db import connection
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Latencia por vista (nombre de URL) y consultas SQL por petición; va primero en MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]
+
+        def count_queries(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.inc('http_requests_total', {'view': view, 'method': request.method, 'status': str(response.status_code)})
+        metrics.observe('http_request_duration_seconds', elapsed, {'view': view})
+        metrics.observe('db_queries_per_request', queries[0], {'view': view})
+        metrics.inc('db_query_duration_seconds_total', {'view': view}, queries[1])
+        metrics.flush()
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:11
+
+import time
+from django.db import migrations, models
+
+
+def crear_version_de_datos(apps, schema_editor):
+    VersionStamp = apps.get_model('core', 'VersionStamp')
+    VersionStamp.objects.get_or_create(name='data', defaults={'value': time.time()})
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(crear_version_de_datos, migrations.RunPython.noop),
+    ]
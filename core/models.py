@@ -0,0 +1,41 @@
+import time
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+
+class VersionStamp(models.Model):
+    """
+    Versión con nombre guardada en la base de datos, común a todos los procesos
+    (workers web y comandos de gestión), a diferencia del caché por defecto,
+    que es local de cada proceso. value es una marca de tiempo epoch que sólo
+    crece: también sirve como Last-Modified.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.FloatField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+    @classmethod
+    def current(cls, name):
+        value = cls.objects.filter(name=name).values_list('value', flat=True).first()
+        if value is None:
+            value = cls._create(name)
+        return value
+
+    @classmethod
+    def bump(cls, name):
+        # Nunca retrocede aunque el reloj de otro servidor vaya atrasado
+        now = time.time()
+        if not cls.objects.filter(name=name).update(value=Greatest(F('value') + 0.001, Value(now))):
+            cls._create(name, now)
+
+    @classmethod
+    def _create(cls, name, value=None):
+        try:
+            with transaction.atomic():
+                return cls.objects.create(name=name, value=time.time() if value is None else value).value
+        except IntegrityError:
+            # Otro proceso la creó a la vez
+            return cls.objects.get(name=name).value
@@ -0,0 +1,97 @@
+import hashlib
+from collections import Counter
+from functools import wraps
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .versioning import get_data_version
+
+KEY = 'pagecache:{}'
+LOCK_KEY = 'pagecache:{}:revalidating'
+
+_stats = Counter()
+
+
+def stats():
+    """Resultados del caché de páginas en este proceso: hit, stale, miss, not_modified, bypass."""
+    return dict(_stats)
+
+
+def _page_key(request):
+    # Por sesión (el token CSRF de la página depende de ella), ruta, filtros y día actual
+    query = sorted(request.GET.lists())
+    raw = f'{request.session.session_key}:{request.path}:{query}:{timezone.localdate()}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _etag(page_key, version):
+    return quote_etag(hashlib.sha256(f'{page_key}:{version}'.encode('utf-8')).hexdigest()[:32])
+
+
+def _finish(request, response, page_key, version):
+    etag = _etag(page_key, version)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(version))
+    response['Cache-Control'] = (
+        f'private, max-age=0, must-revalidate, stale-while-revalidate={settings.PAGE_CACHE_STALE_SECONDS}'
+    )
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(request, etag=etag, last_modified=int(version), response=response)
+
+
+def cache_page_by_data_version(view):
+    """
+    Cachea la página completa por usuario y filtros mientras no cambie la versión
+    de datos (core.versioning), y responde 304 a peticiones condicionales.
+
+    Cuando la versión cambia, una sola petición recalcula la página; las demás
+    siguen recibiendo la versión anterior durante PAGE_CACHE_STALE_SECONDS
+    (stale-while-revalidate) en lugar de recalcular todas a la vez.
+    """
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        # Las páginas con mensajes pendientes son únicas: no se sirven ni se guardan desde caché
+        if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+            _stats['bypass'] += 1
+            return view(request, *args, **kwargs)
+
+        version = get_data_version()
+        page_key = _page_key(request)
+        etag = _etag(page_key, version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(version))
+        if not_modified is not None:
+            _stats['not_modified'] += 1
+            return _finish(request, not_modified, page_key, version)
+
+        entry = cache.get(KEY.format(page_key))
+        if entry is not None:
+            cached_version, content_type, content = entry
+            if cached_version == version or not cache.add(
+                LOCK_KEY.format(page_key), 1, settings.PAGE_CACHE_STALE_SECONDS
+            ):
+                _stats['hit' if cached_version == version else 'stale'] += 1
+                response = HttpResponse(content, content_type=content_type)
+                return _finish(request, response, page_key, cached_version)
+
+        _stats['miss'] += 1
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+        finally:
+            cache.delete(LOCK_KEY.format(page_key))
+        if response.status_code != 200 or response.streaming:
+            return response
+        cache.set(
+            KEY.format(page_key),
+            (version, response['Content-Type'], response.content),
+            settings.PAGE_CACHE_TIMEOUT,
+        )
+        return _finish(request, response, page_key, version)
+
+    return wrapped
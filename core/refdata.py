@@ -0,0 +1,99 @@
+import threading
+import uuid
+from collections import Counter
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save
+from .deferred import defer
+
+VERSION_KEY = 'refdata:{}:version'
+
+_local = {}
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def stats():
+    """Aciertos y fallos del caché de referencia por modelo, p. ej. {'teams.team:hit': 10}."""
+    return dict(_stats)
+
+
+def _current_version(label):
+    key = VERSION_KEY.format(label)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(label):
+    cache.set(VERSION_KEY.format(label), uuid.uuid4().hex, None)
+
+
+class ReferenceDataManager(models.Manager):
+    """
+    Manager para tablas pequeñas que casi no cambian (tipos de actividad, equipos).
+
+    cached() y get_cached() sirven las filas desde memoria del proceso; sólo
+    consultan la base de datos cuando cambia la versión guardada en el caché,
+    que se renueva al confirmar (commit) cualquier guardado o borrado. Con un
+    caché por proceso (LocMem) los cambios hechos en otro proceso no se ven
+    hasta reiniciarlo: las filas sirven para mostrar y elegir, pero un valor
+    que se copia a la base de datos (p. ej. ActivityType.points al guardar una
+    actividad) se lee siempre de la base de datos. Dentro de una transacción
+    se lee siempre de la base de datos para no publicar filas que todavía
+    podrían deshacerse.
+    Las instancias devueltas se comparten entre peticiones: son de sólo lectura.
+    """
+
+    def __init__(self, ordering=None):
+        super().__init__()
+        self.ordering = ordering
+
+    def contribute_to_class(self, cls, name):
+        super().contribute_to_class(cls, name)
+        if not cls._meta.abstract:
+            post_save.connect(self._invalidate, sender=cls, weak=False, dispatch_uid=f'refdata-save-{cls._meta.label_lower}')
+            post_delete.connect(self._invalidate, sender=cls, weak=False, dispatch_uid=f'refdata-delete-{cls._meta.label_lower}')
+
+    def _invalidate(self, sender, **kwargs):
+        label = sender._meta.label_lower
+        defer(f'refdata:{label}', lambda: _bump_version(label))
+
+    def _query(self):
+        qs = self.get_queryset()
+        if self.ordering:
+            qs = qs.order_by(*self.ordering)
+        rows = list(qs)
+        return rows, {row.pk: row for row in rows}
+
+    def _load(self):
+        label = self.model._meta.label_lower
+        if connection.in_atomic_block:
+            _stats[f'{label}:bypass'] += 1
+            return self._query()
+
+        version = _current_version(label)
+        entry = _local.get(label)
+        if entry is not None and entry[0] == version:
+            _stats[f'{label}:hit'] += 1
+            return entry[1:]
+        _stats[f'{label}:miss'] += 1
+        rows, by_pk = self._query()
+        with _lock:
+            _local[label] = (version, rows, by_pk)
+        return rows, by_pk
+
+    def cached(self):
+        return list(self._load()[0])
+
+    def get_cached(self, pk):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise self.model.DoesNotExist(f'{self.model.__name__} con id {pk!r} no existe')
+        try:
+            return self._load()[1][pk]
+        except KeyError:
+            raise self.model.DoesNotExist(f'{self.model.__name__} con id {pk} no existe')
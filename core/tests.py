@@ -0,0 +1,241 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core import deferred, metrics, pagecache, refdata
+from core.models import VersionStamp
+from core.versioning import DATA_VERSION, bump_data_version
+from activities import leaderboard
+from activities.models import Activity, ActivityType
+from teams.models import Team
+from users.models.user import User
+
+
+class ReferenceDataManagerTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.team_b = Team.objects.create(name='Team B')
+        self.team_a = Team.objects.create(name='Team A')
+
+    def test_cached_rows_are_served_without_queries(self):
+        self.assertEqual([t.name for t in Team.objects.cached()], ['Team A', 'Team B'])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(Team.objects.cached()), 2)
+            self.assertEqual(Team.objects.get_cached(str(self.team_b.pk)).name, 'Team B')
+        self.assertGreaterEqual(refdata.stats()['teams.team:hit'], 2)
+
+    def test_save_and_delete_invalidate_after_commit(self):
+        Team.objects.cached()
+        self.team_a.name = 'Team Z'
+        self.team_a.save()
+        self.assertEqual([t.name for t in Team.objects.cached()], ['Team B', 'Team Z'])
+
+        self.team_b.delete()
+        with self.assertRaises(Team.DoesNotExist):
+            Team.objects.get_cached(self.team_b.pk)
+
+    def test_reads_inside_transaction_bypass_the_cache(self):
+        Team.objects.cached()
+        try:
+            with transaction.atomic():
+                Team.objects.create(name='Team C')
+                self.assertEqual(len(Team.objects.cached()), 3)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(len(Team.objects.cached()), 2)
+
+    def test_invalid_pk_raises_does_not_exist(self):
+        with self.assertRaises(Team.DoesNotExist):
+            Team.objects.get_cached('abc')
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        leaderboard.clear()
+        cache.clear()
+        # Datos iniciales confirmados: su trabajo diferido no se agrupa con el de cada test
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One')
+            self.commit = ActivityType.objects.create(name='Commit válido', points=4)
+            Activity.objects.create(activity_type=self.commit, user=self.user, date=timezone.now().date())
+        self.client.force_login(self.user)
+        self.url = reverse('dashboard:dashboard')
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first)
+        self.assertIn('stale-while-revalidate', first['Cache-Control'])
+
+        # Sólo el usuario de la sesión y la versión de datos; nada del ranking
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+
+    def test_conditional_request_returns_304(self):
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_data_change_invalidates_page(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.commit, user=self.user, date=timezone.now().date())
+        second = self.client.get(self.url)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.context['total_points'], 8)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_activity_type_change_invalidates_page(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.commit.category = 'otro'
+            self.commit.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], first['ETag'])
+
+    def test_version_bumped_by_another_process_invalidates_page(self):
+        first = self.client.get(self.url)
+        # Un comando de gestión u otro worker sólo comparte la base de datos, no el caché local
+        VersionStamp.objects.filter(name=DATA_VERSION).update(value=F('value') + 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_stale_page_served_while_another_request_revalidates(self):
+        first = self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        # Simula otra petición recalculando la página en este momento
+        page_key = pagecache._page_key(first.wsgi_request)
+        cache.add(pagecache.LOCK_KEY.format(page_key), 1, 30)
+
+        with self.assertNumQueries(2):
+            stale = self.client.get(self.url)
+        self.assertEqual(stale['ETag'], first['ETag'])
+
+    def test_filters_are_cached_separately(self):
+        daily = self.client.get(self.url, {'period': 'diario'})
+        weekly = self.client.get(self.url, {'period': 'semanal'})
+        self.assertNotEqual(daily['ETag'], weekly['ETag'])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.client.force_login(self.admin)
+
+    def _sample(self, text, series):
+        match = re.search(r'^' + re.escape(series) + r' (\S+)$', text, re.M)
+        return float(match.group(1)) if match else 0.0
+
+    def test_requests_are_measured_per_view(self):
+        before = self._sample(self.client.get('/metrics').content.decode(), 'http_requests_total{method="GET",status="200",view="dashboard:dashboard"}')
+        self.client.get(reverse('dashboard:dashboard'))
+        text = self.client.get('/metrics').content.decode()
+
+        self.assertEqual(self._sample(text, 'http_requests_total{method="GET",status="200",view="dashboard:dashboard"}'), before + 1)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertGreaterEqual(self._sample(text, 'http_request_duration_seconds_bucket{view="dashboard:dashboard",le="+Inf"}'), 1)
+        self.assertGreaterEqual(self._sample(text, 'db_queries_per_request_sum{view="dashboard:dashboard"}'), 1)
+        self.assertIn('cache_requests_total{cache="page",result="miss"}', text)
+
+    def test_signal_and_export_metrics(self):
+        commit = ActivityType.objects.create(name='Demo commit', points=4)
+        Activity.objects.create(activity_type=commit, user=self.admin, date=timezone.now().date())
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            self.client.get(reverse('reports:export_history', args=['csv'])).close()
+        text = metrics.render()
+        self.assertGreaterEqual(self._sample(text, 'signal_handler_duration_seconds_count{handler="activities.activity_saved"}'), 1)
+        self.assertGreaterEqual(self._sample(text, 'export_size_bytes_count{kind="history_csv"}'), 1)
+
+    def test_worker_files_are_aggregated(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(os.path.join(directory, '999999.json'), 'w') as f:
+            json.dump({
+                'counters': [['http_requests_total', [['method', 'GET'], ['status', '200'], ['view', 'otro:worker']], 5]],
+                'histograms': [['export_size_bytes', [['kind', 'otro']], [1, 0, 0, 0, 0, 0, 0, 500.0]]],
+            }, f)
+        with override_settings(METRICS_DIR=directory):
+            text = self.client.get('/metrics').content.decode()
+            self.assertTrue(any(name.startswith(f'{os.getpid()}-') for name in os.listdir(directory)))
+            # El proceso 999999 no existe: sus contadores pasan a dead.json y no retroceden
+            self.assertFalse(os.path.exists(os.path.join(directory, '999999.json')))
+            again = self.client.get('/metrics').content.decode()
+        for sample in (text, again):
+            self.assertEqual(self._sample(sample, 'http_requests_total{method="GET",status="200",view="otro:worker"}'), 5)
+            self.assertEqual(self._sample(sample, 'export_size_bytes_bucket{kind="otro",le="1000.0"}'), 1)
+            self.assertEqual(self._sample(sample, 'export_size_bytes_count{kind="otro"}'), 1)
+
+    @override_settings(METRICS_TOKEN='s3creto')
+    def test_metrics_require_token_or_admin(self):
+        self.client.logout()
+        # Detrás de un proxy local todas las peticiones llegan desde 127.0.0.1
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3creto').status_code, 200)
+        user = User.objects.create_user(email='user@example.com', password='pass', name='User One')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class DeferredWorkTests(TestCase):
+    def test_work_runs_once_per_key_after_commit(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                deferred.defer('test:once', lambda: calls.append('once'))
+            deferred.defer_batch('test:batch', calls.append, [3, 1])
+            deferred.defer_batch('test:batch', calls.append, [1, 2])
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['once', [3, 1, 2]])
+
+    def test_rolled_back_work_is_dropped_and_can_be_queued_again(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                deferred.defer_batch('test:batch', calls.append, [1])
+                raise RuntimeError
+            deferred.defer_batch('test:batch', calls.append, [2])
+        self.assertEqual(calls, [[2]])
+
+    def test_many_activity_saves_recompute_each_team_once(self):
+        team = Team.objects.create(name='Team A')
+        user = User.objects.create_user(email='user@example.com', password='pass', name='User One', team=team)
+        commit = ActivityType.objects.create(name='Demo commit', points=4)
+        with mock.patch('activities.signals.recompute_team_points') as recompute:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(5):
+                    Activity.objects.create(activity_type=commit, user=user, date=timezone.now().date())
+        recompute.assert_called_once_with([team.pk])
+
+    @override_settings(DEFERRED_WORK_THREADS=1)
+    def test_background_work_runs_in_thread_pool(self):
+        done = threading.Event()
+        threads = []
+
+        def work(items):
+            threads.append(threading.current_thread().name)
+            done.set()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deferred.defer_batch('test:background', work, [1], background=True)
+        self.assertTrue(done.wait(5))
+        self.assertTrue(threads[0].startswith('deferred'))
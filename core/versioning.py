@@ -0,0 +1,24 @@
+from .deferred import defer
+from .models import VersionStamp
+
+DATA_VERSION = 'data'
+
+
+def get_data_version():
+    """
+    Marca de tiempo (segundos epoch) del último cambio confirmado en
+    actividades, usuarios o equipos. Sirve como versión de los datos y como
+    Last-Modified de las páginas que dependen de ellos. Se lee de la base de
+    datos (una búsqueda por clave primaria): así cada worker ve al momento los
+    cambios hechos por otros workers y por los comandos de gestión.
+    """
+    return VersionStamp.current(DATA_VERSION)
+
+
+def _set_data_version():
+    VersionStamp.bump(DATA_VERSION)
+
+
+def bump_data_version(**kwargs):
+    """Renueva la versión al confirmar la transacción (una vez por transacción); se puede conectar directamente a señales."""
+    defer('core:data_version', _set_data_version)
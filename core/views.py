@@ -0,0 +1,19 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from . import metrics
+
+
+def _has_token(request):
+    # Authorization: Bearer <METRICS_TOKEN>; sin token configurado sólo entran administradores
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    expected = settings.METRICS_TOKEN
+    return bool(expected) and scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), expected)
+
+
+def metrics_view(request):
+    """Métricas de todos los workers; para el recolector con METRICS_TOKEN o para administradores."""
+    user = request.user
+    if not _has_token(request) and not (user.is_authenticated and user.is_admin):
+        return HttpResponseForbidden('No autorizado')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
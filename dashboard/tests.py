@@ -4,6 +4,7 @@ from django.utils import timezone
 from users.models.user import User
 from teams.models import Team
 from activities.models.activity_type import ActivityType
+from activities import leaderboard
 from activities.models.activity import Activity
 
 
@@ -30,4 +31,37 @@ class DashboardExportInjectionTests(TestCase):
         url = reverse('dashboard:export_ranking_pdf')
         resp = self.client.get(url, {'period': "' OR '1'='1"})
         self.assertEqual(resp.status_code, 200)
-        self.assertIn('application/pdf', resp['Content-Type'])
\ No newline at end of file
+        self.assertIn('application/pdf', resp['Content-Type'])
+
+class DashboardCategoryTests(TestCase):
+    def setUp(self):
+        leaderboard.clear()
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One')
+        other = User.objects.create_user(email='other@example.com', password='pass', name='User Two')
+        commit = ActivityType.objects.create(name='Commit válido', points=4, category=ActivityType.COMMIT)
+        early = ActivityType.objects.create(name='Llegar temprano', points=1, category=ActivityType.EARLY)
+        demo = ActivityType.objects.create(name='Demo interna', points=3, category='demo')
+        today = timezone.now().date()
+        for activity_type in (commit, commit, early, demo):
+            Activity.objects.create(activity_type=activity_type, user=self.user, date=today)
+        Activity.objects.create(activity_type=commit, user=other, date=today)
+        self.client.force_login(self.user)
+
+    def test_points_grouped_by_category(self):
+        response = self.client.get(reverse('dashboard:dashboard'))
+        user_points = response.context['user_points']
+        self.assertEqual(user_points['total'], 12)
+        self.assertEqual(
+            [(c['key'], c['label'], c['points']) for c in user_points['by_category']],
+            # Los tipos de datos_iniciales.sql aportan las categorías sin puntos
+            [
+                ('commit', 'Commit válido', 8),
+                ('sprint', 'Sprint Review', 0),
+                ('early', 'Llegar temprano', 1),
+                ('system', 'Completar sistema', 0),
+                ('demo', 'Demo', 3),
+            ],
+        )
+        self.assertEqual(response.context['total_points'], 16)
+        self.assertEqual(response.context['user_position'], 1)
+        self.assertContains(response, 'Demo:')
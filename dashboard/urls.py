@@ -5,6 +5,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('ranking/', views.ranking_api, name='ranking_api'),
     path('export/excel/', views.export_ranking_excel, name='export_ranking_excel'),
     path('export/pdf/', views.export_ranking_pdf, name='export_ranking_pdf'),
 ]
\ No newline at end of file
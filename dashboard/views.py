@@ -1,17 +1,20 @@
-import io
 from django.shortcuts import render
-from django.http import HttpResponse, FileResponse
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.db.models import Count, Sum
 from django.utils import timezone
-from datetime import timedelta
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from fpdf import FPDF
-from io import BytesIO
-from activities.models import Activity
+from datetime import datetime, timedelta
+from core.pagecache import cache_page_by_data_version
+from reports.export_cache import cached_export
+from reports.exporters import Report, get_format
+from reports.models import Period, Score
+from activities.models import Activity, ActivityType
+from activities.leaderboard import get_leaderboard
+from activities.points_index import leaderboard
 from users.models.user import User
 
 @login_required
+@cache_page_by_data_version
 def dashboard(request):
     # Obtener el período seleccionado (diario, semanal, quincenal)
     period = request.GET.get('period', 'diario')
@@ -28,213 +31,200 @@ def dashboard(request):
     # Obtener actividades del período
     activities = Activity.objects.filter(date__gte=start_date)
     
-    # Calcular puntos por usuario
-    user_points = {}
-    user_activities_count = {}
-    
-    def normalize_type_key(raw_name: str) -> str:
-        n = (raw_name or '').strip().lower()
-        # Spanish-friendly normalization
-        if 'commit' in n:
-            return 'commit'
-        if 'sprint' in n or 'review' in n:
-            return 'sprint'
-        if 'tempran' in n or 'puntual' in n or 'puntualidad' in n or 'temprano' in n:
-            return 'early'
-        if 'completar' in n or 'sistema' in n:
-            return 'system'
-        return n or 'otros'
-
-    for activity in activities:
-        user_id = activity.user.id
-        if user_id not in user_points:
-            user_points[user_id] = {
-                'user': activity.user,
-                'total': 0,
-                'activities_count': 0,
-                'by_type': {}
-            }
-    
-        user_points[user_id]['total'] += activity.activity_type.points
-        user_points[user_id]['activities_count'] += 1
-    
-        # Contar por tipo de actividad (normalizado)
-        type_key = normalize_type_key(activity.activity_type.name)
-        if type_key not in user_points[user_id]['by_type']:
-            user_points[user_id]['by_type'][type_key] = 0
-        user_points[user_id]['by_type'][type_key] += activity.activity_type.points
-    
-    # Convertir a lista y ordenar por puntos totales
-    ranking = sorted(user_points.values(), key=lambda x: x['total'], reverse=True)[:5] # Top 5
-    
-    # Encontrar la posición del usuario actual
-    user_position = next((i+1 for i, item in enumerate(ranking) if item['user'].id == request.user.id), '-')
+    # Quincena en curso y sus puntuaciones con reglas precalculadas (reports.scoring)
+    biweekly = Period.objects.filter(type=Period.BIWEEKLY, startDate__lte=today, endDate__gte=today).first()
+    period_score = Score.objects.filter(period=biweekly, user=request.user).first() if biweekly else None
+
+    if period not in ('diario', 'semanal'):
+        # Quincenal: el mismo ranking con reglas que publica close_biweekly
+        scores = Score.objects.filter(period=biweekly) if biweekly else Score.objects.none()
+        ranking = [
+            {'user': score.user, 'total': score.total_points, 'activities_count': score.activities}
+            for score in scores.select_related('user__team').order_by('position')[:5]
+        ]
+        user_position = period_score.position if period_score else '-'
+        total_points = scores.aggregate(total=Sum('total_points'))['total'] or 0
+    else:
+        # Ranking en memoria del periodo: top 5 y posición del usuario en O(log n)
+        board = get_leaderboard(start_date)
+        top = board.top(5)
+        users = User.objects.select_related('team').in_bulk([row['user_id'] for row in top])
+        ranking = [
+            {'user': users[row['user_id']], 'total': row['points'], 'activities_count': row['activities']}
+            for row in top
+            if row['user_id'] in users  # borrado después de la última puesta al día del ranking
+        ]
+        user_position = board.position(request.user.id) or '-'
+        total_points = board.total_points
     
     # Calcular días restantes en la quincena
     days_left = 15 - (today.day % 15)
     if days_left == 15:
         days_left = 0
     
-    # Obtener puntos del usuario actual
-    current_user_points = user_points.get(request.user.id, {
-        'total': 0, 
-        'activities_count': 0,
-        'by_type': {}
-    })
-    
-    # Obtener puntos por tipo para el usuario actual
-    commit_points = current_user_points['by_type'].get('commit', 0)
-    sprint_points = current_user_points['by_type'].get('sprint', 0)
-    early_points = current_user_points['by_type'].get('early', 0)
-    system_points = current_user_points['by_type'].get('system', 0)
+    # Puntos del usuario actual por categoría (GROUP BY category)
+    points_by_category = dict(
+        activities.filter(user=request.user)
+        .values_list('activity_type__category')
+        .annotate(points=Sum('points'))
+        .order_by()
+    )
+    categories = {t.category for t in ActivityType.objects.cached()} | set(points_by_category)
+    by_category = [
+        {
+            'key': category,
+            'label': ActivityType.category_label(category),
+            'points': points_by_category.get(category, 0),
+        }
+        for category in sorted(categories, key=ActivityType.category_sort_key)
+    ]
     
     context = {
         'period': period,
-        'total_points': sum(item['total'] for item in user_points.values()),
+        'total_points': total_points,
         'user_position': user_position,
         'days_left': days_left,
         'ranking': ranking,
+        'period_score': period_score,
         'user_points': {
-            'total': current_user_points['total'],
-            'commit': commit_points,
-            'sprint': sprint_points,
-            'early': early_points,
-            'system': system_points
+            'total': sum(points_by_category.values()),
+            'by_category': by_category,
         },
     }
     
     return render(request, 'dashboard/dashboard.html', context)
 
-@login_required
-def export_ranking_excel(request):
+def _ranking_period(request):
+    """Periodo normalizado (diario, semanal o quincenal) y su fecha de inicio."""
     period = request.GET.get('period', 'diario')
     today = timezone.localtime(timezone.now()).date()
-
     if period == 'diario':
-        start_date = today
-    elif period == 'semanal':
-        start_date = today - timedelta(days=today.weekday())
-    else:
-        start_date = today - timedelta(days=14)
-
-    activities = Activity.objects.select_related('user', 'user__team', 'activity_type').filter(date__gte=start_date)
-
-    # Armar datos de ranking
-    user_data = {}
-    for a in activities:
-        user = a.user
-        uid = user.id
-
-        if uid not in user_data:
-            user_data[uid] = {
-                'name': user.name,
-                'team': user.team.name if getattr(user, 'team', None) else 'Sin equipo',
-                'points': 0,
-                'activities': 0,
-            }
-
-        user_data[uid]['points'] += a.activity_type.points
-        user_data[uid]['activities'] += 1
-
-    ranking = sorted(user_data.values(), key=lambda x: x['points'], reverse=True)
-
-    # Crear archivo Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Ranking'
-
-    # Encabezados
-    headers = ['Posición', 'Nombre', 'Equipo', 'Puntos', 'Actividades']
-    ws.append(headers)
-
-    # Estilo de encabezados
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color='FFFFFF')
-        cell.fill = PatternFill(start_color='2D2F3A', end_color='2D2F3A', fill_type='solid')
-        cell.alignment = Alignment(horizontal='center')
-
-    # Agregar filas
-    for idx, row in enumerate(ranking, start=1):
-        ws.append([
-            idx,
-            row['name'],
-            row['team'],
-            row['points'],
-            row['activities']
-        ])
-
-    # Autoajustar columnas
-    for col in ws.columns:
-        max_len = 12
-        for cell in col:
-            try:
-                max_len = max(max_len, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 2, 40)
-
-    # Respuesta HTTP
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-
-    filename = f"ranking_{period}.xlsx"
-    response = FileResponse(bio, as_attachment=True, filename=filename, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return period, today
+    if period == 'semanal':
+        return period, today - timedelta(days=today.weekday())
+    return 'quincenal', today - timedelta(days=14)
+
+def _ranking_rows(start_date):
+    """Ranking completo del periodo agregado en la base de datos."""
+    rows = (
+        Activity.objects.filter(date__gte=start_date)
+        .values('user_id', 'user__name', 'user__team__name')
+        .annotate(points=Sum('points'), activities=Count('id'))
+        .order_by('-points', 'user_id')
     )
-    return response
+    return [
+        {
+            'name': row['user__name'],
+            'team': row['user__team__name'] or 'Sin equipo',
+            'points': row['points'],
+            'activities': row['activities'],
+        }
+        for row in rows
+    ]
+
+RANKING_API_DEFAULT_LIMIT = 50
+RANKING_API_MAX_LIMIT = 500
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
 
 @login_required
-def export_ranking_pdf(request):
-    period = request.GET.get('period', 'diario')
+def ranking_api(request):
+    """
+    Ranking de un rango arbitrario (start/end, YYYY-MM-DD) o "a fecha de" end
+    si no se indica start. Se resuelve sobre el índice de acumulados por día,
+    sin sumar actividades. Con period (diario, semanal, quincenal) y sin
+    fechas se usa el ranking en memoria del periodo, que además devuelve la
+    posición del usuario y, con around=k, sus k vecinos por arriba y por abajo.
+    """
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), RANKING_API_MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else RANKING_API_DEFAULT_LIMIT
+
+    if request.GET.get('period') and not (start or end):
+        return _period_ranking_api(request, limit)
+
+    start_date, end_date = _parse_date(start), _parse_date(end)
+    if (start and start_date is None) or (end and end_date is None):
+        return JsonResponse({'error': 'Fechas inválidas; usa YYYY-MM-DD'}, status=400)
+    if start_date and end_date and start_date > end_date:
+        return JsonResponse({'error': 'La fecha inicial es posterior a la final'}, status=400)
+
+    rows = leaderboard(start_date, end_date, limit=limit)
+    return JsonResponse({
+        'start': start_date.isoformat() if start_date else None,
+        'end': end_date.isoformat() if end_date else None,
+        'results': [dict(row, position=idx) for idx, row in enumerate(rows, start=1)],
+    })
 
-    today = timezone.localtime(timezone.now()).date()
-    if period == 'diario':
-        start_date = today
-    elif period == 'semanal':
-        start_date = today - timedelta(days=today.weekday())
-    else:
-        start_date = today - timedelta(days=14)
+def _period_ranking_api(request, limit):
+    period, start_date = _ranking_period(request)
+    board = get_leaderboard(start_date)
+    rows = board.top(limit)
+    around = request.GET.get('around', '')
+    neighbours = board.around(request.user.id, min(int(around), RANKING_API_MAX_LIMIT)) if around.isdigit() else []
+
+    # Nombres y equipos de todas las filas en una sola consulta
+    names = {
+        row['pk']: row
+        for row in User.objects.filter(pk__in={row['user_id'] for row in rows + neighbours}).values('pk', 'name', 'team__name')
+    }
 
-    activities = Activity.objects.filter(date__gte=start_date)
+    def serialize(row):
+        user = names.get(row['user_id'], {})
+        return dict(row, name=user.get('name'), team=user.get('team__name') or 'Sin equipo')
 
-    user_data = {}
-    for a in activities:
-        uid = a.user.id
-        if uid not in user_data:
-            user_data[uid] = {
-                'name': a.user.name,
-                'team': a.user.team.name if getattr(a.user, 'team', None) else 'Sin equipo',
-                'points': 0,
-                'activities': 0,
-            }
-        user_data[uid]['points'] += a.activity_type.points
-        user_data[uid]['activities'] += 1
-
-    ranking = sorted(user_data.values(), key=lambda x: x['points'], reverse=True)
-
-    pdf = FPDF(orientation='P', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font('Helvetica', 'B', 16)
-    pdf.cell(0, 10, 'Ranking', ln=1)
-
-    # Header
-    pdf.set_font('Helvetica', 'B', 10)
-    headers = ['#', 'Nombre', 'Equipo', 'Puntos', 'Actividades']
-    widths = [10, 60, 60, 25, 25]
-    for h, w in zip(headers, widths):
-        pdf.cell(w, 8, h, border=1, align='C')
-    pdf.ln(8)
-
-    # Rows
-    pdf.set_font('Helvetica', '', 10)
-    for idx, row in enumerate(ranking, start=1):
-        cells = [str(idx), row['name'], row['team'], str(row['points']), str(row['activities'])]
-        for c, w in zip(cells, widths):
-            pdf.cell(w, 8, c, border=1, align='C')
-        pdf.ln(8)
-
-    output = bytes(pdf.output(dest='S'))
-    buffer = io.BytesIO(output)
-    buffer.seek(0)
-    filename = f"ranking_{period}.pdf"
-    return FileResponse(buffer, as_attachment=True, filename=filename, content_type='application/pdf')
\ No newline at end of file
+    score = board.scores.get(request.user.id)
+    data = {
+        'period': period,
+        'start': start_date.isoformat(),
+        'end': None,
+        'results': [serialize(row) for row in rows],
+        'me': {
+            'position': board.position(request.user.id),
+            'points': score[0] if score else 0,
+            'participants': len(board),
+        },
+    }
+    if around.isdigit():
+        data['around'] = [serialize(row) for row in neighbours]
+    return JsonResponse(data)
+
+RANKING_EXPORT_COLUMNS = [
+    ('position', 'Posición', 15, 'C'),
+    ('name', 'Nombre', 70, 'L'),
+    ('team', 'Equipo', 55, 'L'),
+    ('points', 'Puntos', 25, 'R'),
+    ('activities', 'Actividades', 25, 'R'),
+]
+
+def _export_ranking(request, fmt):
+    period, start_date = _ranking_period(request)
+    export_format = get_format(fmt)
+
+    def build():
+        rows = [dict(row, position=idx) for idx, row in enumerate(_ranking_rows(start_date), start=1)]
+        summary = [
+            ('Desde', start_date.isoformat()),
+            ('Participantes', len(rows)),
+            ('Puntos', sum(row['points'] for row in rows)),
+        ]
+        return export_format.render(Report(f'Ranking {period}', RANKING_EXPORT_COLUMNS, rows, summary=summary))
+
+    # El ranking es el mismo para todos los usuarios: alcance global
+    return cached_export(
+        request, f'ranking_{fmt}', {'start_date': start_date}, 'all',
+        filename=f"ranking_{period}.{fmt}", content_type=export_format.content_type, build=build,
+    )
+
+@login_required
+def export_ranking_excel(request):
+    return _export_ranking(request, 'xlsx')
+
+@login_required
+def export_ranking_pdf(request):
+    return _export_ranking(request, 'pdf')
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models.period import Period
 from .models.ranking import Ranking
+from .models.scoring import Score, ScoringRule
 
 @admin.register(Period)
 class PeriodAdmin(admin.ModelAdmin):
@@ -11,4 +12,17 @@ class PeriodAdmin(admin.ModelAdmin):
 class RankingAdmin(admin.ModelAdmin):
     list_display = ('user', 'period', 'position', 'total_points', 'total_activities')
     list_filter = ('period',)
-    search_fields = ('user__name',)
\ No newline at end of file
+    search_fields = ('user__name',)
+
+@admin.register(ScoringRule)
+class ScoringRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'activity_type', 'team', 'min_days', 'bonus_points', 'multiplier', 'cap', 'is_active')
+    list_editable = ('is_active',)
+    list_filter = ('kind', 'is_active')
+    search_fields = ('name',)
+
+@admin.register(Score)
+class ScoreAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'position', 'base_points', 'bonus_points', 'total_points', 'computed_at')
+    list_filter = ('period',)
+    search_fields = ('user__name',)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        import reports.signals
+        from core import metrics
+        from . import export_cache
+
+        def export_cache_stats():
+            for result, value in export_cache.stats().items():
+                yield 'cache_requests_total', {'cache': 'export', 'result': result}, value
+
+        metrics.register_collector(export_cache_stats)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from core import metrics
+from core.versioning import get_data_version
+
+_stats = Counter()
+
+
+def stats():
+    """Aciertos y fallos del caché de exportes en este proceso."""
+    return dict(_stats)
+
+
+def _cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'export_cache')
+
+
+def export_key(kind, filters, scope, version):
+    """Clave de contenido: mismo tipo, filtros, alcance y versión de datos => mismos bytes."""
+    raw = json.dumps([kind, filters, scope, version], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _evict(directory, keep):
+    """Borra los archivos menos usados (mtime más antiguo) hasta respetar EXPORT_CACHE_MAX_BYTES."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.startswith('.'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= settings.EXPORT_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def cached_export(request, kind, filters, scope, filename, content_type, build):
+    """
+    Devuelve el exporte desde MEDIA_ROOT/export_cache si ya se generó para la
+    misma combinación (kind, filtros, alcance, versión de datos); si no, llama a
+    build() (que devuelve los bytes del archivo), lo guarda y lo sirve.
+    """
+    # Versión leída de la base de datos: las escrituras de otros workers y de
+    # los comandos de gestión cambian la clave aunque no compartan el caché
+    version = get_data_version()
+    key = export_key(kind, filters, scope, version)
+    etag = quote_etag(key[:32])
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(version))
+    if not_modified is not None:
+        _stats['not_modified'] += 1
+        return not_modified
+
+    directory = _cache_dir()
+    path = os.path.join(directory, f'{key}{os.path.splitext(filename)[1]}')
+    # Se abre antes de tocarlo: otro worker puede desalojarlo en cualquier momento,
+    # y un descriptor abierto sigue siendo legible aunque el archivo se borre
+    try:
+        cached = open(path, 'rb')
+    except FileNotFoundError:
+        cached = None
+    if cached is not None:
+        _stats['hit'] += 1
+        try:
+            os.utime(path)  # marca de uso para el desalojo LRU
+        except FileNotFoundError:
+            pass
+    else:
+        _stats['miss'] += 1
+        with metrics.timer('export_duration_seconds', {'kind': kind}):
+            content = build()
+        metrics.observe('export_size_bytes', len(content), {'kind': kind})
+        os.makedirs(directory, exist_ok=True)
+        # Escritura atómica: otro worker nunca ve un archivo a medias. El temporal
+        # (que _evict ignora) se abre antes de publicarlo con su nombre final
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(content)
+        cached = open(tmp_path, 'rb')
+        os.replace(tmp_path, path)
+        _evict(directory, keep=path)
+
+    response = FileResponse(cached, as_attachment=True, filename=filename, content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(version))
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
@@ -0,0 +1,55 @@
+"""
+Registro de formatos de exporte. Cada formato apunta a una función
+render(report) -> bytes por su ruta de importación, y el módulo (openpyxl,
+fpdf...) sólo se importa la primera vez que se genera un archivo de ese
+formato: los workers que nunca exportan no pagan su arranque ni su memoria.
+"""
+from collections import namedtuple
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+# width: ancho en mm para el PDF; None deja la columna fuera del PDF
+Column = namedtuple('Column', ['key', 'header', 'width', 'align'], defaults=(None, 'L'))
+
+
+class Report:
+    """Datos de un exporte independientes del formato: filas como dicts indexados por Column.key."""
+
+    def __init__(self, title, columns, rows, group_by=None, summary=()):
+        self.title = title
+        self.columns = [Column(*column) for column in columns]
+        self.rows = rows
+        self.group_by = group_by
+        self.summary = summary
+
+
+class ExportFormat:
+    def __init__(self, name, renderer, content_type):
+        self.name = name
+        self.renderer_path = renderer
+        self.content_type = content_type
+
+    @cached_property
+    def renderer(self):
+        return import_string(self.renderer_path)
+
+    def render(self, report):
+        return self.renderer(report)
+
+
+FORMATS = {}
+
+
+def register(name, renderer, content_type):
+    FORMATS[name] = ExportFormat(name, renderer, content_type)
+
+
+def get_format(name):
+    """Formato registrado o None si no existe."""
+    return FORMATS.get(name)
+
+
+register('xlsx', 'reports.exporters.xlsx.render', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+register('pdf', 'reports.exporters.pdf.render', 'application/pdf')
+register('csv', 'reports.exporters.text.render_csv', 'text/csv; charset=utf-8')
+register('ndjson', 'reports.exporters.text.render_ndjson', 'application/x-ndjson')
@@ -0,0 +1,18 @@
+from reports.pdf import TableReport
+
+
+def render(report):
+    """Una sección por valor de report.group_by (p. ej. por equipo); esa columna pasa al título de la sección."""
+    columns = [c for c in report.columns if c.width is not None and c.key != report.group_by]
+    table = TableReport(report.title, [(c.header, c.width, c.align) for c in columns])
+
+    if report.group_by is None:
+        sections = [('', [tuple(row[c.key] for c in columns) for row in report.rows])]
+    else:
+        group_header = next(c.header for c in report.columns if c.key == report.group_by)
+        groups = {}
+        for row in report.rows:
+            groups.setdefault(row[report.group_by], []).append(tuple(row[c.key] for c in columns))
+        sections = [(f'{group_header}: {name}', groups[name]) for name in sorted(groups, key=str)]
+
+    return table.render(sections, report.summary)
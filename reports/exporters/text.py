@@ -0,0 +1,19 @@
+import csv
+import io
+import json
+
+
+def render_csv(report):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.header for column in report.columns])
+    for row in report.rows:
+        writer.writerow([row[column.key] for column in report.columns])
+    # BOM para que Excel detecte UTF-8 al abrir el archivo
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+def render_ndjson(report):
+    keys = [column.key for column in report.columns]
+    lines = (json.dumps({key: row[key] for key in keys}, ensure_ascii=False, default=str) for row in report.rows)
+    return ''.join(line + '\n' for line in lines).encode('utf-8')
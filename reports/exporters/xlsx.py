@@ -0,0 +1,33 @@
+from io import BytesIO
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, PatternFill
+
+
+def render(report):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = report.title[:31]
+
+    # Encabezados
+    ws.append([column.header for column in report.columns])
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='2D2F3A', end_color='2D2F3A', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+
+    for row in report.rows:
+        ws.append([row[column.key] for column in report.columns])
+
+    # Autoajustar columnas
+    for col in ws.columns:
+        max_len = 12
+        for cell in col:
+            try:
+                max_len = max(max_len, len(str(cell.value)))
+            except Exception:
+                pass
+        ws.column_dimensions[col[0].column_letter].width = min(max_len + 2, 40)
+
+    bio = BytesIO()
+    wb.save(bio)
+    return bio.getvalue()
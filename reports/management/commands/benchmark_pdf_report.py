@@ -0,0 +1,46 @@
+import random
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports.pdf import TableReport
+
+COLUMNS = [
+    ('Fecha', 25, 'C'),
+    ('Usuario', 60, 'L'),
+    ('Actividad', 80, 'L'),
+    ('Puntos', 25, 'R'),
+]
+ACTIVITIES = ['Commit válido', 'Presentar en Sprint Review', 'Llegar temprano', 'Completar sistema de inventario y facturación']
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de generación del PDF del historial con datos sintéticos, en serie y en paralelo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+        parser.add_argument('--teams', type=int, default=8, help='Secciones del reporte')
+        parser.add_argument('--workers', type=int, default=settings.PDF_RENDER_WORKERS)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        today = date.today()
+        for count in options['rows']:
+            sections = {}
+            for i in range(count):
+                team = f'Equipo {i % options["teams"]}'
+                sections.setdefault(team, []).append((
+                    (today - timedelta(days=i // 500)).isoformat(),
+                    f'Usuario con un nombre bastante largo {rng.randrange(1000)}',
+                    rng.choice(ACTIVITIES),
+                    rng.choice((1, 4, 16)),
+                ))
+            sections = sorted(sections.items())
+
+            results = []
+            for label, workers in (('serie', 1), (f'{options["workers"]} procesos', options['workers'])):
+                report = TableReport('Historial de Actividades', COLUMNS, workers=workers, parallel_min_rows=0)
+                started = time.perf_counter()
+                content = report.render(sections, [('Actividades', count)])
+                results.append(f'{label}: {time.perf_counter() - started:.2f}s')
+            self.stdout.write(f'{count} filas ({len(content) / 1024 / 1024:.1f} MB): ' + ', '.join(results))
@@ -0,0 +1,60 @@
+import json
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+CHILD = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns  # importa todas las vistas, como al servir la primera petición
+if sys.argv[1] == 'eager':
+    import openpyxl, openpyxl.styles, fpdf
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': [name for name in ('openpyxl', 'fpdf') if name in sys.modules],
+}))
+'''
+HEAVY = ('openpyxl', 'fpdf')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el arranque de un worker (django.setup() + urlconf) con los exportadores '
+        'cargados bajo demanda frente a importar openpyxl y fpdf al inicio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for mode, label in (('lazy', 'Bajo demanda'), ('eager', 'openpyxl + fpdf al inicio')):
+            samples = [self._run(mode) for _ in range(options['runs'])]
+            seconds = statistics.median(s['seconds'] for s in samples)
+            rss = statistics.median(s['rss_kb'] for s in samples) / 1024
+            heavy = statistics.median(s['heavy_us'] for s in samples) / 1000
+            loaded = ', '.join(samples[0]['loaded']) or 'ninguno'
+            self.stdout.write(
+                f'{label}: arranque {seconds * 1000:.0f}ms, RSS {rss:.1f} MB, '
+                f'importación de exportadores {heavy:.0f}ms (cargados: {loaded})'
+            )
+
+    def _run(self, mode):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD, mode],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        # Formato de -X importtime: 'import time: self [us] | cumulative [us] | módulo'
+        sample['heavy_us'] = sum(
+            int(line.split('|')[1])
+            for line in result.stderr.splitlines()
+            if line.startswith('import time:') and line.split('|')[2].strip() in HEAVY
+        )
+        return sample
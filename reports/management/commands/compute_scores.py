@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from reports.models import Period
+from reports.scoring import compute_period_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula las puntuaciones con reglas (Score) de un periodo. Por defecto, '
+        'la quincena en curso, que se crea abierta si no existe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, help='Id del periodo')
+
+    def handle(self, *args, **options):
+        if options['period']:
+            try:
+                period = Period.objects.get(pk=options['period'])
+            except Period.DoesNotExist:
+                raise CommandError(f'No existe el periodo {options["period"]}')
+        else:
+            period = Period.current_biweekly()
+
+        started = time.perf_counter()
+        users = compute_period_scores(period)
+        self.stdout.write(self.style.SUCCESS(
+            f'{users} usuarios puntuados en {period} ({time.perf_counter() - started:.2f}s)'
+        ))
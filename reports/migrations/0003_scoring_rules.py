@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0009_daily_points'),
+        ('reports', '0002_initial'),
+        ('teams', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('streak', 'Bono por racha'), ('team_multiplier', 'Multiplicador de equipo'), ('cap', 'Tope por periodo')], max_length=20)),
+                ('min_days', models.PositiveSmallIntegerField(blank=True, help_text='Días consecutivos para que empiece el bono', null=True)),
+                ('bonus_points', models.IntegerField(blank=True, help_text='Puntos extra por cada día de racha desde min_days', null=True)),
+                ('multiplier', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('cap', models.IntegerField(blank=True, help_text='Máximo de puntos por usuario en el periodo', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activity_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='activities.activitytype')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='teams.team')),
+            ],
+            options={
+                'ordering': ['kind', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Score',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('base_points', models.IntegerField(default=0)),
+                ('bonus_points', models.IntegerField(default=0)),
+                ('total_points', models.IntegerField(default=0)),
+                ('activities', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reports.period')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'position'], name='score_period_position_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'user'), name='score_period_user_uniq')],
+            },
+        ),
+    ]
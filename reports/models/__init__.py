@@ -1,2 +1,3 @@
 from .period import Period
-from .ranking import Ranking
\ No newline at end of file
+from .ranking import Ranking
+from .scoring import ScoringRule, Score
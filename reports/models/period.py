@@ -1,4 +1,6 @@
+from datetime import timedelta
 from django.db import models
+from django.utils import timezone
 
 class Period(models.Model):
     DAILY = 'daily'
@@ -16,4 +18,34 @@ class Period(models.Model):
     is_closed = models.BooleanField(default=False)
 
     def __str__(self):
-        return f'{self.type.capitalize()} - {self.startDate} to {self.endDate}'
\ No newline at end of file
+        return f'{self.type.capitalize()} - {self.startDate} to {self.endDate}'
+
+    @staticmethod
+    def current_range(period):
+        """(inicio, fin) del periodo que contiene hoy; cualquier otro valor se trata como quincenal."""
+        today = timezone.localtime(timezone.now()).date()
+        if period == Period.DAILY:
+            return today, today
+        if period == Period.WEEKLY:
+            start = today - timedelta(days=today.weekday())
+            end = start + timedelta(days=6)
+            return start, end
+        # biweekly: 1-15, 16-end
+        if today.day <= 15:
+            start = today.replace(day=1)
+            end = today.replace(day=15)
+        else:
+            start = today.replace(day=16)
+            # end of month
+            next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+            end = next_month - timedelta(days=1)
+        return start, end
+
+    @classmethod
+    def current_biweekly(cls):
+        """Quincena en curso, creada abierta si aún no existe."""
+        start_date, end_date = cls.current_range(cls.BIWEEKLY)
+        period, _ = cls.objects.get_or_create(
+            type=cls.BIWEEKLY, startDate=start_date, endDate=end_date, defaults={'is_closed': False},
+        )
+        return period
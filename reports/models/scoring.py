@@ -0,0 +1,75 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from activities.models.activity_type import ActivityType
+from teams.models import Team
+from users.models.user import User
+from .period import Period
+
+
+class ScoringRule(models.Model):
+    """
+    Regla declarativa sobre los puntos de un periodo. Se aplican en este orden:
+    topes por tipo de actividad, bonos por racha, multiplicadores de equipo y
+    topes del total (ver reports.scoring).
+    """
+    STREAK = 'streak'
+    TEAM_MULTIPLIER = 'team_multiplier'
+    CAP = 'cap'
+    KIND_CHOICES = [
+        (STREAK, 'Bono por racha'),
+        (TEAM_MULTIPLIER, 'Multiplicador de equipo'),
+        (CAP, 'Tope por periodo'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Racha: tipo contado; tope: si se indica, limita sólo los puntos de ese tipo
+    activity_type = models.ForeignKey(ActivityType, on_delete=models.CASCADE, null=True, blank=True)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True)
+    min_days = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Días consecutivos para que empiece el bono')
+    bonus_points = models.IntegerField(null=True, blank=True, help_text='Puntos extra por cada día de racha desde min_days')
+    multiplier = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    cap = models.IntegerField(null=True, blank=True, help_text='Máximo de puntos por usuario en el periodo')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['kind', 'id']
+
+    def __str__(self):
+        return f'{self.name} ({self.get_kind_display()})'
+
+    def clean(self):
+        super().clean()
+        required = {
+            self.STREAK: ('activity_type', 'min_days', 'bonus_points'),
+            self.TEAM_MULTIPLIER: ('team', 'multiplier'),
+            self.CAP: ('cap',),
+        }.get(self.kind, ())
+        missing = [field for field in required if getattr(self, field) in (None, '')]
+        if missing:
+            raise ValidationError({field: 'Este campo es obligatorio para este tipo de regla' for field in missing})
+
+
+class Score(models.Model):
+    """Puntuación precalculada de un usuario en un periodo con las reglas vigentes."""
+    period = models.ForeignKey(Period, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    position = models.IntegerField()
+    base_points = models.IntegerField(default=0)
+    # total - base: bonos por racha más el efecto de multiplicadores y topes
+    bonus_points = models.IntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+    activities = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'user'], name='score_period_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'position'], name='score_period_position_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user.name} - {self.total_points} pts en {self.period}'
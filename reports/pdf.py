@@ -0,0 +1,236 @@
+import multiprocessing
+from collections import namedtuple
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from django.conf import settings
+from fpdf import FPDF
+
+Column = namedtuple('Column', ['header', 'width', 'align'])
+
+FONT_SIZE = 8
+ROW_HEIGHT = 6
+FOOTER_HEIGHT = 12
+
+_executor = None
+_executor_workers = 0
+
+
+def _get_executor(workers):
+    """Pool de procesos compartido por todas las peticiones del worker; se crea en el primer uso."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        # spawn: los hijos no heredan conexiones a la base de datos ni hilos del servidor
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _executor_workers = workers
+    return _executor
+
+
+def _latin1(value):
+    """Las fuentes estándar de PDF sólo cubren latin-1; el resto se reemplaza por '?'."""
+    return str(value).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+@lru_cache(maxsize=None)
+def _measurer(style, size):
+    """Documento vacío con la fuente elegida, sólo para medir texto con get_string_width (en mm)."""
+    pdf = FPDF(unit='mm')
+    pdf.set_font('Helvetica', style, size)
+    return pdf.get_string_width
+
+
+@lru_cache(maxsize=65536)
+def _fit(value, available, style, size):
+    """
+    Texto listo para el PDF (latin-1, recortado con puntos suspensivos y
+    escapado) y su ancho en mm. Fechas, nombres y tipos se repiten mucho entre
+    filas, así que cada valor se mide una sola vez por proceso.
+    """
+    measure = _measurer(style, size)
+    text = _latin1(value)
+    text_w = measure(text)
+    if text_w > available:
+        ellipsis_w = measure('...')
+        # Las fuentes estándar no tienen kerning: el ancho es la suma de los caracteres
+        while text and text_w + ellipsis_w > available:
+            text_w -= measure(text[-1])
+            text = text[:-1]
+        text += '...'
+        text_w += ellipsis_w
+    return _pdf_escape(text), text_w
+
+
+def _render_row(out, layout, values, y, font, style):
+    k, page_h, size, row_h, c_margin = (
+        layout['k'], layout['page_h'], layout['size'], layout['row_h'], layout['c_margin'],
+    )
+    text_y = (page_h - y - 0.5 * row_h - 0.3 * size / k) * k
+    for value, x, width, align in zip(values, layout['xs'], layout['widths'], layout['aligns']):
+        text, text_w = _fit(value, width - 2 * c_margin, style, size)
+        if not text:
+            continue
+        if align == 'R':
+            text_x = x + width - c_margin - text_w
+        elif align == 'C':
+            text_x = x + (width - text_w) / 2
+        else:
+            text_x = x + c_margin
+        out.append(f'BT /F{font} {size:.2f} Tf {text_x * k:.2f} {text_y:.2f} Td ({text}) Tj ET')
+
+
+def _render_chunk(layout, rows):
+    """
+    Dibuja una página de la tabla (encabezado y filas) como operadores PDF
+    crudos. Se ejecuta en los procesos del pool: sólo recibe valores y la
+    geometría de la tabla, así que no necesita Django ni el documento FPDF.
+    """
+    k, page_h, row_h = layout['k'], layout['page_h'], layout['row_h']
+    left, width = layout['xs'][0] * k, sum(layout['widths']) * k
+    y = layout['y_top']
+
+    # Encabezado: fondo oscuro y texto blanco en negrita
+    out = ['0 G 0.176 0.184 0.227 rg']
+    out.append(f'{left:.2f} {(page_h - y) * k:.2f} {width:.2f} {-row_h * k:.2f} re B')
+    out.append('1 g')
+    _render_row(out, layout, layout['headers'], y, layout['bold_font'], 'B')
+    out.append('0 g')
+    y += row_h
+
+    for row in rows:
+        _render_row(out, layout, row, y, layout['font'], '')
+        y += row_h
+
+    # Rejilla: una línea por fila y por columna en vez de un rectángulo por celda
+    top, bottom = (page_h - layout['y_top']) * k, (page_h - y) * k
+    for line_y in range(len(rows) + 2):
+        y_pt = (page_h - layout['y_top'] - line_y * row_h) * k
+        out.append(f'{left:.2f} {y_pt:.2f} m {left + width:.2f} {y_pt:.2f} l')
+    for x in layout['xs'] + [layout['xs'][-1] + layout['widths'][-1]]:
+        out.append(f'{x * k:.2f} {top:.2f} m {x * k:.2f} {bottom:.2f} l')
+    out.append('S')
+    return '\n'.join(out).encode('latin-1')
+
+
+class ReportPDF(FPDF):
+    """
+    Documento con el título y la sección actual repetidos en cada página.
+
+    fpdf2 no tiene API pública para insertar en la página contenido ya
+    dibujado ni para conocer el recurso (/F<n>) de una fuente: font_resource y
+    append_content son los únicos accesos a sus internos, y por eso la versión
+    de fpdf2 está fijada en requirements.txt.
+    """
+
+    def __init__(self, title):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.report_title = title
+        self.section = ''
+        self.set_auto_page_break(False)
+        self.set_margins(10, 10, 10)
+
+    def header(self):
+        self.set_font('Helvetica', 'B', 14)
+        self.cell(0, 9, self.report_title, new_x='LMARGIN', new_y='NEXT')
+        if self.section:
+            self.set_font('Helvetica', 'B', 10)
+            self.cell(0, 7, _latin1(self.section), new_x='LMARGIN', new_y='NEXT')
+
+    def footer(self):
+        self.set_y(-FOOTER_HEIGHT + 2)
+        self.set_font('Helvetica', '', 8)
+        self.cell(0, 6, f'Página {self.page_no()}/{{nb}}', align='C')
+
+    def font_resource(self, family, style, size):
+        """Selecciona la fuente (registrándola en el documento) y devuelve su número de recurso."""
+        self.set_font(family, style, size)
+        return self.current_font.i
+
+    def append_content(self, stream):
+        """Añade operadores PDF crudos (bytes latin-1) a la página actual."""
+        self._out(stream)
+
+
+class TableReport:
+    """
+    Reporte PDF tabular. Las filas de cada sección se parten en bloques del
+    tamaño de una página; cada bloque se dibuja por separado (en un pool de
+    procesos si hay suficientes filas) y los bloques se ensamblan en orden en
+    un único documento, precedido por una página de resumen.
+    """
+
+    def __init__(self, title, columns, workers=None, parallel_min_rows=None):
+        self.title = title
+        self.columns = [Column(*column) for column in columns]
+        self.workers = settings.PDF_RENDER_WORKERS if workers is None else workers
+        self.parallel_min_rows = settings.PDF_PARALLEL_MIN_ROWS if parallel_min_rows is None else parallel_min_rows
+
+    def render(self, sections, summary=()):
+        """
+        sections: lista de (nombre, filas) con filas como tuplas de valores.
+        summary: pares (etiqueta, valor) para la página de resumen.
+        """
+        sections = [(name, rows) for name, rows in sections if rows]
+        pdf = ReportPDF(self.title)
+        pdf.section = 'Resumen'
+        pdf.add_page()
+        self._render_summary(pdf, summary, sections)
+
+        y_top = pdf.t_margin + 9 + 7  # título + sección
+        per_page = max(1, int((pdf.h - FOOTER_HEIGHT - y_top) // ROW_HEIGHT) - 1)
+
+        pages = [
+            (name, rows[start:start + per_page])
+            for name, rows in sections
+            for start in range(0, len(rows), per_page)
+        ]
+        layout = self._layout(pdf, y_top)
+        chunks = [rows for _, rows in pages]
+        if self.workers > 1 and sum(len(rows) for rows in chunks) >= self.parallel_min_rows:
+            chunksize = max(1, len(chunks) // (self.workers * 4))
+            streams = _get_executor(self.workers).map(_render_chunk, repeat(layout), chunks, chunksize=chunksize)
+        else:
+            streams = map(_render_chunk, repeat(layout), chunks)
+
+        for (name, _), stream in zip(pages, streams):
+            pdf.section = name
+            pdf.add_page()
+            pdf.append_content(stream)
+        return bytes(pdf.output())
+
+    def _layout(self, pdf, y_top):
+        bold_font = pdf.font_resource('Helvetica', 'B', FONT_SIZE)
+        font = pdf.font_resource('Helvetica', '', FONT_SIZE)
+        xs = []
+        x = pdf.l_margin
+        for column in self.columns:
+            xs.append(x)
+            x += column.width
+        return {
+            'k': pdf.k,
+            'page_h': pdf.h,
+            'font': font,
+            'bold_font': bold_font,
+            'headers': [column.header for column in self.columns],
+            'size': FONT_SIZE,
+            'row_h': ROW_HEIGHT,
+            'c_margin': pdf.c_margin,
+            'y_top': y_top,
+            'xs': xs,
+            'widths': [column.width for column in self.columns],
+            'aligns': [column.align for column in self.columns],
+        }
+
+    def _render_summary(self, pdf, summary, sections):
+        pdf.set_font('Helvetica', '', 10)
+        for label, value in summary:
+            pdf.cell(70, 7, _latin1(label), border='B')
+            pdf.cell(40, 7, _latin1(value), border='B', align='R', new_x='LMARGIN', new_y='NEXT')
+        if not sections:
+            pdf.ln(4)
+            pdf.cell(0, 7, 'Sin datos para los filtros seleccionados.', new_x='LMARGIN', new_y='NEXT')
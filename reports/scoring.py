@@ -0,0 +1,145 @@
+"""
+Motor de puntuación por reglas (ScoringRule) para un periodo.
+
+Las actividades del periodo se cargan ya agregadas por (usuario, tipo, día)
+en columnas array: una consulta y sin instancias de modelo. Cada regla se
+evalúa en una pasada sobre esas columnas o sobre los vectores por usuario,
+no por actividad ni por petición. El resultado se guarda en Score, de donde
+lo leen el dashboard y el cierre quincenal.
+
+Orden de aplicación:
+  1. topes por tipo de actividad (CAP con activity_type)
+  2. bonos por racha de días consecutivos (STREAK)
+  3. multiplicadores de equipo (TEAM_MULTIPLIER; varios se multiplican)
+  4. topes del total (CAP sin activity_type; gana el menor)
+"""
+from array import array
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import transaction
+from django.db.models import Count, Sum
+from activities.models import Activity
+from core.versioning import bump_data_version
+from users.models.user import User
+from .models import Score, ScoringRule
+
+
+@dataclass
+class Columns:
+    """Actividades de un periodo agregadas por (usuario, tipo, día), ordenadas por usuario y día."""
+    user_ids: list  # posición -> user_id
+    teams: list  # posición -> team_id (None sin equipo)
+    user: array  # por fila: posición del usuario
+    type: array  # por fila: activity_type_id
+    day: array  # por fila: ordinal de la fecha
+    points: array
+    count: array
+
+
+def load_columns(start_date, end_date):
+    rows = (
+        Activity.objects.filter(date__range=(start_date, end_date))
+        .values_list('user_id', 'activity_type_id', 'date')
+        .annotate(points=Sum('points'), n=Count('id'))
+        .order_by('user_id', 'date', 'activity_type_id')
+    )
+    return build_columns(rows.iterator(chunk_size=5000))
+
+
+def build_columns(rows, team_of=None):
+    """
+    Columns a partir de filas (user_id, activity_type_id, fecha, puntos, n)
+    ordenadas por usuario y día. team_of (user_id -> team_id) evita la
+    consulta de equipos cuando ya se tiene.
+    """
+    index = {}
+    user_ids = []
+    columns = (array('l'), array('l'), array('l'), array('q'), array('l'))
+    for user_id, type_id, date, points, n in rows:
+        position = index.get(user_id)
+        if position is None:
+            position = index[user_id] = len(user_ids)
+            user_ids.append(user_id)
+        for column, value in zip(columns, (position, type_id, date.toordinal(), points or 0, n)):
+            column.append(value)
+    if team_of is None:
+        team_of = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'team_id')) if user_ids else {}
+    return Columns(user_ids, [team_of.get(pk) for pk in user_ids], *columns)
+
+
+def _type_points(columns, type_id):
+    totals = array('q', [0]) * len(columns.user_ids)
+    for u, t, p in zip(columns.user, columns.type, columns.points):
+        if t == type_id:
+            totals[u] += p
+    return totals
+
+
+def _streak_bonus(columns, rule, bonus):
+    # Filas ordenadas por (usuario, día): una racha es una secuencia de días consecutivos del mismo usuario
+    last_user, last_day, run = -1, None, 0
+    for u, t, d in zip(columns.user, columns.type, columns.day):
+        if t != rule.activity_type_id or (u == last_user and d == last_day):
+            continue
+        run = run + 1 if u == last_user and d == last_day + 1 else 1
+        last_user, last_day = u, d
+        if run >= rule.min_days:
+            bonus[u] += rule.bonus_points
+
+
+def evaluate(columns, rules):
+    """Devuelve [(user_id, base, bonus, total, actividades)] ordenado por total desc, user_id."""
+    size = len(columns.user_ids)
+    base = array('q', [0]) * size
+    activities = array('l', [0]) * size
+    for u, p, n in zip(columns.user, columns.points, columns.count):
+        base[u] += p
+        activities[u] += n
+
+    for rule in rules:
+        if rule.kind == ScoringRule.CAP and rule.activity_type_id:
+            for u, points in enumerate(_type_points(columns, rule.activity_type_id)):
+                if points > rule.cap:
+                    base[u] -= points - rule.cap
+
+    bonus = array('q', [0]) * size
+    for rule in rules:
+        if rule.kind == ScoringRule.STREAK:
+            _streak_bonus(columns, rule, bonus)
+
+    factors = {}
+    for rule in rules:
+        if rule.kind == ScoringRule.TEAM_MULTIPLIER:
+            factors[rule.team_id] = factors.get(rule.team_id, Decimal(1)) * rule.multiplier
+    total_cap = min((rule.cap for rule in rules if rule.kind == ScoringRule.CAP and not rule.activity_type_id), default=None)
+
+    results = []
+    for u, user_id in enumerate(columns.user_ids):
+        total = base[u] + bonus[u]
+        factor = factors.get(columns.teams[u])
+        if factor is not None:
+            total = int((Decimal(total) * factor).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+        if total_cap is not None:
+            total = min(total, total_cap)
+        results.append((user_id, base[u], total - base[u], total, activities[u]))
+    results.sort(key=lambda row: (-row[3], row[0]))
+    return results
+
+
+def compute_period_scores(period):
+    """Recalcula y guarda los Score del periodo. Devuelve el número de usuarios puntuados."""
+    rules = list(ScoringRule.objects.filter(is_active=True))
+    results = evaluate(load_columns(period.startDate, period.endDate), rules)
+    with transaction.atomic():
+        Score.objects.filter(period=period).delete()
+        Score.objects.bulk_create([
+            Score(
+                period=period, user_id=user_id, position=position, base_points=base,
+                bonus_points=bonus, total_points=total, activities=activities,
+            )
+            for position, (user_id, base, bonus, total, activities) in enumerate(results, start=1)
+        ], batch_size=1000)
+        # El recálculo corre después del commit de la actividad (o de la regla): las páginas
+        # cacheadas en ese intervalo con la versión nueva mostrarían las puntuaciones anteriores
+        bump_data_version()
+    return len(results)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.deferred import defer, defer_batch
+from activities.models.activity import Activity
+from activities.signals import activities_ingested
+from .models.period import Period
+from .models.scoring import ScoringRule
+from .scoring import compute_period_scores
+
+def refresh_scores(dates=None):
+    """Recalcula los Score de los periodos abiertos que contienen alguna de las fechas (todos si dates es None)."""
+    # La quincena en curso sólo existe si alguien la creó: sin ella el dashboard no tendría puntuación
+    Period.current_biweekly()
+    periods = Period.objects.filter(is_closed=False)
+    if dates is not None:
+        periods = periods.filter(startDate__lte=max(dates), endDate__gte=min(dates))
+    for period in periods:
+        if dates is None or any(period.startDate <= day <= period.endDate for day in dates):
+            compute_period_scores(period)
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def activity_changed(sender, instance, **kwargs):
+    # Un recálculo por transacción con todas las fechas tocadas, tras el commit
+    defer_batch('reports:scores', refresh_scores, [instance.date], background=True)
+
+@receiver(activities_ingested, sender=Activity)
+def activities_bulk_created(sender, dates, **kwargs):
+    defer_batch('reports:scores', refresh_scores, list(dates), background=True)
+
+@receiver(post_save, sender=ScoringRule)
+@receiver(post_delete, sender=ScoringRule)
+def scoring_rule_changed(sender, instance, **kwargs):
+    defer('reports:scores_all', refresh_scores, background=True)
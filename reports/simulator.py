@@ -0,0 +1,96 @@
+"""
+Simulador "¿y si?" de valores de ActivityType.points sobre rankings pasados.
+
+Para los periodos elegidos se cargan una sola vez, con una consulta por
+fuente (actividades vigentes y archivo), las columnas del motor de
+puntuación (reports.scoring.Columns) de cada periodo. Se guardan en caché por
+versión de datos; cada escenario sólo recalcula los puntos de cada fila con
+los valores propuestos, sin volver a leer actividades.
+
+Tanto el ranking actual como el simulado pasan por reports.scoring.evaluate
+con las ScoringRule activas (topes, rachas, multiplicadores), así que el
+actual coincide con Score y los cambios de posición se deben sólo a los
+valores propuestos.
+"""
+from array import array
+from dataclasses import replace
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from activities.archive import sources_for_range
+from core.versioning import get_data_version
+from users.models.user import User
+from .scoring import build_columns, evaluate
+
+CACHE_TIMEOUT = 600
+
+
+def load_period_columns(periods):
+    """Columns de cada periodo, en el orden de periods."""
+    key = 'simulator:{}:{}'.format(','.join(str(p.pk) for p in periods), get_data_version())
+    columns = cache.get(key)
+    if columns is None:
+        columns = _build_period_columns(periods)
+        cache.set(key, columns, CACHE_TIMEOUT)
+    return columns
+
+
+def _build_period_columns(periods):
+    # Un CASE asigna cada actividad a su periodo para agrupar todos los periodos en una consulta
+    bucket = Case(
+        *(When(date__range=(p.startDate, p.endDate), then=Value(index)) for index, p in enumerate(periods)),
+        output_field=IntegerField(),
+    )
+    start = min(p.startDate for p in periods)
+    end = max(p.endDate for p in periods)
+    rows = [[] for _ in periods]
+    for model in sources_for_range(start):
+        grouped = (
+            model.objects.filter(date__range=(start, end))
+            .annotate(bucket=bucket).exclude(bucket=None)
+            .values_list('bucket', 'user_id', 'activity_type_id', 'date')
+            .annotate(points=Sum('points'), n=Count('id'))
+            .order_by()
+        )
+        for index, *row in grouped:
+            rows[index].append(row)
+
+    user_ids = {row[0] for period_rows in rows for row in period_rows}
+    team_of = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'team_id')) if user_ids else {}
+    # Las fuentes se leen por separado: se ordena aquí por (usuario, día) como espera el motor
+    return [
+        build_columns(sorted(period_rows, key=lambda row: (row[0], row[2], row[1])), team_of)
+        for period_rows in rows
+    ]
+
+
+def _positions(results):
+    return {user_id: position for position, (user_id, *_) in enumerate(results, start=1)}
+
+
+def simulate(columns, prices, rules):
+    """
+    prices: {activity_type_id: valor propuesto} (los tipos ausentes conservan
+    los puntos otorgados). Devuelve filas por usuario con puntos y posición
+    actuales y simulados, ordenadas por la posición simulada.
+    """
+    current = evaluate(columns, rules)
+    repriced = replace(columns, points=array('q', (
+        count * prices[type_id] if type_id in prices else points
+        for type_id, points, count in zip(columns.type, columns.points, columns.count)
+    )))
+    simulated = evaluate(repriced, rules)
+
+    totals = {user_id: total for user_id, _, _, total, _ in current}
+    before = _positions(current)
+    after = _positions(simulated)
+    return [
+        {
+            'user_id': user_id,
+            'points': totals[user_id],
+            'position': before[user_id],
+            'simulated_points': total,
+            'simulated_position': after[user_id],
+            'delta': before[user_id] - after[user_id],
+        }
+        for user_id, _, _, total, _ in simulated
+    ]
@@ -1,11 +1,32 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import shutil
+import tempfile
+import zlib
+from unittest import mock
+from django.conf import settings
+from django.db.models import F
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date
+from decimal import Decimal
 from users.models.user import User
 from teams.models import Team
 from activities.models.activity_type import ActivityType
 from activities.models.activity import Activity
+from core.models import VersionStamp
+from core.versioning import DATA_VERSION
+from reports import export_cache
+from reports.pdf import TableReport
+from reports.models import Period, Ranking, Score, ScoringRule
+from reports.scoring import compute_period_scores, evaluate, load_columns
+from reports.simulator import load_period_columns, simulate
+from activities.archive import archive_period
+from activities.models.archive import ArchivedActivity
 
 
 class SqlInjectionSafetyTests(TestCase):
@@ -71,4 +92,426 @@ class SqlInjectionSafetyTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertIn('application/pdf', resp['Content-Type'])
 
-# Create your tests here.
+
+class ExportCacheTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN
+        )
+        self.user = User.objects.create_user(
+            email='user@example.com', password='pass', name='User One', team=self.team
+        )
+        t = ActivityType.objects.create(name='Demo', points=3)
+        Activity.objects.create(activity_type=t, user=self.user, date=timezone.now().date())
+        self.client.force_login(self.admin)
+
+    def _cached_files(self):
+        return sorted(os.listdir(os.path.join(self.media_root, 'export_cache')))
+
+    def _download(self, url, params=None, **headers):
+        resp = self.client.get(url, params or {}, headers=headers)
+        body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        resp.close()
+        return resp, body
+
+    def test_repeat_download_is_served_from_disk(self):
+        url = reverse('reports:export_history_pdf')
+        first, first_body = self._download(url, {'period': 'biweekly'})
+        hits = export_cache.stats().get('hit', 0)
+
+        # Sólo el usuario de la sesión y la versión de datos: ni consultas de datos ni renderizado
+        with self.assertNumQueries(2):
+            second, second_body = self._download(url, {'period': 'biweekly'})
+
+        self.assertEqual(second_body, first_body)
+        self.assertEqual(export_cache.stats()['hit'], hits + 1)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('private', second['Cache-Control'])
+        self.assertEqual(len(self._cached_files()), 1)
+
+    def test_conditional_request_returns_not_modified(self):
+        url = reverse('dashboard:export_ranking_excel')
+        first, _ = self._download(url, {'period': 'semanal'})
+        second, body = self._download(url, {'period': 'semanal'}, if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_new_data_version_and_scope_produce_new_files(self):
+        url = reverse('reports:export_history_excel')
+        self._download(url)
+        VersionStamp.bump(DATA_VERSION)
+        self._download(url)
+        self.client.force_login(self.user)
+        self._download(url)
+        self.assertEqual(len(self._cached_files()), 3)
+
+    def test_write_from_another_process_invalidates_cached_export(self):
+        url = reverse('reports:export_history_excel')
+        first, _ = self._download(url)
+        # Un comando de gestión sólo comparte la base de datos con este worker
+        VersionStamp.objects.filter(name=DATA_VERSION).update(value=F('value') + 1)
+        second, _ = self._download(url, if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(len(self._cached_files()), 2)
+
+    def test_least_recently_used_files_are_evicted(self):
+        url = reverse('reports:export_history_pdf')
+        self._download(url, {'period': 'daily'})
+        size = os.path.getsize(os.path.join(self.media_root, 'export_cache', self._cached_files()[0]))
+        with override_settings(EXPORT_CACHE_MAX_BYTES=size + size // 2):
+            self._download(url, {'period': 'weekly'})
+        self.assertEqual(len(self._cached_files()), 1)
+        resp, _ = self._download(url, {'period': 'weekly'})
+        self.assertEqual(resp.status_code, 200)
+
+
+    def test_file_evicted_by_another_worker_is_still_served(self):
+        url = reverse('reports:export_history_pdf')
+        _, first_body = self._download(url)
+        path = os.path.join(self.media_root, 'export_cache', self._cached_files()[0])
+
+        def evicted(target):
+            os.remove(target)
+            raise FileNotFoundError(target)
+
+        with mock.patch('reports.export_cache.os.utime', side_effect=evicted):
+            resp, body = self._download(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(body, first_body)
+        self.assertFalse(os.path.exists(path))
+        # La siguiente descarga lo regenera
+        self._download(url)
+        self.assertTrue(os.path.exists(path))
+
+class TableReportTests(TestCase):
+    columns = [('Fecha', 25, 'C'), ('Usuario', 40, 'L'), ('Puntos', 20, 'R')]
+
+    def _pages(self, content):
+        streams = content.split(b'stream\n')[1:]
+        pages = []
+        for chunk in streams:
+            try:
+                pages.append(zlib.decompress(chunk.split(b'\nendstream')[0]).decode('latin-1'))
+            except zlib.error:
+                pass
+        return [page for page in pages if 'Página' in page]
+
+    def test_rows_are_split_into_pages_with_repeated_headers(self):
+        rows = [('2025-01-01', f'Usuario {i}', i) for i in range(60)]
+        content = TableReport('Historial', self.columns, workers=1).render(
+            [('Equipo: A', rows), ('Equipo: B', rows[:3]), ('Equipo: vacío', [])],
+            [('Actividades', 63)],
+        )
+        pages = self._pages(content)
+        # Resumen + 60 filas de A en dos páginas + B; las secciones vacías no generan páginas
+        self.assertEqual(len(pages), 4)
+        self.assertIn('(Actividades)', pages[0])
+        for page in pages[1:]:
+            self.assertIn('(Fecha) Tj', page)
+        self.assertIn('(Equipo: B)', pages[3])
+        self.assertIn('(Usuario 59)', ''.join(pages[1:3]))
+
+    def test_long_values_are_truncated_and_escaped(self):
+        rows = [('2025-01-01', 'Nombre (muy) largo que no cabe en la columna', 4)]
+        page = self._pages(TableReport('Historial', self.columns, workers=1).render([('A', rows)]))[1]
+        self.assertIn('(Nombre \\(muy\\) largo', page)
+        self.assertIn('...) Tj', page)
+        self.assertNotIn('columna', page)
+
+    def test_process_pool_renders_same_pages(self):
+        rows = [('2025-01-01', f'Usuario {i}', i) for i in range(200)]
+        serial = TableReport('Historial', self.columns, workers=1).render([('A', rows)])
+        parallel = TableReport('Historial', self.columns, workers=2, parallel_min_rows=0).render([('A', rows)])
+        self.assertEqual(self._pages(parallel), self._pages(serial))
+
+
+class ExporterRegistryTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+        team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN
+        )
+        user = User.objects.create_user(email='user@example.com', password='pass', name='Ana, "la dev"', team=team)
+        t = ActivityType.objects.create(name='Demo', points=3)
+        Activity.objects.create(activity_type=t, user=user, date=timezone.now().date(), evidence='https://x/1')
+        self.client.force_login(self.admin)
+
+    def _download(self, fmt):
+        resp = self.client.get(reverse('reports:export_history', args=[fmt]))
+        body = b''.join(resp.streaming_content) if resp.streaming else resp.content
+        resp.close()
+        return resp, body
+
+    def test_views_do_not_import_export_backends(self):
+        code = (
+            'import sys, django; django.setup()\n'
+            'from django.urls import get_resolver; get_resolver().url_patterns\n'
+            'print([m for m in ("openpyxl", "fpdf") if m in sys.modules])'
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='config.settings', CI='true')
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_csv_and_ndjson_exports(self):
+        resp, body = self._download('csv')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('text/csv', resp['Content-Type'])
+        lines = body.decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'Fecha,Usuario,Equipo,Actividad,Puntos,Evidencia')
+        self.assertIn('"Ana, ""la dev"""', lines[1])
+
+        resp, body = self._download('ndjson')
+        row = json.loads(body.decode('utf-8').splitlines()[0])
+        self.assertEqual(row['user_name'], 'Ana, "la dev"')
+        self.assertEqual(row['points'], 3)
+
+    def test_unknown_format_is_404(self):
+        resp, _ = self._download('docx')
+        self.assertEqual(resp.status_code, 404)
+
+
+class ScoringEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team_a = Team.objects.create(name='Team A')
+        self.team_b = Team.objects.create(name='Team B')
+        self.ana = User.objects.create_user(email='ana@example.com', password='pass', name='Ana', team=self.team_a)
+        self.luis = User.objects.create_user(email='luis@example.com', password='pass', name='Luis', team=self.team_b)
+        self.early = ActivityType.objects.get(name='Llegar temprano')
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.system = ActivityType.objects.get(name='Completar sistema')
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (1, 2, 3, 5):
+                Activity.objects.create(activity_type=self.early, user=self.ana, date=date(2024, 1, day))
+            Activity.objects.create(activity_type=self.commit, user=self.ana, date=date(2024, 1, 1))
+            for _ in range(3):
+                Activity.objects.create(activity_type=self.system, user=self.luis, date=date(2024, 1, 2))
+            self.period = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15))
+
+    def create_rules(self):
+        ScoringRule.objects.create(name='Racha', kind=ScoringRule.STREAK, activity_type=self.early, min_days=2, bonus_points=3)
+        ScoringRule.objects.create(name='Equipo A', kind=ScoringRule.TEAM_MULTIPLIER, team=self.team_a, multiplier=Decimal('1.5'))
+        ScoringRule.objects.create(name='Tope sistema', kind=ScoringRule.CAP, activity_type=self.system, cap=32)
+        ScoringRule.objects.create(name='Tope total', kind=ScoringRule.CAP, cap=30)
+
+    def test_rules_are_applied_in_order(self):
+        self.create_rules()
+        columns = load_columns(self.period.startDate, self.period.endDate)
+        self.assertEqual(len(columns.user_ids), 2)
+        self.assertEqual(
+            evaluate(columns, list(ScoringRule.objects.all())),
+            # Luis: 48 -> tope de tipo 32 -> tope total 30. Ana: 8 base + 6 de racha (días 2 y 3) -> x1.5
+            [(self.luis.pk, 32, -2, 30, 3), (self.ana.pk, 8, 13, 21, 5)],
+        )
+        self.assertEqual(evaluate(columns, []), [(self.luis.pk, 48, 0, 48, 3), (self.ana.pk, 8, 0, 8, 5)])
+
+    def test_scores_are_stored_and_refreshed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_rules()
+        scores = {s.user_id: s for s in Score.objects.filter(period=self.period)}
+        self.assertEqual((scores[self.ana.pk].position, scores[self.ana.pk].total_points), (2, 21))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.early, user=self.ana, date=date(2024, 1, 4))
+        ana = Score.objects.get(period=self.period, user=self.ana)
+        # Racha de 5 días: bono en los días 2 a 5
+        self.assertEqual((ana.base_points, ana.total_points, ana.position), (9, 30, 1))
+
+        self.period.is_closed = True
+        self.period.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.commit, user=self.luis, date=date(2024, 1, 6))
+        self.assertEqual(Score.objects.get(period=self.period, user=self.luis).base_points, 32)
+
+    def test_refresh_creates_current_period_and_bumps_version(self):
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.commit, user=self.ana, date=today)
+        with mock.patch('reports.scoring.bump_data_version') as bump, self.captureOnCommitCallbacks(execute=True):
+            ScoringRule.objects.create(name='Tope total', kind=ScoringRule.CAP, cap=30)
+        current = Period.objects.get(type=Period.BIWEEKLY, startDate__lte=today, endDate__gte=today)
+        self.assertEqual(Score.objects.get(period=current, user=self.ana).total_points, 4)
+        # Una renovación por periodo recalculado, después de guardar sus Score
+        self.assertTrue(bump.called)
+
+    def test_rule_requires_its_fields(self):
+        from django.core.exceptions import ValidationError
+        with self.assertRaises(ValidationError):
+            ScoringRule(name='Racha', kind=ScoringRule.STREAK, activity_type=self.early).full_clean()
+
+    def test_close_biweekly_publishes_scored_ranking(self):
+        ScoringRule.objects.create(name='Equipo B', kind=ScoringRule.TEAM_MULTIPLIER, team=self.team_b, multiplier=Decimal('0.5'))
+        today = timezone.localdate()
+        Activity.objects.create(activity_type=self.system, user=self.luis, date=today)
+        Activity.objects.create(activity_type=self.commit, user=self.ana, date=today)
+        admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.client.force_login(admin)
+
+        self.assertEqual(self.client.get(reverse('reports:close_biweekly')).status_code, 200)
+        period = Period.objects.get(is_closed=True, startDate__lte=today, endDate__gte=today)
+        self.assertEqual(
+            list(Ranking.objects.filter(period=period).order_by('position').values_list('user_id', 'total_points')),
+            [(self.luis.pk, 8), (self.ana.pk, 4)],
+        )
+
+        self.client.force_login(self.luis)
+        response = self.client.get(reverse('dashboard:dashboard'))
+        self.assertEqual(response.context['period_score'].total_points, 8)
+
+    def test_biweekly_dashboard_ranking_reads_scores(self):
+        ScoringRule.objects.create(name='Equipo B', kind=ScoringRule.TEAM_MULTIPLIER, team=self.team_b, multiplier=Decimal('0.5'))
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(activity_type=self.system, user=self.luis, date=today)
+            for _ in range(3):
+                Activity.objects.create(activity_type=self.commit, user=self.ana, date=today)
+
+        # Por puntos brutos Luis va primero (16 a 12); con el multiplicador, Ana (12 a 8)
+        self.client.force_login(self.luis)
+        response = self.client.get(reverse('dashboard:dashboard'), {'period': 'quincenal'})
+        self.assertEqual([(row['user'], row['total']) for row in response.context['ranking']], [(self.ana, 12), (self.luis, 8)])
+        self.assertEqual((response.context['user_position'], response.context['total_points']), (2, 20))
+
+
+class RepricingSimulatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.ana = User.objects.create_user(email='ana@example.com', password='pass', name='Ana', team=self.team)
+        self.luis = User.objects.create_user(email='luis@example.com', password='pass', name='Luis', team=self.team)
+        self.early = ActivityType.objects.get(name='Llegar temprano')
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        self.types = list(ActivityType.objects.cached())
+        for day in range(1, 6):
+            Activity.objects.create(activity_type=self.early, user=self.ana, date=date(2024, 1, day))
+        Activity.objects.create(activity_type=self.commit, user=self.luis, date=date(2024, 1, 2))
+        Activity.objects.create(activity_type=self.commit, user=self.ana, date=date(2024, 1, 20))
+        self.first = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15))
+        self.second = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 16), endDate=date(2024, 1, 31))
+
+    def prices(self, **overrides):
+        return {t.pk: overrides.get(t.name, t.points) for t in self.types}
+
+    def test_columns_are_built_once_per_data_version(self):
+        # Versión de datos, horizonte del archivo, una consulta agrupada para todos los periodos y los equipos
+        with self.assertNumQueries(4):
+            first, second = load_period_columns([self.first, self.second])
+        with self.assertNumQueries(1):
+            load_period_columns([self.first, self.second])
+        self.assertEqual(first.user_ids, [self.ana.pk, self.luis.pk])
+        self.assertEqual([total for _, _, _, total, _ in evaluate(first, [])], [5, 4])
+        self.assertEqual([row[:4] for row in evaluate(second, [])], [(self.ana.pk, 4, 0, 4)])
+
+    def test_simulated_positions_and_deltas(self):
+        first, _ = load_period_columns([self.first, self.second])
+        rows = simulate(first, self.prices(**{'Llegar temprano': 0}), [])
+        self.assertEqual(
+            [(r['user_id'], r['simulated_points'], r['position'], r['simulated_position'], r['delta']) for r in rows],
+            [(self.luis.pk, 4, 2, 1, 1), (self.ana.pk, 0, 1, 2, -1)],
+        )
+        self.assertTrue(all(r['delta'] == 0 for r in simulate(first, self.prices(), [])))
+
+    def test_baseline_matches_scores_and_rules_apply_to_simulation(self):
+        ScoringRule.objects.create(name='Racha', kind=ScoringRule.STREAK, activity_type=self.early, min_days=2, bonus_points=3)
+        rules = list(ScoringRule.objects.filter(is_active=True))
+        compute_period_scores(self.first)
+        first, _ = load_period_columns([self.first, self.second])
+
+        rows = simulate(first, self.prices(), rules)
+        self.assertEqual(
+            [(r['user_id'], r['points'], r['position']) for r in rows],
+            list(Score.objects.filter(period=self.first).order_by('position').values_list('user_id', 'total_points', 'position')),
+        )
+        # Sin puntos por llegar temprano, el bono de racha de Ana (4 x 3) la mantiene primera
+        rows = simulate(first, self.prices(**{'Llegar temprano': 0}), rules)
+        self.assertEqual([(r['user_id'], r['simulated_points'], r['delta']) for r in rows], [(self.ana.pk, 12, 0), (self.luis.pk, 4, 0)])
+
+    def test_view_is_admin_only_and_reports_winner_change(self):
+        self.client.force_login(self.ana)
+        self.assertEqual(self.client.get(reverse('reports:simulator')).status_code, 302)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('reports:simulator'), {
+            'period': [self.first.pk], f'price_{self.early.pk}': '0',
+        })
+        self.assertEqual(response.status_code, 200)
+        [result] = response.context['results']
+        self.assertEqual((result['moved'], result['winner_changed']), (2, True))
+        self.assertEqual(result['rows'][0]['name'], 'Luis')
+
+    def test_unchanged_prices_keep_awarded_points(self):
+        # El valor actual del tipo ya no coincide con los puntos otorgados en el periodo
+        with self.captureOnCommitCallbacks(execute=True):
+            self.commit.points = 2
+            self.commit.save()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('reports:simulator'), {'period': [self.first.pk]})
+        [result] = response.context['results']
+        self.assertEqual((result['moved'], result['winner_changed']), (0, False))
+        self.assertEqual([(r['points'], r['simulated_points']) for r in result['rows']], [(5, 5), (4, 4)])
+
+
+class HistorySearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN)
+        self.ana = User.objects.create_user(email='ana@example.com', password='pass', name='Ana', team=self.team)
+        self.luis = User.objects.create_user(email='luis@example.com', password='pass', name='Luis')
+        self.commit = ActivityType.objects.get(name='Commit válido')
+        today = timezone.localdate()
+        create = lambda user, **fields: Activity.objects.create(activity_type=self.commit, user=user, date=today, **fields)
+        self.by_hash = create(self.ana, evidence='https://github.com/acme/app/commit/9fceb02d0ae598e95dc970b74767f19372d61af8')
+        self.by_ticket = create(self.ana, evidence='PROJ-1234', note='Corrección del cálculo de puntos')
+        self.other = create(self.luis, evidence='PROJ-99', note='Migración del tablero')
+        self.client.force_login(self.admin)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('reports:reports_history'), dict(params, q=q))
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['evidence'] for row in response.context['activities'])
+
+    def test_search_matches_prefixes_and_combines_with_filters(self):
+        self.assertEqual(self.search('9fceb02'), [self.by_hash.evidence])
+        self.assertEqual(self.search('proj'), ['PROJ-1234', 'PROJ-99'])
+        self.assertEqual(self.search('proj', user=self.luis.pk), ['PROJ-99'])
+        self.assertEqual(self.search('proj 1234'), ['PROJ-1234'])
+        # Sin acentos también encuentra; la sintaxis del motor no se interpreta
+        self.assertEqual(self.search('calculo'), ['PROJ-1234'])
+        self.assertEqual(self.search('" OR * NEAR('), [])
+        self.assertEqual(len(self.search('')), 3)
+
+    def test_index_follows_writes_and_archive(self):
+        self.by_ticket.note = 'Refactor de exportes'
+        self.by_ticket.save()
+        self.other.delete()
+        self.assertEqual(self.search('calculo'), [])
+        self.assertEqual(self.search('exportes'), ['PROJ-1234'])
+        self.assertEqual(self.search('tablero'), [])
+
+        old = date(2024, 1, 3)
+        Activity.objects.create(activity_type=self.commit, user=self.ana, date=old, evidence='deadbeefcafe')
+        period = Period.objects.create(type=Period.BIWEEKLY, startDate=date(2024, 1, 1), endDate=date(2024, 1, 15), is_closed=True)
+        list(archive_period(period))
+        self.assertTrue(ArchivedActivity.objects.exists())
+        self.assertEqual(self.search('deadbeef', start='2024-01-01', end='2024-01-31'), ['deadbeefcafe'])
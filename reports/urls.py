@@ -7,5 +7,7 @@ urlpatterns = [
     path('history/', views.history, name='reports_history'),
     path('history/export/excel/', views.export_history_excel, name='export_history_excel'),
     path('history/export/pdf/', views.export_history_pdf, name='export_history_pdf'),
+    path('history/export/<str:fmt>/', views.export_history, name='export_history'),
+    path('simulator/', views.simulator, name='simulator'),
     path('close-biweekly/', views.close_biweekly, name='close_biweekly'),
 ]
\ No newline at end of file
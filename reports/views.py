@@ -1,60 +1,56 @@
-import io
 from django.shortcuts import render
-from django.http import FileResponse, HttpResponse
+from django.http import Http404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from datetime import timedelta
 from django.contrib import messages
-from django.db.models import Sum, F, Count
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from fpdf import FPDF
-from io import BytesIO
-from django.utils import timezone
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Sum, F
 from datetime import datetime
+from core.pagecache import cache_page_by_data_version
+from .export_cache import cached_export
+from .exporters import Report, get_format
+from activities import search
+from activities.archive import sources_for_range
+from activities.points_index import user_total
 from activities.models.activity import Activity
+from activities.models.activity_type import ActivityType
 from users.models.user import User
 from teams.models import Team
 from .models.period import Period
 from .models.ranking import Ranking
+from .models.scoring import Score, ScoringRule
+from .scoring import compute_period_scores
+from .simulator import load_period_columns, simulate
 
 def is_admin(user: User) -> bool:
     return user.is_authenticated and user.is_admin
 
 def _get_period_range(period: str):
-    today = timezone.localtime(timezone.now()).date()
-    if period == 'daily':
-        return today, today
-    if period == 'weekly':
-        start = today - timedelta(days=today.weekday())
-        end = start + timedelta(days=6)
-        return start, end
-    # biweekly: 1-15, 16-end
-    if today.day <= 15:
-        start = today.replace(day=1)
-        end = today.replace(day=15)
-    else:
-        start = today.replace(day=16)
-        # end of month
-        next_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
-        end = next_month - timedelta(days=1)
-    return start, end
+    return Period.current_range(period)
 
-@login_required
-def history(request):
+HISTORY_PER_PAGE = 50
+HISTORY_COLUMNS = {
+    'user_name': F('user__name'),
+    'team_name': F('user__team__name'),
+    'activity_name': F('activity_type__name'),
+}
+
+def _history_filters(request):
+    """Filtros del historial (periodo o rango, usuario y equipo) válidos para Activity y ArchivedActivity."""
     period = request.GET.get('period')  # daily|weekly|biweekly or custom
     start = request.GET.get('start')
     end = request.GET.get('end')
 
-    qs = Activity.objects.select_related('activity_type', 'user', 'user__team')
-
+    filters = {}
+    start_date = None
     if period in ('daily', 'weekly', 'biweekly'):
         start_date, end_date = _get_period_range(period)
-        qs = qs.filter(date__range=(start_date, end_date))
+        filters['date__range'] = (start_date, end_date)
     elif start and end:
         try:
             start_date = datetime.strptime(start, '%Y-%m-%d').date()
             end_date = datetime.strptime(end, '%Y-%m-%d').date()
-            qs = qs.filter(date__range=(start_date, end_date))
+            filters['date__range'] = (start_date, end_date)
         except Exception:
             pass
 
@@ -62,30 +58,77 @@ def history(request):
         user_id = request.GET.get('user')
         team_id = request.GET.get('team')
         if user_id and str(user_id).isdigit():
-            qs = qs.filter(user_id=user_id)
+            filters['user_id'] = user_id
         if team_id and str(team_id).isdigit():
-            qs = qs.filter(user__team_id=team_id)
-        teams = Team.objects.all().order_by('name')
+            filters['user__team_id'] = team_id
+    else:
+        filters['user_id'] = request.user.id
+
+    return filters, start_date
+
+def _history_querysets(request):
+    """Un queryset filtrado por fuente: la tabla de actividades y, si el rango lo alcanza, el archivo."""
+    filters, start_date = _history_filters(request)
+    # ?q= busca en evidencia y notas con el índice de texto de cada fuente
+    return [
+        search.filter_queryset(model.objects.filter(**filters), request.GET.get('q'))
+        for model in sources_for_range(start_date)
+    ]
+
+def _history_rows(querysets):
+    """Filas del historial (dicts) de todas las fuentes, unidas y ordenadas por fecha."""
+    rows = [qs.values('date', 'created_at', 'points', 'evidence', **HISTORY_COLUMNS) for qs in querysets]
+    combined = rows[0] if len(rows) == 1 else rows[0].union(*rows[1:], all=True)
+    return combined.order_by('-date', '-created_at')
+
+def _distinct_count(querysets, field):
+    if len(querysets) == 1:
+        return querysets[0].values(field).distinct().count()
+    return len(set().union(*(qs.values_list(field, flat=True).distinct() for qs in querysets)))
+
+@login_required
+@cache_page_by_data_version
+def history(request):
+    period = request.GET.get('period')  # daily|weekly|biweekly or custom
+    start = request.GET.get('start')
+    end = request.GET.get('end')
+
+    querysets = _history_querysets(request)
+
+    selected_user_name = ''
+    if request.user.is_admin:
+        user_id = request.GET.get('user')
+        team_id = request.GET.get('team')
+        if user_id and str(user_id).isdigit():
+            selected_user_name = User.objects.filter(pk=user_id).values_list('name', flat=True).first() or ''
+        teams = Team.objects.cached()
 
     else:
-        qs = qs.filter(user=request.user)
         user_id = str(request.user.id)
         team_id = str(request.user.team_id)
         teams = request.user.team
 
-    qs = qs.order_by('-date', '-created_at')
+    page_obj = Paginator(_history_rows(querysets), HISTORY_PER_PAGE).get_page(request.GET.get('page'))
 
     # Estadísticas
-    total_activities = qs.count()
-    totals = qs.aggregate(total_points=Sum(F('activity_type__points')))
-    total_points = totals['total_points'] or 0
-    active_users = qs.values('user_id').distinct().count()
-    distinct_days = qs.values('date').distinct().count() or 1
+    total_activities = page_obj.paginator.count
+    filters, _ = _history_filters(request)
+    if 'user_id' in filters and set(filters) <= {'user_id', 'date__range'} and not search.terms(request.GET.get('q')):
+        # Un solo usuario: dos búsquedas en el índice de acumulados en vez de sumar sus actividades
+        total_points = user_total(filters['user_id'], *filters.get('date__range', (None, None)))
+    else:
+        total_points = sum(qs.aggregate(total_points=Sum('points'))['total_points'] or 0 for qs in querysets)
+    active_users = _distinct_count(querysets, 'user_id')
+    distinct_days = _distinct_count(querysets, 'date') or 1
     daily_average = round(total_activities / distinct_days) if distinct_days else 0
 
+    query = request.GET.copy()
+    query.pop('page', None)
+
     context = {
-        'activities': qs,
-        'users': User.objects.filter(is_active=True).order_by('name'),
+        'activities': page_obj,
+        'page_obj': page_obj,
+        'filters_query': query.urlencode(),
         'teams': teams,
         'stats': {
             'total_activities': total_activities,
@@ -96,181 +139,69 @@ def history(request):
         'selected': {
             'period': period or '',
             'user': user_id or '',
+            'user_name': selected_user_name,
             'team': team_id or '',
             'start': start or '',
             'end': end or '',
+            'q': request.GET.get('q', ''),
         },
     }
 
     return render(request, 'reports/history.html', context)
 
-@login_required
-def export_history_excel(request):
-    period = request.GET.get('period')
-    start = request.GET.get('start')
-    end = request.GET.get('end')
-
-    qs = Activity.objects.select_related('activity_type', 'user', 'user__team')
-    if period in ('daily', 'weekly', 'biweekly'):
-        start_date, end_date = _get_period_range(period)
-        qs = qs.filter(date__range=(start_date, end_date))
-    elif start and end:
-        try:
-            start_date = datetime.strptime(start, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end, '%Y-%m-%d').date()
-            qs = qs.filter(date__range=(start_date, end_date))
-        except Exception:
-            pass
-
-    if request.user.is_admin:
-        user_id = request.GET.get('user')
-        team_id = request.GET.get('team')
-        if user_id and str(user_id).isdigit():
-            qs = qs.filter(user_id=user_id)
-        if team_id and str(team_id).isdigit():
-            qs = qs.filter(user__team_id=team_id)
-    else:
-        qs = qs.filter(user=request.user)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Historial'
-
-    headers = ['Fecha', 'Usuario', 'Equipo', 'Actividad', 'Puntos', 'Evidencia']
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color='FFFFFF')
-        cell.fill = PatternFill(start_color='2D2F3A', end_color='2D2F3A', fill_type='solid')
-        cell.alignment = Alignment(horizontal='center')
-
-    for a in qs:
-        ws.append([
-            a.date.isoformat(),
-            a.user.name,
-            a.user.team.name if a.user.team else '-',
-            a.activity_type.name,
-            a.activity_type.points,
-            a.evidence or '-',
-        ])
+HISTORY_EXPORT_COLUMNS = [
+    ('date', 'Fecha', 25, 'C'),
+    ('user_name', 'Usuario', 60, 'L'),
+    ('team_name', 'Equipo', 60, 'L'),
+    ('activity_name', 'Actividad', 80, 'L'),
+    ('points', 'Puntos', 25, 'R'),
+    ('evidence', 'Evidencia', None),
+]
+
+def _history_report(request):
+    rows = []
+    team_points = {}
+    for a in _history_rows(_history_querysets(request)).iterator():
+        team = a['team_name'] or 'Sin equipo'
+        rows.append({
+            'date': a['date'].isoformat(),
+            'user_name': a['user_name'],
+            'team_name': team,
+            'activity_name': a['activity_name'],
+            'points': a['points'],
+            'evidence': a['evidence'] or '-',
+        })
+        team_points[team] = team_points.get(team, 0) + a['points']
 
-    for col in ws.columns:
-        max_len = 12
-        for cell in col:
-            try:
-                max_len = max(max_len, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 2, 40)
-
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-    resp = FileResponse(bio, as_attachment=True, filename='historial_actividades.xlsx', content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    return resp
+    summary = [('Actividades', len(rows)), ('Puntos', sum(team_points.values()))]
+    summary += [(f'Equipo {name}', f'{points} pts') for name, points in sorted(team_points.items())]
+    return Report('Historial de Actividades', HISTORY_EXPORT_COLUMNS, rows, group_by='team_name', summary=summary)
 
 @login_required
-def export_history_pdf(request):
-    period = request.GET.get('period')
-    start = request.GET.get('start')
-    end = request.GET.get('end')
-
-    qs = Activity.objects.select_related('activity_type', 'user', 'user__team')
-    if period in ('daily', 'weekly', 'biweekly'):
-        start_date, end_date = _get_period_range(period)
-        qs = qs.filter(date__range=(start_date, end_date))
-    elif start and end:
-        try:
-            start_date = datetime.strptime(start, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end, '%Y-%m-%d').date()
-            qs = qs.filter(date__range=(start_date, end_date))
-        except Exception:
-            pass
-
-    if request.user.is_admin:
-        user_id = request.GET.get('user')
-        team_id = request.GET.get('team')
-        if user_id and str(user_id).isdigit():
-            qs = qs.filter(user_id=user_id)
-        if team_id and str(team_id).isdigit():
-            qs = qs.filter(user__team_id=team_id)
-    else:
-        qs = qs.filter(user=request.user)
-
-    pdf = FPDF(orientation='P', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font('Helvetica', 'B', 16)
-    pdf.cell(0, 10, 'Historial de Actividades', ln=1)
-
-    pdf.set_font('Helvetica', 'B', 10)
-    headers = ['Fecha', 'Usuario', 'Equipo', 'Actividad', 'Puntos']
-    widths = [25, 45, 45, 60, 20]
-    for h, w in zip(headers, widths):
-        pdf.cell(w, 8, h, border=1, align='C')
-    pdf.ln(8)
-
-    pdf.set_font('Helvetica', '', 10)
-    for a in qs:
-        row = [
-            a.date.isoformat(),
-            a.user.name,
-            a.user.team.name if a.user.team else '-',
-            a.activity_type.name,
-            str(a.activity_type.points),
-        ]
-        for c, w in zip(row, widths):
-            pdf.cell(w, 8, c, border=1, align='C')
-        pdf.ln(8)
-
-    output = bytes(pdf.output(dest='S'))
-    buffer = io.BytesIO(output)
-    buffer.seek(0)
-    return FileResponse(buffer, as_attachment=True, filename='historial_actividades.pdf', content_type='application/pdf')
+def export_history(request, fmt):
+    export_format = get_format(fmt)
+    if export_format is None:
+        raise Http404('Formato de exporte no soportado')
+
+    filters, _ = _history_filters(request)
+    words = search.terms(request.GET.get('q'))
+    if words:
+        filters['q'] = ' '.join(words)
+    scope = 'admin' if request.user.is_admin else request.user.id
+    return cached_export(
+        request, f'history_{fmt}', filters, scope,
+        filename=f'historial_actividades.{fmt}',
+        content_type=export_format.content_type,
+        build=lambda: export_format.render(_history_report(request)),
+    )
 
 @login_required
-def ranking_api(request):
-    period = request.GET.get('period', 'biweekly')
-    start_date, end_date = _get_period_range(period)
-
-    leaderboard = (
-        User.objects.filter(is_active=True)
-        .annotate(points=Sum(
-            F('activity__activity_type__points'),
-            filter=(
-                F('activity__date__gte') == start_date
-            )
-        ))
-    )
-    # Simpler: aggregate from Activity
-    leaderboard = (
-        Activity.objects.filter(date__range=(start_date, end_date))
-        .values('user_id', 'user__name', 'user__team__name')
-        .annotate(points=Sum(F('activity_type__points')), activities=Count('id'))
-        .order_by('-points')
-    )
+def export_history_excel(request):
+    return export_history(request, 'xlsx')
 
-    user_position = None
-    my_points = 0
-    for idx, row in enumerate(leaderboard, start=1):
-        if row['user_id'] == request.user.id:
-            user_position = idx
-            my_points = row['points'] or 0
-            break
-
-    return HttpResponse(
-        content_type='application/json',
-        content=__import__('json').dumps({
-            'period': period,
-            'start': start_date.isoformat(),
-            'end': end_date.isoformat(),
-            'leaderboard': list(leaderboard),
-            'kpis': {
-                'my_points': my_points,
-                'my_position': user_position,
-                'my_activities': Activity.objects.filter(user=request.user, date__range=(start_date, end_date)).count(),
-                'total_points': sum((row['points'] or 0) for row in leaderboard),
-            },
-        })
-    )
+@login_required
+def export_history_pdf(request):
+    return export_history(request, 'pdf')
 
 @login_required
 @user_passes_test(is_admin)
@@ -289,24 +220,70 @@ def close_biweekly(request):
         messages.info(request, 'Este periodo ya está cerrado.')
         return render(request, 'reports/close.html', {'period': period})
 
-    leaderboard = (
-        Activity.objects.filter(date__range=(start_date, end_date))
-        .values('user_id')
-        .annotate(points=Sum(F('activity_type__points')), activities=Count('id'))
-        .order_by('-points')
-    )
-
-    Ranking.objects.filter(period=period).delete()
-    for position, row in enumerate(leaderboard, start=1):
-        Ranking.objects.create(
-            period=period,
-            position=position,
-            user_id=row['user_id'],
-            total_points=row['points'] or 0,
-            total_activities=row['activities'],
-        )
-
-    period.is_closed = True
-    period.save()
+    # El ranking publicado es el de las puntuaciones con reglas (bonos, multiplicadores y topes)
+    with transaction.atomic():
+        compute_period_scores(period)
+        Ranking.objects.filter(period=period).delete()
+        Ranking.objects.bulk_create([
+            Ranking(
+                period=period,
+                position=score.position,
+                user_id=score.user_id,
+                total_points=score.total_points,
+                total_activities=score.activities,
+            )
+            for score in Score.objects.filter(period=period).order_by('position')
+        ])
+        period.is_closed = True
+        period.save()
     messages.success(request, 'Periodo quincenal cerrado y ranking publicado.')
-    return render(request, 'reports/close.html', {'period': period})
\ No newline at end of file
+    return render(request, 'reports/close.html', {'period': period})
+
+SIMULATOR_DEFAULT_PERIODS = 6
+SIMULATOR_ROWS_PER_PERIOD = 50
+
+@login_required
+@user_passes_test(is_admin)
+def simulator(request):
+    # ¿y si? rankings de los periodos elegidos con otros valores por tipo de actividad
+    activity_types = ActivityType.objects.cached()
+    available = list(Period.objects.filter(type=Period.BIWEEKLY).order_by('-startDate')[:24])
+    selected_ids = {int(pk) for pk in request.GET.getlist('period') if pk.isdigit()}
+    periods = [p for p in available if p.pk in selected_ids] or available[:SIMULATOR_DEFAULT_PERIODS]
+
+    prices = []
+    for activity_type in activity_types:
+        value = request.GET.get(f'price_{activity_type.pk}', '')
+        try:
+            prices.append(int(value))
+        except ValueError:
+            prices.append(activity_type.points)
+
+    results = []
+    if periods:
+        rules = list(ScoringRule.objects.filter(is_active=True))
+        # Sólo los tipos modificados: el resto conserva los puntos que se otorgaron en su día
+        proposed = {t.pk: price for t, price in zip(activity_types, prices) if price != t.points}
+        simulated = [simulate(columns, proposed, rules) for columns in load_period_columns(periods)]
+        names = dict(User.objects.filter(
+            pk__in={row['user_id'] for rows in simulated for row in rows[:SIMULATOR_ROWS_PER_PERIOD]}
+        ).values_list('pk', 'name'))
+        for period, rows in zip(periods, simulated):
+            results.append({
+                'period': period,
+                'rows': [dict(row, name=names.get(row['user_id'], '')) for row in rows[:SIMULATOR_ROWS_PER_PERIOD]],
+                'participants': len(rows),
+                'moved': sum(1 for row in rows if row['delta']),
+                'winner_changed': bool(rows) and rows[0]['position'] != 1,
+            })
+
+    context = {
+        'types': [
+            {'type': t, 'price': price, 'changed': price != t.points}
+            for t, price in zip(activity_types, prices)
+        ],
+        'available_periods': available,
+        'selected_periods': {p.pk for p in periods},
+        'results': results,
+    }
+    return render(request, 'reports/simulator.html', context)
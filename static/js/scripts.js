@@ -18,7 +18,46 @@ function updatePoints() {
   document.getElementById('estimatedPoints').textContent = `Puntos: ${points}`;
 }
 
+// Autocompletado de usuarios: consulta users:user_search y guarda el id en el input oculto
+function initUserTypeahead(input) {
+  const hidden = document.getElementById(input.dataset.target);
+  const datalist = document.getElementById(input.getAttribute('list'));
+  const separator = input.dataset.typeaheadUrl.includes('?') ? '&' : '?';
+  let timer = null;
+  let controller = null;
+
+  input.addEventListener('input', function () {
+    const match = Array.from(datalist.options).find(opt => opt.value === input.value);
+    hidden.value = match ? match.dataset.id : '';
+    if (match) return;
+
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      const url = `${input.dataset.typeaheadUrl}${separator}q=${encodeURIComponent(input.value.trim())}`;
+      fetch(url, { signal: controller.signal })
+        .then(response => response.json())
+        .then(data => {
+          datalist.innerHTML = '';
+          (data.results || []).forEach(u => {
+            const option = document.createElement('option');
+            option.value = `${u.name} - ${u.email}`;
+            option.label = u.team || 'Sin equipo';
+            option.dataset.id = u.id;
+            datalist.appendChild(option);
+          });
+        })
+        .catch(err => {
+          if (err.name !== 'AbortError') console.error('Error al buscar usuarios', err);
+        });
+    }, 200);
+  });
+}
+
 document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('[data-typeahead-url]').forEach(initUserTypeahead);
+
   // Para showView y updatePoints
   if (document.getElementById('activityType')) {
     document.getElementById('activityType').addEventListener('change', updatePoints);
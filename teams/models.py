@@ -1,4 +1,5 @@
 from django.db import models
+from core.refdata import ReferenceDataManager
 
 class Team(models.Model):
     name = models.CharField(max_length=100)
@@ -7,5 +8,7 @@ class Team(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReferenceDataManager(ordering=('name',))
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,9 +1,9 @@
-from django.db.models import Sum
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Team
 from users.models import User
+from activities.totals import team_points
 
 @login_required
 def team_management(request):
@@ -11,9 +11,11 @@ def team_management(request):
         messages.error(request, 'No tienes permisos para acceder a esta página')
         return redirect('dashboard:dashboard')
     
-    teams = Team.objects.annotate(
-        calculated_points=Sum('user__activity__activity_type__points')
-    )
+    teams = list(Team.objects.all())
+    # Incluye los rollups de periodos archivados
+    points = team_points()
+    for team in teams:
+        team.calculated_points = points.get(team.id, 0)
     
     context = {
         'teams': teams
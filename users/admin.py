@@ -1,8 +1,21 @@
-from django.contrib import admin
+import os
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import format_html
+from .bulk_import import FIELDS, import_users, read_rows
 from .models.user import User, UserProfile
 
+class UserImportForm(forms.Form):
+    file = forms.FileField(label='Archivo CSV o JSON')
+    default_password = forms.CharField(
+        label='Contraseña por defecto', required=False, widget=forms.PasswordInput,
+        help_text='Para las filas sin password; si se deja vacía, esos usuarios quedan sin contraseña utilizable.',
+    )
+
 class CustomUserAdmin(UserAdmin):
     model = User
     list_display = ('email', 'name', 'rol', 'is_active', 'is_staff', 'team')
@@ -10,6 +23,7 @@ class CustomUserAdmin(UserAdmin):
     search_fields = ('email', 'name')
     ordering = ('email',)
     list_per_page = 25
+    change_list_template = 'admin/users/user/change_list.html'
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -23,6 +37,45 @@ class CustomUserAdmin(UserAdmin):
         ),
     )
 
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='users_user_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            messages.error(request, 'No tienes permisos para realizar esta acción')
+            return redirect('admin:users_user_changelist')
+
+        form = UserImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = os.path.splitext(upload.name)[1].lstrip('.').lower()
+            try:
+                rows = read_rows(upload, fmt)
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                result = import_users(rows, default_password=form.cleaned_data['default_password'] or None)
+                messages.success(
+                    request,
+                    f'Importados {result.created} usuarios ({len(result.skipped)} ya existían, '
+                    f'{len(result.errors)} filas con errores)',
+                )
+                for number, message in result.errors[:20]:
+                    messages.warning(request, f'Fila {number}: {message}')
+                return redirect('admin:users_user_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar usuarios',
+            'form': form,
+            'fields': FIELDS,
+        }
+        return TemplateResponse(request, 'admin/users/user/import.html', context)
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'profile_image_preview')
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from .models import User
+
+CACHE_KEY = 'users:request_user:{}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 0)
+
+
+def invalidate_cached_users(user_ids):
+    """Elimina del caché los usuarios indicados para que se recarguen en la siguiente petición."""
+    if not _cache_timeout():
+        return
+    keys = [CACHE_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+
+
+class PrefetchingModelBackend(ModelBackend):
+    """
+    Backend que carga al usuario de la sesión junto con su equipo y su perfil
+    en una sola consulta. Si AUTH_USER_CACHE_TIMEOUT > 0, el resultado se guarda
+    en el caché y las señales de users se encargan de invalidarlo.
+    """
+
+    def get_user(self, user_id):
+        timeout = _cache_timeout()
+        key = CACHE_KEY.format(user_id)
+        user = cache.get(key) if timeout else None
+
+        if user is None:
+            try:
+                user = User._default_manager.select_related('team', 'userprofile').get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            if timeout:
+                cache.set(key, user, timeout)
+
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,127 @@
+"""
+Importación masiva de usuarios desde CSV o JSON.
+
+Cada fila lleva email, name y opcionalmente password, team (nombre del equipo)
+y rol. En vez de create_user() por usuario (un hash PBKDF2 y dos INSERT en
+serie), los hashes se calculan en un pool de procesos y usuarios y perfiles se
+insertan con bulk_create. bulk_create no emite post_save, así que aquí se crean
+los perfiles y se renueva la versión de datos que harían las señales.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from core.versioning import bump_data_version
+from teams.models import Team
+from .hashing import hash_passwords
+from .models import User, UserProfile
+
+FIELDS = ('email', 'name', 'password', 'team', 'rol')
+ROLES = {value for value, _ in User.ROLE_CHOICES}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: list = field(default_factory=list)  # emails que ya existían
+    errors: list = field(default_factory=list)  # (número de fila, mensaje)
+
+
+def read_rows(fileobj, fmt):
+    """Filas (dicts) de un archivo CSV con cabecera o de una lista JSON (o {"users": [...]})."""
+    data = fileobj.read()
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(data))
+        return [{(key or '').strip().lower(): value for key, value in row.items()} for row in reader]
+    if fmt == 'json':
+        payload = json.loads(data)
+        if isinstance(payload, dict):
+            payload = payload.get('users', [])
+        if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+            raise ValueError('El JSON debe ser una lista de usuarios')
+        return payload
+    raise ValueError(f'Formato no soportado: {fmt}')
+
+
+def _clean(value):
+    return str(value).strip() if value is not None else ''
+
+
+def import_users(rows, default_password=None, batch_size=1000, workers=None, dry_run=False):
+    """
+    Valida e inserta las filas. Las filas con errores no se importan; los
+    emails que ya existen se omiten. Cada lote de batch_size usuarios (con sus
+    perfiles) se confirma en una transacción corta: un fallo a mitad deja
+    importados los lotes anteriores y relanzar la importación los omite.
+    """
+    result = ImportResult()
+    teams = {team.name.strip().lower(): team.pk for team in Team.objects.cached()}
+    pending = []
+    seen = set()
+
+    for number, row in enumerate(rows, start=1):
+        email = User.objects.normalize_email(_clean(row.get('email')))
+        name = _clean(row.get('name'))
+        team_name = _clean(row.get('team'))
+        rol = _clean(row.get('rol')).lower() or User.USER
+        try:
+            validate_email(email)
+        except ValidationError:
+            result.errors.append((number, f'Email inválido: {email or "(vacío)"}'))
+            continue
+        if email.lower() in seen:
+            result.errors.append((number, f'Email repetido en el archivo: {email}'))
+            continue
+        seen.add(email.lower())
+        if not name:
+            result.errors.append((number, 'El nombre es obligatorio'))
+            continue
+        if rol not in ROLES:
+            result.errors.append((number, f'Rol inválido: {rol}'))
+            continue
+        team_id = None
+        if team_name:
+            team_id = teams.get(team_name.lower())
+            if team_id is None:
+                result.errors.append((number, f'Equipo no encontrado: {team_name}'))
+                continue
+            if rol == User.ADMIN:
+                result.errors.append((number, 'Los administradores no deben pertenecer a un equipo'))
+                continue
+        password = _clean(row.get('password')) or default_password or None
+        pending.append((email, name, team_id, rol, password))
+
+    existing = set()
+    emails = [entry[0] for entry in pending]
+    for i in range(0, len(emails), batch_size):
+        existing.update(
+            email.lower() for email in User.objects.filter(email__in=emails[i:i + batch_size]).values_list('email', flat=True)
+        )
+    result.skipped = [email for email in emails if email.lower() in existing]
+    pending = [entry for entry in pending if entry[0].lower() not in existing]
+    if dry_run or not pending:
+        result.created = len(pending) if dry_run else 0
+        return result
+
+    hashes = hash_passwords([entry[4] for entry in pending], workers=workers)
+    users = [
+        User(email=email, name=name, team_id=team_id, rol=rol, password=hashed)
+        for (email, name, team_id, rol, _), hashed in zip(pending, hashes)
+    ]
+
+    for i in range(0, len(users), batch_size):
+        batch = users[i:i + batch_size]
+        with transaction.atomic():
+            User.objects.bulk_create(batch)
+            # MySQL no devuelve las claves de bulk_create: se recuperan por email
+            user_ids = User.objects.filter(email__in=[user.email for user in batch]).values_list('pk', flat=True)
+            UserProfile.objects.bulk_create([UserProfile(user_id=pk) for pk in user_ids])
+        result.created += len(batch)
+    # Sin actividades los totales de equipo no cambian, pero sí los listados de usuarios
+    bump_data_version()
+    return result
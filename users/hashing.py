@@ -0,0 +1,53 @@
+"""
+Hash de contraseñas en lote para las importaciones masivas.
+
+PBKDF2 es deliberadamente lento (cientos de milisegundos por contraseña), así
+que con muchos usuarios se reparte en un pool de procesos. Los hijos sólo
+configuran PASSWORD_HASHERS y no cargan el proyecto: este módulo no importa
+modelos para que pueda ejecutarse sin django.setup().
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+
+_executor = None
+_executor_workers = 0
+
+
+def _init_worker(hashers):
+    from django.conf import settings as worker_settings
+    if not worker_settings.configured:
+        worker_settings.configure(PASSWORD_HASHERS=hashers)
+
+
+def _hash_chunk(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        # spawn: los hijos no heredan conexiones a la base de datos ni hilos del servidor
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(list(settings.PASSWORD_HASHERS),),
+        )
+        _executor_workers = workers
+    return _executor
+
+
+def hash_passwords(passwords, workers=None):
+    """Devuelve los hashes en el mismo orden; None produce una contraseña inutilizable."""
+    passwords = list(passwords)
+    workers = settings.PASSWORD_HASH_WORKERS if workers is None else workers
+    if workers <= 1 or len(passwords) < settings.PASSWORD_HASH_PARALLEL_MIN:
+        return _hash_chunk(passwords)
+    # Trozos pequeños para repartir bien la carga sin pagar un envío por contraseña
+    chunk = max(1, len(passwords) // (workers * 8))
+    chunks = [passwords[i:i + chunk] for i in range(0, len(passwords), chunk)]
+    return [hashed for result in _get_executor(workers).map(_hash_chunk, chunks) for hashed in result]
@@ -0,0 +1,45 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from users.bulk_import import FIELDS, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuarios desde un archivo CSV (con cabecera) o JSON. '
+        f'Campos: {", ".join(FIELDS)}; team es el nombre del equipo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'json'), help='Por defecto, según la extensión del archivo')
+        parser.add_argument('--default-password', help='Contraseña para las filas sin password (si no, quedan sin contraseña utilizable)')
+        parser.add_argument('--workers', type=int, help='Procesos para el hash de contraseñas')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Sólo valida, no inserta nada')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = read_rows(f, fmt)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        result = import_users(
+            rows,
+            default_password=options['default_password'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - started
+
+        for number, message in result.errors:
+            self.stderr.write(f'Fila {number}: {message}')
+        verb = 'Se importarían' if options['dry_run'] else 'Importados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} usuarios en {elapsed:.2f}s '
+            f'({len(result.skipped)} ya existían, {len(result.errors)} filas con errores)'
+        ))
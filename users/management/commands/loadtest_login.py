@@ -0,0 +1,109 @@
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Session:
+    """Cliente HTTP mínimo con cookies y token CSRF para hablar con el servidor."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.jar = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar))
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post_login(self, email, password):
+        page = self.get('/users/login/')
+        match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+        data = urllib.parse.urlencode({
+            'csrfmiddlewaretoken': match.group(1) if match else '',
+            'email': email,
+            'password': password,
+        }).encode()
+        request = urllib.request.Request(
+            self.base_url + '/users/login/', data=data,
+            headers={'Referer': self.base_url + '/users/login/'},
+        )
+        return self._open(request)
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as exc:
+            # 429 es la respuesta esperada cuando el límite de intentos actúa
+            return exc.read().decode('utf-8', 'replace')
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga contra un servidor en ejecución: mide la latencia del dashboard '
+        'de un usuario legítimo antes y durante una ráfaga de logins fallidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', required=True, help='Usuario legítimo para medir el dashboard')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--requests', type=int, default=50, help='Peticiones mínimas al dashboard por fase')
+        parser.add_argument('--attackers', type=int, default=8, help='Hilos que generan logins fallidos')
+        parser.add_argument('--attempts', type=int, default=200, help='Intentos fallidos por hilo')
+
+    def handle(self, *args, **options):
+        session = Session(options['url'])
+        session.post_login(options['email'], options['password'])
+        if 'Iniciar Sesión' in session.get('/dashboard/'):
+            raise CommandError('No se pudo iniciar sesión con el usuario legítimo')
+
+        baseline = self._measure(session, options['requests'])
+
+        stop = threading.Event()
+        sent = []
+
+        def attack(n):
+            attacker = Session(options['url'])
+            for i in range(options['attempts']):
+                if stop.is_set():
+                    break
+                attacker.post_login(f'victima{n}@example.com', f'incorrecta-{i}')
+                sent.append(1)
+
+        threads = [threading.Thread(target=attack, args=(n,)) for n in range(options['attackers'])]
+        for thread in threads:
+            thread.start()
+        try:
+            # Se mide mientras dure la ráfaga (y al menos --requests veces)
+            during = []
+            while any(thread.is_alive() for thread in threads) or len(during) < options['requests']:
+                during.extend(self._measure(session, 1))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self._report('Sin ataque', baseline)
+        self._report('Durante la ráfaga', during)
+        self.stdout.write(f'Intentos fallidos enviados: {len(sent)}')
+        ratio = statistics.median(during) / statistics.median(baseline)
+        self.stdout.write(f'Relación de medianas (durante / sin ataque): {ratio:.2f}x')
+
+    def _measure(self, session, count):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            session.get('/dashboard/')
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def _report(self, label, samples):
+        ordered = sorted(samples)
+        p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+        self.stdout.write(f'{label}: p50={statistics.median(ordered):.1f}ms p95={p95:.1f}ms')
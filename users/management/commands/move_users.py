@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from teams.models import Team
+from users.models import User
+from users.team_moves import move_users_to_team
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve usuarios a otro equipo con un solo UPDATE y recalcula los puntos '
+        'de los equipos afectados. Los usuarios se indican por email, por archivo '
+        '(un email por línea) o por equipo de origen.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--team', help='Nombre del equipo de destino')
+        target.add_argument('--no-team', action='store_true', help='Deja a los usuarios sin equipo')
+        parser.add_argument('emails', nargs='*')
+        parser.add_argument('--file', help='Archivo con un email por línea')
+        parser.add_argument('--from-team', help='Mueve a todos los miembros de este equipo')
+
+    def _team(self, name):
+        team = next((t for t in Team.objects.cached() if t.name.lower() == name.strip().lower()), None)
+        if team is None:
+            raise CommandError(f'Equipo no encontrado: {name}')
+        return team
+
+    def handle(self, *args, **options):
+        team = None if options['no_team'] else self._team(options['team'])
+
+        emails = list(options['emails'])
+        if options['file']:
+            try:
+                with open(options['file'], encoding='utf-8') as f:
+                    emails.extend(line.strip() for line in f if line.strip())
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        users = User.objects.none()
+        if emails:
+            users = User.objects.filter(email__in=emails)
+            missing = set(emails) - set(users.values_list('email', flat=True))
+            for email in sorted(missing):
+                self.stderr.write(f'Usuario no encontrado: {email}')
+        if options['from_team']:
+            users = users | User.objects.filter(team=self._team(options['from_team']))
+        elif not emails:
+            raise CommandError('Indica emails, --file o --from-team')
+
+        moved, skipped = move_users_to_team(users.values_list('pk', flat=True), team)
+        target = team.name if team else 'sin equipo'
+        self.stdout.write(self.style.SUCCESS(f'{moved} usuarios movidos a {target}'))
+        if skipped:
+            self.stderr.write(f'{skipped} administradores omitidos: no deben pertenecer a un equipo')
@@ -67,6 +67,13 @@ class User(AbstractUser):
     class Meta:
         # Añadido ordering para consistencia
         ordering = ['name']
+        indexes = [
+            # Orden por defecto y búsqueda por prefijo de nombre
+            models.Index(fields=['name'], name='user_name_idx'),
+            # Filtros de la gestión de usuarios conservando el orden por nombre
+            models.Index(fields=['team', 'name'], name='user_team_name_idx'),
+            models.Index(fields=['rol', 'name'], name='user_rol_name_idx'),
+        ]
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
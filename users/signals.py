@@ -1,8 +1,37 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
+from core.deferred import defer_batch
+from core.versioning import bump_data_version
+from teams.models import Team
+from .backends import invalidate_cached_users
 from .models import User, UserProfile
 
+def _invalidate_after_commit(user_ids):
+    defer_batch('users:cached_users', invalidate_cached_users, user_ids)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
+    # En línea y no diferido: todo usuario confirmado debe tener perfil
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    _invalidate_after_commit([instance.pk])
+    # El login sólo actualiza last_login, que ninguna página muestra
+    if update_fields != frozenset({'last_login'}):
+        bump_data_version()
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    _invalidate_after_commit([instance.user_id])
+    bump_data_version()
+
+@receiver(post_save, sender=Team)
+@receiver(pre_delete, sender=Team)
+def team_changed(sender, instance, **kwargs):
+    # pre_delete: después del borrado los miembros ya tienen team=NULL
+    _invalidate_after_commit(User.objects.filter(team=instance).values_list('pk', flat=True))
+    bump_data_version()
\ No newline at end of file
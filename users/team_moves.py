@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.utils import timezone
+from activities.totals import recompute_team_points
+from core.deferred import defer_batch
+from core.versioning import bump_data_version
+from .backends import invalidate_cached_users
+from .models import User
+
+
+def move_users_to_team(user_ids, team):
+    """
+    Mueve los usuarios indicados al equipo (None los deja sin equipo) con un
+    solo UPDATE y recalcula total_points de los equipos de origen y destino
+    en la misma transacción, una vez por equipo. Los administradores no se
+    asignan a equipos. Devuelve (movidos, administradores omitidos).
+    """
+    team_id = team.pk if team else None
+    with transaction.atomic():
+        users = User.objects.filter(pk__in=list(user_ids))
+        skipped = 0
+        if team_id:
+            skipped = users.filter(rol=User.ADMIN).count()
+            users = users.exclude(rol=User.ADMIN)
+        # exclude(team_id=X) también incluye a los usuarios sin equipo
+        users = users.exclude(team_id=team_id)
+        moved = list(users.select_for_update().values_list('pk', 'team_id'))
+        if not moved:
+            return 0, skipped
+
+        moved_ids = [pk for pk, _ in moved]
+        # update() no emite post_save: caché de usuarios y versión de datos se gestionan aquí
+        User.objects.filter(pk__in=moved_ids).update(team_id=team_id, updated_at=timezone.now())
+        recompute_team_points({old_team_id for _, old_team_id in moved} | {team_id})
+        defer_batch('users:cached_users', invalidate_cached_users, moved_ids)
+        bump_data_version()
+    return len(moved), skipped
@@ -1,3 +1,350 @@
-from django.test import TestCase
+import io
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from teams.models import Team
+from activities.models.activity import Activity
+from activities.models.activity_type import ActivityType
+from activities.totals import team_points
+from users import throttling
+from users.bulk_import import import_users, read_rows
+from users.hashing import hash_passwords
+from users.team_moves import move_users_to_team
+from users.backends import PrefetchingModelBackend
+from users.models.user import User, UserProfile
 
-# Create your tests here.
+
+class PrefetchingModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team = Team.objects.create(name='Team A')
+            self.user = User.objects.create_user(
+                email='user@example.com', password='pass', name='User One', team=self.team
+            )
+        self.backend = PrefetchingModelBackend()
+
+    def test_get_user_loads_team_and_profile_in_one_query(self):
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.team.name, 'Team A')
+            self.assertTrue(user.userprofile.image_url)
+
+    def test_get_user_missing_returns_none(self):
+        self.assertIsNone(self.backend.get_user(0))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+    def test_cached_user_is_invalidated_on_profile_and_team_change(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.backend.get_user(self.user.pk)
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.image_url = 'profile_images/otra.jpeg'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).userprofile.image_url.name, 'profile_images/otra.jpeg')
+
+        self.team.name = 'Team B'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).team.name, 'Team B')
+
+    def test_authenticated_request_loads_user_with_relations(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/history/')
+        self.assertEqual(response.status_code, 200)
+        user = response.wsgi_request.user
+        with self.assertNumQueries(0):
+            user.team.name
+            user.userprofile.image_url
+
+
+@override_settings(LOGIN_THROTTLE={'WINDOW': 300, 'MAX_FAILURES_PER_IP': 20, 'MAX_FAILURES_PER_EMAIL': 3})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', password='pass', name='User One')
+        self.url = reverse('users:login')
+
+    def test_blocks_email_after_failures_without_calling_authenticate(self):
+        for _ in range(3):
+            self.client.post(self.url, {'email': 'user@example.com', 'password': 'mala'})
+
+        with mock.patch('users.views.authenticate') as authenticate, self.assertLogs('users.throttling', 'WARNING'):
+            response = self.client.post(self.url, {'email': 'user@example.com', 'password': 'pass'})
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        self.assertEqual(throttling.rejected_counts()['email'], 1)
+
+    def test_blocks_ip_across_emails(self):
+        for i in range(20):
+            self.client.post(self.url, {'email': f'otro{i}@example.com', 'password': 'mala'})
+        with self.assertLogs('users.throttling', 'WARNING'):
+            response = self.client.post(self.url, {'email': 'user@example.com', 'password': 'pass'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(throttling.rejected_counts()['ip'], 1)
+
+    def test_successful_login_resets_email_failures(self):
+        for _ in range(2):
+            self.client.post(self.url, {'email': 'user@example.com', 'password': 'mala'})
+        response = self.client.post(self.url, {'email': 'user@example.com', 'password': 'pass'})
+        self.assertRedirects(response, reverse('dashboard:dashboard'))
+        self.assertFalse(throttling.is_blocked('127.0.0.1', 'user@example.com'))
+
+    @override_settings(LOGIN_THROTTLE={'MAX_FAILURES_PER_IP': 2, 'MAX_FAILURES_PER_EMAIL': 10, 'TRUSTED_PROXIES': ['10.0.0.0/8']})
+    def test_client_ip_behind_trusted_proxy(self):
+        behind_proxy = {'REMOTE_ADDR': '10.0.0.2', 'HTTP_X_FORWARDED_FOR': '198.51.100.7, 203.0.113.9, 10.0.0.3'}
+        self.assertEqual(throttling.client_ip(RequestFactory().get('/', **behind_proxy)), '203.0.113.9')
+        # Desde fuera del balanceador la cabecera se ignora: el cliente podría falsificarla
+        spoofed = RequestFactory().get('/', REMOTE_ADDR='192.0.2.1', HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(throttling.client_ip(spoofed), '192.0.2.1')
+
+        for i in range(2):
+            self.client.post(self.url, {'email': f'otro{i}@example.com', 'password': 'mala'}, **behind_proxy)
+        with self.assertLogs('users.throttling', 'WARNING'):
+            response = self.client.post(self.url, {'email': 'user@example.com', 'password': 'pass'}, **behind_proxy)
+        self.assertEqual(response.status_code, 429)
+        # Otro cliente detrás del mismo balanceador no queda bloqueado
+        response = self.client.post(self.url, {'email': 'user@example.com', 'password': 'pass'},
+                                    REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='198.51.100.50')
+        self.assertRedirects(response, reverse('dashboard:dashboard'))
+
+    def test_window_slides(self):
+        now = 1_000_000
+        for _ in range(3):
+            throttling.register_failure('10.0.0.1', 'x@example.com', now=now)
+        with self.assertLogs('users.throttling', 'WARNING'):
+            self.assertTrue(throttling.is_blocked('10.0.0.1', 'x@example.com', now=now))
+        # A mitad de la ventana siguiente sólo pesa la mitad de los fallos anteriores
+        later = (now // 300 + 1) * 300 + 150
+        self.assertFalse(throttling.is_blocked('10.0.0.1', 'x@example.com', now=later))
+
+
+class UserManagementListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.team_a = Team.objects.create(name='Team A')
+        self.team_b = Team.objects.create(name='Team B')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN
+        )
+        for i in range(30):
+            User.objects.create_user(
+                email=f'ana{i:02d}@example.com', password='pass', name=f'Ana {i:02d}',
+                team=self.team_a if i % 2 else self.team_b,
+            )
+        User.objects.create_user(email='zoe@example.com', password='pass', name='Zoe', team=self.team_b)
+        self.client.force_login(self.admin)
+        self.url = reverse('users:user_management')
+
+    def test_list_is_paginated_without_per_row_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page.object_list), 25)
+        self.assertEqual(page.paginator.count, 32)
+
+        with self.assertNumQueries(4):
+            # usuario con team/perfil, count, equipos y la página con select_related('team')
+            self.client.get(self.url, {'page': 2})
+
+    def test_filters_by_prefix_team_and_role(self):
+        response = self.client.get(self.url, {'q': 'zo'})
+        self.assertEqual([u.email for u in response.context['users']], ['zoe@example.com'])
+
+        response = self.client.get(self.url, {'q': 'ana', 'team': self.team_a.id})
+        self.assertEqual(response.context['page_obj'].paginator.count, 15)
+
+        response = self.client.get(self.url, {'role': User.ADMIN})
+        self.assertEqual([u.email for u in response.context['users']], ['admin@example.com'])
+
+    def test_prefix_search_does_not_match_substrings(self):
+        response = self.client.get(self.url, {'q': 'example'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        team = Team.objects.create(name='Team A')
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN
+        )
+        for i in range(15):
+            User.objects.create_user(email=f'luis{i:02d}@example.com', password='pass', name=f'Luis {i:02d}', team=team)
+        User.objects.create_user(email='marta@example.com', password='pass', name='Marta', is_active=False)
+        self.url = reverse('users:user_search')
+
+    def test_prefix_search_is_limited(self):
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'lu', 'limit': 5})
+        results = response.json()['results']
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0], {'id': results[0]['id'], 'name': 'Luis 00', 'email': 'luis00@example.com', 'team': 'Team A'})
+
+        response = self.client.get(self.url, {'q': 'lu', 'limit': 1000})
+        self.assertEqual(len(response.json()['results']), 15)
+
+    def test_filters_role_and_active(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {'q': 'ma'})
+        self.assertEqual([r['name'] for r in response.json()['results']], ['Marta'])
+        response = self.client.get(self.url, {'q': 'ma', 'active': '1'})
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get(self.url, {'q': 'a', 'role': User.USER})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_requires_admin(self):
+        self.client.force_login(User.objects.get(email='marta@example.com'))
+        self.assertEqual(self.client.get(self.url, {'q': 'l'}).status_code, 302)
+        self.client.force_login(User.objects.get(email='luis00@example.com'))
+        self.assertEqual(self.client.get(self.url, {'q': 'l'}).status_code, 403)
+
+
+class BulkUserImportTests(TestCase):
+    CSV = (
+        'Email,Name,Password,Team,Rol\n'
+        'ana@example.com,Ana,secreta,team a,\n'
+        'luis@example.com,Luis,,Team B,user\n'
+        'jefa@example.com,Jefa,clave,,admin\n'
+        'existe@example.com,Existe,x,,\n'
+        'mal-email,Nadie,x,,\n'
+        'ana@example.com,Ana otra vez,x,,\n'
+        'pepe@example.com,Pepe,x,Team Z,\n'
+        'root@example.com,Root,x,Team A,admin\n'
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.team_a = Team.objects.create(name='Team A')
+        self.team_b = Team.objects.create(name='Team B')
+        User.objects.create_user(email='existe@example.com', password='pass', name='Existe')
+
+    def test_imports_valid_rows_with_profiles(self):
+        rows = read_rows(io.BytesIO(self.CSV.encode('utf-8-sig')), 'csv')
+        result = import_users(rows, workers=1)
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.skipped, ['existe@example.com'])
+        self.assertEqual([number for number, _ in result.errors], [5, 6, 7, 8])
+
+        ana = User.objects.select_related('team', 'userprofile').get(email='ana@example.com')
+        self.assertEqual(ana.team, self.team_a)
+        self.assertTrue(ana.check_password('secreta'))
+        self.assertEqual(ana.userprofile.image_url.name, 'profile_images/default.jpeg')
+        self.assertFalse(User.objects.get(email='luis@example.com').has_usable_password())
+        self.assertEqual(User.objects.get(email='jefa@example.com').rol, User.ADMIN)
+        self.assertEqual(UserProfile.objects.count(), User.objects.count())
+
+    def test_inserts_in_bulk(self):
+        rows = [{'email': f'u{i}@example.com', 'name': f'U {i}', 'team': 'Team B'} for i in range(50)]
+        # equipos, emails existentes, savepoint, INSERT usuarios, ids por email, INSERT perfiles, release
+        with self.assertNumQueries(7):
+            result = import_users(rows, default_password='inicial', workers=1)
+        self.assertEqual(result.created, 50)
+        self.assertEqual(self.team_b.user_set.count(), 50)
+
+    def test_each_batch_commits_in_its_own_transaction(self):
+        rows = [{'email': f'u{i}@example.com', 'name': f'U {i}'} for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            result = import_users(rows, default_password='inicial', batch_size=2, workers=1)
+        # Dentro del TestCase cada transacción del import es un savepoint
+        savepoints = [q for q in queries.captured_queries if q['sql'].startswith('SAVEPOINT')]
+        self.assertEqual((result.created, len(savepoints)), (5, 3))
+        self.assertEqual(UserProfile.objects.count(), User.objects.count())
+
+    def test_dry_run_and_json(self):
+        rows = read_rows(io.StringIO('{"users": [{"email": "nuevo@example.com", "name": "Nuevo"}]}'), 'json')
+        result = import_users(rows, dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(User.objects.filter(email='nuevo@example.com').exists())
+
+    @override_settings(PASSWORD_HASH_PARALLEL_MIN=2)
+    def test_hashes_in_process_pool(self):
+        from django.contrib.auth.hashers import check_password
+        hashes = hash_passwords(['a', 'b', None], workers=2)
+        self.assertTrue(check_password('a', hashes[0]))
+        self.assertTrue(check_password('b', hashes[1]))
+        self.assertTrue(hashes[2].startswith('!'))
+
+    def test_admin_upload(self):
+        admin = User.objects.create_superuser(email='root@example.com', password='pass', name='Root')
+        self.client.force_login(admin)
+        url = reverse('admin:users_user_import')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        upload = SimpleUploadedFile('usuarios.csv', b'email,name\nnueva@example.com,Nueva\n', content_type='text/csv')
+        response = self.client.post(url, {'file': upload})
+        self.assertRedirects(response, reverse('admin:users_user_changelist'))
+        self.assertTrue(UserProfile.objects.filter(user__email='nueva@example.com').exists())
+
+
+class MoveUsersToTeamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        commit = ActivityType.objects.get(name='Commit válido')
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team_a = Team.objects.create(name='Team A')
+            self.team_b = Team.objects.create(name='Team B')
+            self.team_c = Team.objects.create(name='Team C')
+            self.admin = User.objects.create_user(
+                email='admin@example.com', password='pass', name='Admin', rol=User.ADMIN
+            )
+            self.users = []
+            for i in range(30):
+                user = User.objects.create_user(
+                    email=f'u{i:02d}@example.com', password='pass', name=f'U {i:02d}',
+                    team=self.team_a if i % 2 else self.team_b,
+                )
+                Activity.objects.create(activity_type=commit, user=user, date=today)
+                self.users.append(user)
+
+    def assertTotalsConsistent(self):
+        expected = team_points()
+        for team in Team.objects.all():
+            self.assertEqual(team.total_points, expected.get(team.pk, 0), team.name)
+
+    def test_totals_follow_the_users(self):
+        self.assertEqual(Team.objects.get(pk=self.team_a.pk).total_points, 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved, skipped = move_users_to_team([u.pk for u in self.users[:10]] + [self.admin.pk], self.team_c)
+        self.assertEqual((moved, skipped), (10, 1))
+        self.assertEqual(Team.objects.get(pk=self.team_c.pk).total_points, 40)
+        self.assertEqual(Team.objects.get(pk=self.team_a.pk).total_points, 40)
+        self.assertTotalsConsistent()
+        self.assertIsNone(User.objects.get(pk=self.admin.pk).team_id)
+
+        move_users_to_team([u.pk for u in self.users[:4]], None)
+        self.assertEqual(User.objects.filter(team__isnull=True).count(), 5)
+        self.assertTotalsConsistent()
+
+    def test_query_count_does_not_grow_with_users(self):
+        def queries(users, team):
+            with CaptureQueriesContext(connection) as ctx:
+                move_users_to_team([u.pk for u in users], team)
+            return len(ctx.captured_queries)
+
+        few = queries(self.users[:2], self.team_c)
+        many = queries(self.users[2:30], self.team_c)
+        self.assertEqual(few, many)
+        self.assertTotalsConsistent()
+
+    def test_view_and_command(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('users:move_users'), {
+            'user_ids': [self.users[0].pk, self.users[1].pk], 'team': self.team_c.pk, 'filters_query': 'q=u',
+        })
+        self.assertRedirects(response, reverse('users:user_management') + '?q=u')
+        self.assertEqual(self.team_c.user_set.count(), 2)
+
+        call_command('move_users', '--team', 'team c', '--from-team', 'Team A', stdout=io.StringIO())
+        self.assertEqual(self.team_c.user_set.count(), 16)
+        self.assertFalse(self.team_a.user_set.exists())
+        self.assertTotalsConsistent()
@@ -0,0 +1,120 @@
+import hashlib
+import ipaddress
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WINDOW': 300,
+    'MAX_FAILURES_PER_IP': 20,
+    'MAX_FAILURES_PER_EMAIL': 5,
+    # IPs o redes (CIDR) de los proxies/balanceadores cuyo X-Forwarded-For es de fiar
+    'TRUSTED_PROXIES': (),
+}
+
+KEY = 'login_throttle:{scope}:{ident}:{bucket}'
+REJECTED_KEY = 'login_throttle:rejected:{scope}'
+SCOPES = ('ip', 'email')
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'LOGIN_THROTTLE', {})}
+
+
+def _ident(value):
+    # Los emails no son claves válidas para todos los backends de caché
+    return hashlib.sha1((value or '').strip().lower().encode('utf-8')).hexdigest()
+
+
+def _is_trusted(address, networks):
+    try:
+        address = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request):
+    """
+    IP del cliente. Sólo si la conexión llega de un proxy de confianza se lee
+    X-Forwarded-For, de derecha a izquierda: la primera dirección que no es un
+    proxy de confianza es el cliente (las de más a la izquierda las pone él).
+    """
+    remote = request.META.get('REMOTE_ADDR', '')
+    networks = [ipaddress.ip_network(proxy, strict=False) for proxy in _config()['TRUSTED_PROXIES']]
+    if not networks or not _is_trusted(remote, networks):
+        return remote
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, networks):
+            return address
+    return forwarded[0] if forwarded else remote
+
+
+def _weighted_count(scope, ident, window, now):
+    """
+    Ventana deslizante aproximada: el contador de la ventana actual más la
+    fracción de la ventana anterior que todavía se solapa con los últimos
+    `window` segundos. Son dos lecturas al caché, sin listas de timestamps.
+    """
+    bucket = int(now // window)
+    current_key = KEY.format(scope=scope, ident=ident, bucket=bucket)
+    previous_key = KEY.format(scope=scope, ident=ident, bucket=bucket - 1)
+    counts = cache.get_many([current_key, previous_key])
+    overlap = 1 - (now % window) / window
+    return counts.get(current_key, 0) + counts.get(previous_key, 0) * overlap
+
+
+def is_blocked(ip, email, now=None):
+    """Indica si el intento debe rechazarse antes de llegar a authenticate()."""
+    config = _config()
+    now = time.time() if now is None else now
+    limits = {
+        'ip': (_ident(ip), config['MAX_FAILURES_PER_IP']),
+        'email': (_ident(email), config['MAX_FAILURES_PER_EMAIL']),
+    }
+    for scope, (ident, limit) in limits.items():
+        if _weighted_count(scope, ident, config['WINDOW'], now) >= limit:
+            _incr(REJECTED_KEY.format(scope=scope), None)
+            logger.warning('Intento de login rechazado por límite de %s', scope)
+            return True
+    return False
+
+
+def register_failure(ip, email, now=None):
+    config = _config()
+    now = time.time() if now is None else now
+    bucket = int(now // config['WINDOW'])
+    for scope, value in (('ip', ip), ('email', email)):
+        key = KEY.format(scope=scope, ident=_ident(value), bucket=bucket)
+        # Cada contador vive dos ventanas: la actual y la que se pondera después
+        _incr(key, config['WINDOW'] * 2)
+
+
+def reset(email, now=None):
+    """Limpia los fallos del email tras un login correcto."""
+    config = _config()
+    now = time.time() if now is None else now
+    bucket = int(now // config['WINDOW'])
+    cache.delete_many([
+        KEY.format(scope='email', ident=_ident(email), bucket=b) for b in (bucket, bucket - 1)
+    ])
+
+
+def rejected_counts():
+    """Intentos rechazados por el límite, acumulados por ámbito (ip/email)."""
+    keys = {scope: REJECTED_KEY.format(scope=scope) for scope in SCOPES}
+    values = cache.get_many(keys.values())
+    return {scope: values.get(key, 0) for scope, key in keys.items()}
+
+
+def _incr(key, timeout):
+    if not cache.add(key, 1, timeout):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # La clave expiró entre add() e incr()
+            cache.set(key, 1, timeout)
@@ -9,5 +9,7 @@ urlpatterns = [
     path('management/', views.user_management, name='user_management'),
     path('edit/<int:user_id>/', views.edit_user, name='edit_user'),
     path('delete/<int:user_id>/', views.delete_user, name='delete_user'),
+    path('move/', views.move_users, name='move_users'),
+    path('search/', views.user_search, name='user_search'),
     path('update-profile-image/', views.update_profile_image, name='update_profile_image'),
 ]
\ No newline at end of file
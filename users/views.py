@@ -1,22 +1,74 @@
+from urllib.parse import urlencode
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
 from .models import User, UserProfile
 from .forms import UserProfileForm
+from . import throttling
 from teams.models import Team
+from activities.totals import recompute_team_points
+from .team_moves import move_users_to_team
+
+USERS_PER_PAGE = 25
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 25
+
+def _user_list_context(request):
+    """Listado paginado de usuarios filtrado por prefijo de nombre/email, equipo y rol."""
+    q = request.GET.get('q', '').strip()
+    team_id = request.GET.get('team', '')
+    role = request.GET.get('role', '')
+
+    users = User.objects.select_related('team').order_by('name', 'id')
+    if q:
+        # istartswith se traduce a LIKE 'q%', que sí aprovecha los índices de name/email
+        users = users.filter(Q(name__istartswith=q) | Q(email__istartswith=q))
+    if team_id.isdigit():
+        users = users.filter(team_id=team_id)
+    elif team_id == 'none':
+        users = users.filter(team__isnull=True)
+    else:
+        team_id = ''
+    if role in (User.ADMIN, User.USER):
+        users = users.filter(rol=role)
+    else:
+        role = ''
+
+    filters = {'q': q, 'team': team_id, 'role': role}
+    page_obj = Paginator(users, USERS_PER_PAGE).get_page(request.GET.get('page'))
+    return {
+        'users': page_obj,
+        'page_obj': page_obj,
+        'teams': Team.objects.cached(),
+        'filters': filters,
+        'filters_query': urlencode({k: v for k, v in filters.items() if v}),
+    }
 
 def user_login(request):
     if request.method == 'POST':
         email = request.POST.get('email')
         password = request.POST.get('password')
+        ip = throttling.client_ip(request)
+
+        # Se rechaza antes de authenticate() para no gastar CPU en el hash de la contraseña
+        if throttling.is_blocked(ip, email):
+            messages.error(request, 'Demasiados intentos fallidos. Inténtalo de nuevo en unos minutos.')
+            return render(request, 'users/login.html', status=429)
+
         user = authenticate(request, email=email, password=password)
         
         if user is not None:
+            throttling.reset(email)
             login(request, user)
             return redirect('dashboard:dashboard')
         else:
+            throttling.register_failure(ip, email)
             messages.error(request, 'Credenciales incorrectas')
     
     return render(request, 'users/login.html')
@@ -32,9 +84,6 @@ def user_management(request):
         messages.error(request, 'No tienes permisos para acceder a esta página')
         return redirect('dashboard:dashboard')
     
-    users = User.objects.all()
-    teams = Team.objects.all()
-    
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
         name = request.POST.get('name')
@@ -46,11 +95,16 @@ def user_management(request):
 
         if user_id:  # Editar usuario existente
             user = get_object_or_404(User, id=user_id)
+            old_team_id = user.team_id
             user.name = name
             user.email = email
-            user.team = Team.objects.get(id=team_id) if team_id else None
+            user.team = Team.objects.get_cached(team_id) if team_id else None
             user.rol = role
-            user.save()
+            with transaction.atomic():
+                user.save()
+                if user.team_id != old_team_id:
+                    # Los puntos del usuario cambian de equipo
+                    recompute_team_points([old_team_id, user.team_id])
             messages.success(request, 'Usuario actualizado correctamente')
         else:  # Crear nuevo usuario
             if User.objects.filter(email=email).exists():
@@ -64,18 +118,14 @@ def user_management(request):
                     email=email,
                     password=password,
                     name=name,
-                    team=Team.objects.get(id=team_id) if team_id else None,
+                    team=Team.objects.get_cached(team_id) if team_id else None,
                     rol=role
                 )
                 messages.success(request, 'Usuario creado correctamente')
 
         return redirect('users:user_management')
 
-    context = {
-        'users': users,
-        'teams': teams,
-    }
-    return render(request, 'users/management.html', context)
+    return render(request, 'users/management.html', _user_list_context(request))
 
 @login_required
 def edit_user(request, user_id):
@@ -84,14 +134,9 @@ def edit_user(request, user_id):
         return redirect('dashboard:dashboard')
     
     user = get_object_or_404(User, id=user_id)
-    users = User.objects.all()
-    teams = Team.objects.all()
     
-    context = {
-        'editing_user': user,
-        'users': users,
-        'teams': teams,
-    }
+    context = _user_list_context(request)
+    context['editing_user'] = user
     return render(request, 'users/management.html', context)
 
 @login_required
@@ -111,6 +156,63 @@ def delete_user(request, user_id):
     
     return redirect('users:user_management')
 
+@login_required
+def move_users(request):
+    """Mueve los usuarios seleccionados en la gestión a otro equipo (o a ninguno)."""
+    if not request.user.is_admin:
+        messages.error(request, 'No tienes permisos para realizar esta acción')
+        return redirect('dashboard:dashboard')
+
+    next_url = reverse('users:user_management')
+    if request.POST.get('filters_query'):
+        next_url += '?' + request.POST['filters_query']
+    if request.method != 'POST':
+        return redirect(next_url)
+
+    user_ids = [pk for pk in request.POST.getlist('user_ids') if pk.isdigit()]
+    team_id = request.POST.get('team', '')
+    team = None
+    if team_id != 'none':
+        try:
+            team = Team.objects.get_cached(team_id)
+        except Team.DoesNotExist:
+            messages.error(request, 'Selecciona un equipo válido')
+            return redirect(next_url)
+
+    if not user_ids:
+        messages.error(request, 'Selecciona al menos un usuario')
+    else:
+        moved, skipped = move_users_to_team(user_ids, team)
+        target = team.name if team else 'sin equipo'
+        messages.success(request, f'{moved} usuarios movidos a {target}')
+        if skipped:
+            messages.warning(request, f'{skipped} administradores no se asignaron: no deben pertenecer a un equipo')
+    return redirect(next_url)
+
+@login_required
+def user_search(request):
+    """Autocompletado: usuarios cuyo nombre o email empieza por `q`, limitado a `limit` resultados."""
+    if not request.user.is_admin:
+        return JsonResponse({'error': 'No tienes permisos para realizar esta acción'}, status=403)
+
+    q = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), SEARCH_MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else SEARCH_DEFAULT_LIMIT
+
+    users = User.objects.order_by('name', 'id')
+    if q:
+        users = users.filter(Q(name__istartswith=q) | Q(email__istartswith=q))
+    if request.GET.get('role') in (User.ADMIN, User.USER):
+        users = users.filter(rol=request.GET['role'])
+    if request.GET.get('active') == '1':
+        users = users.filter(is_active=True)
+
+    results = [
+        {'id': row['id'], 'name': row['name'], 'email': row['email'], 'team': row['team__name']}
+        for row in users.values('id', 'name', 'email', 'team__name')[:limit]
+    ]
+    return JsonResponse({'results': results})
+
 @login_required
 def update_profile_image(request):
     if request.method == 'POST':